@@ -5,42 +5,80 @@
 預設使用 ~/skinbar_report/skinbar202506.xlsx
 """
 
-import pandas as pd
 import os
+import re
+from collections import Counter
 from pathlib import Path
 
+from payroll_records import Employee, SalaryResult, employees_from_dicts
+from salary_rules import SalaryRules, format_wan, load_salary_rules
+from stage_profiler import StageProfiler, profiled_stage
+from summary_columns import build_summary_columns
+
+# pandas / openpyxl 只在讀取 Excel 時載入（見 open_workbook、safe_read_excel），
+# 獎金計算（calculate_seasonal_bonus、calculate_team_bonus、calculate_salary）為純 Python，
+# 由已擷取的數據計算時不需要載入 pandas
+
+def _notna(value):
+    """單一值的缺值判斷，與 pd.notna 相同（None、NaN、NaT、pd.NA 視為缺值）"""
+    if value is None:
+        return False
+    try:
+        # NaN、NaT 與自己不相等；pd.NA 比較結果無法轉成 bool
+        return bool(value == value)
+    except TypeError:
+        return False
+
+_ROLE_NAME_PREFIX = re.compile(r'^\d+\.')
+_ROLE_NAME_SUFFIX = re.compile(r'\([^)]+\)$')
+
+def _clean_role_name(name):
+    """去除姓名開頭的編號（1.）與結尾的職別標示（(儲)），與前端活動產品組數的姓名比對方式相同"""
+    return _ROLE_NAME_SUFFIX.sub('', _ROLE_NAME_PREFIX.sub('', str(name).strip())).strip()
+
 class AutoSalaryCalculator:
-    def __init__(self):
+    def __init__(self, rules=None):
+        # 薪資與獎金規則（預設 salary_rules.json），可傳入 SalaryRules 或規則檔路徑
+        if not isinstance(rules, SalaryRules):
+            rules = load_salary_rules(rules)
+        self.rules = rules
+        
         # 基本薪資設定
-        self.base_salary = 25590  # 底薪
-        self.meal_allowance = 3000  # 伙食費
-        self.overtime_pay = 2461.4  # 加班費
-        self.skill_bonus_per_time = 10  # 手技獎金每次
+        self.base_salary = rules.base_salary  # 底薪
+        self.meal_allowance = rules.meal_allowance  # 伙食費
+        self.overtime_pay = rules.overtime_pay  # 加班費
+        self.skill_bonus_per_time = rules.skill_bonus_per_time  # 手技獎金每次
         
         # 團獎設定 (人數: (業績要求, 消耗比例要求, 獎金))
-        self.team_bonus_rules = {
-            2: (500000, 0.75, 5000),   # 2位正式淨膚師：50萬業績，75%消耗，5000元獎金
-            3: (750000, 0.75, 5600),   # 3位正式淨膚師：75萬業績，75%消耗，5600元獎金
-            4: (1000000, 0.75, 6000),  # 4位正式淨膚師：100萬業績，75%消耗，6000元獎金
-            5: (1250000, 0.75, 6250),  # 5位正式淨膚師：125萬業績，75%消耗，6250元獎金
-            6: (1500000, 0.75, 6500),  # 6位正式淨膚師：150萬業績，75%消耗，6500元獎金
-        }
-        
-        # 季獎金設定
-        self.seasonal_bonus_rules = {
-            'person_count_bonus': {
-                110: 100,  # 110人以上，100元/人
-                132: 200   # 132人以上，200元/人
-            },
-            'charge_target_bonus': {
-                250000: 2000,  # 25萬業績，獎金2000元
-                300000: 5000   # 30萬業績，再獎金5000元（總計7000元）
-            },
-            'mask_sales_max': 7  # 面膜銷售最高7組
-        }
+        self.team_bonus_rules = dict(rules.team_bonus_rules)
         
         # 預設檔案路徑
         self.default_excel_path = Path.home() / "skinbar_report" / "skinbar202506.xlsx"
+
+        # 日期工作表讀取方式: 'pandas' 或 'streaming'（openpyxl read_only 串流）
+        self.excel_backend = 'pandas'
+        
+        # 擷取結果快取（ExtractionCache），設定後內容未變的檔案不重新解析
+        self.extraction_cache = None
+        
+        # 日期工作表增量紀錄（IncrementalSheetStore），設定後只解析新增或變動的日期工作表
+        self.incremental_store = None
+        
+        # 擷取結果快照資料夾，設定後 read_excel_data 另外寫出 <檔名>.snap（見 workbook_snapshot）
+        self.snapshot_dir = None
+        
+        # 有限記憶體模式的記憶體上限 (bytes)，設定後日期工作表只解析需要的欄位，過大時逐列讀取
+        self.memory_limit = None
+        
+        # 目前開啟的工作簿（read_excel_data 與 count_mask_sales 共用）
+        self._workbook_session = None
+        
+        # 各階段效能紀錄與進度回呼，預設不計時；需要時換成 StageProfiler()
+        self.profiler = StageProfiler(enabled=False)
+
+        # 月報表彙整欄位對應（依表頭標籤），strict_columns=True 時每個欄位都必須有表頭
+        self.strict_columns = False
+        self._summary_columns = None  # (df, SummaryColumns)，同一份月報表彙整只建立一次
     
     def get_excel_file_path(self):
         """獲取Excel檔案路徑"""
@@ -64,27 +102,62 @@ class AutoSalaryCalculator:
                 if retry not in ['y', 'yes']:
                     return None
     
-    def read_excel_data(self, excel_file):
-        """讀取Excel文件數據"""
+    def open_workbook(self, excel_file, backend=None):
+        """開啟工作簿，同一個檔案重複呼叫時沿用已解析的 session
+        excel_file 可以是檔案路徑、檔案物件、WorkbookSession 或快照資料夾（<檔名>.snap）
+        backend 未指定時使用 self.excel_backend
+        """
+        from workbook_session import WorkbookSession
+        from workbook_snapshot import is_snapshot, load_snapshot
+
+        if isinstance(excel_file, WorkbookSession):
+            self._workbook_session = excel_file
+            return excel_file
+
+        backend = backend or self.excel_backend
+        session = self._workbook_session
+        if session is not None and session.backend == backend and session.is_current(excel_file):
+            return session
+
+        if session is not None:
+            session.close()
+        if is_snapshot(excel_file):
+            self._workbook_session = load_snapshot(excel_file).to_session(backend=backend)
+        elif self.extraction_cache is not None:
+            self._workbook_session = self.extraction_cache.open(excel_file, backend=backend)
+        else:
+            self._workbook_session = WorkbookSession(excel_file, backend=backend)
+        self._workbook_session.memory_limit = self.memory_limit
+        return self._workbook_session
+
+    @profiled_stage('read_excel_data')
+    def read_excel_data(self, excel_file, backend=None):
+        """讀取Excel文件數據
+        backend: 日期工作表讀取方式，'pandas' 或 'streaming'，未指定時使用 self.excel_backend
+        """
         try:
-            print(f"📖 正在讀取: {excel_file}")
+            print(f"📖 正在讀取: {getattr(excel_file, 'source', excel_file)}")
             
             # 先檢查工作表
-            excel_data = pd.ExcelFile(excel_file)
-            print(f"📋 可用工作表: {excel_data.sheet_names}")
+            with self.profiler.stage('open_workbook'):
+                session = self.open_workbook(excel_file, backend=backend)
+                sheet_names = session.sheet_names
+            print(f"📋 可用工作表: {sheet_names}")
             
             # 讀取月報表彙整工作表
-            if '月報表彙整' not in excel_data.sheet_names:
+            if '月報表彙整' not in sheet_names:
                 print("❌ 找不到「月報表彙整」工作表")
                 print("請確認Excel檔案中有此工作表名稱")
                 return None, 0, 0, []
             
-            df = self.safe_read_excel(excel_file, sheet_name='月報表彙整', header=None)
+            with self.profiler.stage('parse_summary', sheet='月報表彙整') as record:
+                df = session.parse('月報表彙整')
+                record['rows'] = df.shape[0]
             print(f"✅ 成功讀取Excel，共 {df.shape[0]} 行 {df.shape[1]} 列")
             
             # 找出所有日期工作表（排除月報表彙整）
             date_sheets = []
-            for sheet_name in excel_data.sheet_names:
+            for sheet_name in sheet_names:
                 if sheet_name != '月報表彙整':
                     # 檢查是否為日期格式的工作表（數字開頭）
                     if sheet_name.isdigit() or (len(sheet_name) >= 2 and sheet_name[0].isdigit()):
@@ -93,73 +166,134 @@ class AutoSalaryCalculator:
             date_sheets.sort()  # 按照名稱排序
             print(f"🗓️  找到日期工作表: {date_sheets}")
             
+            # 增量模式：指紋未變的日期工作表沿用上次的擷取結果
+            fingerprints = None
+            if self.incremental_store is not None and not session.from_cache:
+                fingerprints, reused = self.incremental_store.restore(session)
+                if fingerprints is not None:
+                    print(f"♻️  沿用 {len(reused)} 個未變動的日期工作表，"
+                          f"重新讀取 {len(date_sheets) - len(set(reused) & set(date_sheets))} 個")
+            
             # 計算總業績和總消耗
             total_performance = 0
             total_consumption = 0
             
-            for sheet_name in date_sheets:
+            for index, sheet_name in enumerate(date_sheets):
+                self.profiler.progress(index, len(date_sheets), f"讀取工作表 {sheet_name}")
                 try:
-                    sheet_df = self.safe_read_excel(excel_file, sheet_name=sheet_name, header=None)
-                    
                     # 讀取 E3 (業績) 和 E5 (消耗)
-                    performance_value = sheet_df.iloc[2, 4] if sheet_df.shape[0] > 2 and sheet_df.shape[1] > 4 else 0  # E3
-                    consumption_value = sheet_df.iloc[4, 4] if sheet_df.shape[0] > 4 and sheet_df.shape[1] > 4 else 0  # E5
+                    with self.profiler.stage('parse_sheet', sheet=sheet_name) as record:
+                        sheet_data = session.daily_sheet(sheet_name)
+                        record['rows'] = sheet_data.rows_scanned
+                    performance_value = sheet_data.performance  # E3
+                    consumption_value = sheet_data.consumption  # E5
                     
                     # 處理 NaN 值
-                    if pd.notna(performance_value):
+                    if _notna(performance_value):
                         total_performance += float(performance_value)
-                    if pd.notna(consumption_value):
+                    if _notna(consumption_value):
                         total_consumption += float(consumption_value)
                         
-                    print(f"   {sheet_name}: 業績 {performance_value if pd.notna(performance_value) else 0:,.0f}, 消耗 {consumption_value if pd.notna(consumption_value) else 0:,.0f}")
+                    print(f"   {sheet_name}: 業績 {performance_value if _notna(performance_value) else 0:,.0f}, 消耗 {consumption_value if _notna(consumption_value) else 0:,.0f}")
                     
+                except MemoryError:
+                    # 超過記憶體上限時整份月報表失敗，不可略過該工作表而少算業績
+                    raise
                 except Exception as e:
                     print(f"⚠️  讀取工作表 '{sheet_name}' 時發生錯誤: {e}")
                     continue
             
+            self.profiler.progress(len(date_sheets), len(date_sheets), "日期工作表讀取完成")
             print(f"\n💰 業績總額: {total_performance:,.0f} 元")
             print(f"🛍️  消耗總額: {total_consumption:,.0f} 元")
             
+            if fingerprints is not None:
+                try:
+                    self.incremental_store.update(session, fingerprints, date_sheets)
+                except OSError as e:
+                    print(f"⚠️  寫入增量紀錄失敗: {e}")
+            
+            # 所有日期工作表都已擷取（含面膜銷售行），寫入快取
+            if self.extraction_cache is not None and not session.from_cache:
+                try:
+                    self.extraction_cache.save(session)
+                except OSError as e:
+                    print(f"⚠️  寫入快取失敗: {e}")
+            
+            if self.snapshot_dir is not None and session.snapshot is None:
+                self.write_snapshot(session, date_sheets)
+            
             return df, total_performance, total_consumption, date_sheets
             
+        except MemoryError:
+            raise
         except Exception as e:
             print(f"❌ 讀取Excel文件時發生錯誤: {e}")
             return None, 0, 0, []
     
+    @profiled_stage('write_snapshot')
+    def write_snapshot(self, session, date_sheets):
+        """把已擷取的內容寫成快照（self.snapshot_dir/<檔名>.snap），失敗時只顯示警告"""
+        from workbook_snapshot import snapshot_path_for, write_snapshot
+
+        path = snapshot_path_for(session.source, self.snapshot_dir)
+        if path is None:
+            print("⚠️  檔案沒有檔名，不寫出快照")
+            return None
+        try:
+            write_snapshot(session, path, date_sheets)
+        except OSError as e:
+            print(f"⚠️  寫入快照失敗: {e}")
+            return None
+        print(f"💾 已寫出快照: {path}")
+        return path
+
+    @profiled_stage('count_mask_sales')
     def count_mask_sales(self, excel_file, date_sheets):
         """統計各淨膚師的水光面膜銷售數量"""
         mask_sales = {}  # {淨膚師編號: 銷售數量}
         
         print("\n🎭 正在統計水光面膜銷售...")
         
-        for sheet_name in date_sheets:
+        # 沿用 read_excel_data 已解析的工作表，不重新讀檔
+        session = self.open_workbook(excel_file)
+        
+        for index, sheet_name in enumerate(date_sheets):
+            self.profiler.progress(index, len(date_sheets), f"統計工作表 {sheet_name} 水光面膜")
             try:
-                sheet_df = self.safe_read_excel(excel_file, sheet_name=sheet_name, header=None)
+                # F21:H21 以下含水光面膜的行與同一行N列的淨膚師編號（由 session 整欄比對擷取）
+                with self.profiler.stage('mask_scan', sheet=sheet_name) as record:
+                    sheet_data = session.daily_sheet(sheet_name)
+                    record['rows'] = sheet_data.rows_scanned
                 
-                # 檢查 F21:H21 以下的欄位（從第21行開始，0-indexed為20）
-                start_row = 20  # F21 對應 index 20
+                # 依N列編號分組計數，相同編號只轉換一次
+                sheet_counts = Counter(therapist_id for _, therapist_id in sheet_data.mask_hits)
+                sheet_keys = {}
+                for therapist_id in sheet_counts:
+                    try:
+                        sheet_keys[therapist_id] = str(int(float(therapist_id))).strip()  # 確保是整數格式
+                    except (TypeError, ValueError, OverflowError) as e:
+                        # 編號無法轉換：只計算該行之前的銷售，與逐行統計時遇錯中斷一致
+                        bad_index = next(i for i, (_, tid) in enumerate(sheet_data.mask_hits) if tid == therapist_id)
+                        sheet_counts = Counter(tid for _, tid in sheet_data.mask_hits[:bad_index])
+                        sheet_keys = {tid: str(int(float(tid))).strip() for tid in sheet_counts}
+                        print(f"⚠️  統計工作表 '{sheet_name}' 水光面膜時發生錯誤: {e}")
+                        break
                 
-                for index in range(start_row, sheet_df.shape[0]):
-                    # 檢查F、G、H列
-                    for col in [5, 6, 7]:  # F=5, G=6, H=7 (0-indexed)
-                        if col < sheet_df.shape[1]:
-                            cell_value = sheet_df.iloc[index, col]
-                            if pd.notna(cell_value) and "水光面膜3入" in str(cell_value):
-                                # 找到水光面膜，檢查同一行N列的淨膚師編號
-                                if 13 < sheet_df.shape[1]:  # N列是第14列 (0-indexed: 13)
-                                    therapist_id = sheet_df.iloc[index, 13]  # N列
-                                    if pd.notna(therapist_id):
-                                        therapist_key = str(int(float(therapist_id))).strip()  # 確保是整數格式
-                                        if therapist_key not in mask_sales:
-                                            mask_sales[therapist_key] = 0
-                                        mask_sales[therapist_key] += 1
-                                        print(f"   {sheet_name}: 淨膚師{therapist_key} +1 水光面膜3入 (第{index+1}行)")
-                                        break  # 避免同一行重複計算
+                sheet_total = Counter()
+                for therapist_id, count in sheet_counts.items():
+                    sheet_total[sheet_keys[therapist_id]] += count
+                for therapist_key, count in sheet_total.items():
+                    mask_sales[therapist_key] = mask_sales.get(therapist_key, 0) + count
+                    print(f"   {sheet_name}: 淨膚師{therapist_key} +{count} 水光面膜3入")
                 
+            except MemoryError:
+                raise
             except Exception as e:
                 print(f"⚠️  統計工作表 '{sheet_name}' 水光面膜時發生錯誤: {e}")
                 continue
         
+        self.profiler.progress(len(date_sheets), len(date_sheets), "水光面膜統計完成")
         print("\n🎭 水光面膜統計結果:")
         for therapist_id, count in mask_sales.items():
             print(f"   淨膚師{therapist_id}: {count}組")
@@ -167,31 +301,13 @@ class AutoSalaryCalculator:
         return mask_sales
 
     def calculate_person_count_bonus(self, person_count):
-        """計算個人人次激勵獎金
+        """計算個人人次激勵獎金（級距見 salary_rules.json）
         110人以上才有獎金，獎金從第111人開始計算
         111-132人：每人100元
         133人以上：每人200元
         舉例：134人 = (111-132) 22人×100元 + (133-134) 2人×200元 = 2200 + 400 = 2600元
         """
-        if person_count < 110:
-            return 0
-        
-        bonus = 0
-        
-        # 111-132人，每人100元
-        if person_count >= 110:
-            tier1_start = 111
-            tier1_end = min(person_count, 132)
-            if tier1_end >= tier1_start:
-                tier1_count = tier1_end - tier1_start + 1
-                bonus += tier1_count * 100
-        
-        # 133人以上，每人200元
-        if person_count > 132:
-            tier2_count = person_count - 132
-            bonus += tier2_count * 200
-        
-        return bonus
+        return self.rules.person_count_bonus(person_count)
     
     def calculate_charge_target_bonus(self, personal_performance, therapist_id, mask_sales):
         """計算充值目標達成獎
@@ -200,25 +316,21 @@ class AutoSalaryCalculator:
         - 業績30萬 + 面膜7組 → 7000元
         - 面膜不到7組則無獎金
         """
-        bonus = 0
+        mask_min = self.rules.mask_sales_min
         
         # 獲取該淨膚師的水光面膜銷售數量
         mask_count = mask_sales.get(str(therapist_id), 0)
         
         # 先檢查面膜銷售責任額（必須7組以上才能有獎金）
-        if mask_count < 7:
-            return 0, f"面膜未達責任額: {mask_count}/7組"
+        if mask_count < mask_min:
+            return 0, f"面膜未達責任額: {mask_count}/{mask_min}組"
         
         # 面膜達標後，檢查業績門檻
-        if personal_performance >= 300000:
-            bonus = 7000  # 30萬業績 + 7組面膜 = 7000元
-            reason = f"業績30萬+面膜{mask_count}組達標"
-        elif personal_performance >= 250000:
-            bonus = 2000  # 25萬業績 + 7組面膜 = 2000元  
-            reason = f"業績25萬+面膜{mask_count}組達標"
-        else:
-            return 0, f"業績未達25萬門檻: {personal_performance:,.0f}元"
+        threshold, bonus = self.rules.charge_target_tier(personal_performance)
+        if threshold is None:
+            return 0, f"業績未達{format_wan(self.rules.charge_thresholds[0])}門檻: {personal_performance:,.0f}元"
         
+        reason = f"業績{format_wan(threshold)}+面膜{mask_count}組達標"
         return bonus, reason
     
     def calculate_consumption_bonus(self, personal_consumption, total_consumption):
@@ -230,54 +342,54 @@ class AutoSalaryCalculator:
         bonus = 0
         reason = ""
         
-        if personal_consumption >= 200000:
-            # 20萬消耗：個人消耗的2.5%
-            bonus = int(personal_consumption * 0.025)
-            reason = f"消耗20萬達標，可抽個人消耗{personal_consumption:,.0f}元的2.5%"
-        elif personal_consumption >= 180000:
-            # 18萬消耗：個人消耗的1.5%
-            bonus = int(personal_consumption * 0.015)
-            reason = f"消耗18萬達標，可抽個人消耗{personal_consumption:,.0f}元的1.5%"
+        threshold, rate = self.rules.consumption_tier(personal_consumption)
+        if threshold is not None:
+            bonus = int(personal_consumption * rate)
+            reason = f"消耗{format_wan(threshold)}達標，可抽個人消耗{personal_consumption:,.0f}元的{rate * 100:g}%"
         else:
-            reason = f"消耗未達18萬門檻: {personal_consumption:,.0f}元"
+            reason = f"消耗未達{format_wan(self.rules.consumption_thresholds[0])}門檻: {personal_consumption:,.0f}元"
         
         return bonus, reason
     
-    def calculate_dual_target_bonus(self, personal_consumption, personal_performance, mask_sales, therapist_id, total_consumption):
+    def calculate_dual_target_bonus(self, personal_consumption, personal_performance, mask_sales, therapist_id, total_consumption,
+                                    charge_bonus=None, consumption_bonus=None):
         """計算消耗充值雙達標獎
         必須同時達成以下兩個條件：
         1. 充值目標達成獎：業績25萬+ AND 面膜7組+
         2. 個人消耗獎勵：消耗18萬+
         同時達成才能獲得2000元雙達標獎
+        charge_bonus / consumption_bonus 已計算過時可直接傳入，不再重算
         """
         bonus = 0
         reason = ""
         
         # 檢查充值目標達成獎條件
         mask_count = mask_sales.get(str(therapist_id), 0)
-        charge_bonus, charge_reason = self.calculate_charge_target_bonus(personal_performance, therapist_id, mask_sales)
+        if charge_bonus is None:
+            charge_bonus, _ = self.calculate_charge_target_bonus(personal_performance, therapist_id, mask_sales)
         
         # 檢查個人消耗獎勵條件
-        consumption_bonus, consumption_reason = self.calculate_consumption_bonus(personal_consumption, total_consumption)
+        if consumption_bonus is None:
+            consumption_bonus, _ = self.calculate_consumption_bonus(personal_consumption, total_consumption)
         
         # 只有兩個條件都達成才能獲得雙達標獎
         charge_qualified = charge_bonus > 0  # 充值目標達成獎有獎金
         consumption_qualified = consumption_bonus > 0  # 個人消耗獎勵有獎金
         
         if charge_qualified and consumption_qualified:
-            bonus = 2000
+            bonus = self.rules.dual_target_bonus
             reason = "充值目標+個人消耗雙達標"
         else:
             missing = []
             if not charge_qualified:
-                if mask_count < 7:
-                    missing.append(f"面膜未達7組({mask_count}組)")
-                elif personal_performance < 250000:
-                    missing.append(f"業績未達25萬({personal_performance:,.0f}元)")
+                if mask_count < self.rules.mask_sales_min:
+                    missing.append(f"面膜未達{self.rules.mask_sales_min}組({mask_count}組)")
+                elif personal_performance < self.rules.charge_thresholds[0]:
+                    missing.append(f"業績未達{format_wan(self.rules.charge_thresholds[0])}({personal_performance:,.0f}元)")
                 else:
                     missing.append("充值目標未達成")
             if not consumption_qualified:
-                missing.append(f"消耗未達18萬({personal_consumption:,.0f}元)")
+                missing.append(f"消耗未達{format_wan(self.rules.consumption_thresholds[0])}({personal_consumption:,.0f}元)")
             reason = f"未達雙標準: {', '.join(missing)}"
         
         return bonus, reason
@@ -294,21 +406,37 @@ class AutoSalaryCalculator:
         """
         return product_sales_total, "產品銷售供獎累計"
     
+    def summary_columns(self, df, start_row=14):
+        """月報表彙整的欄位對應，同一個 df 只掃描一次表頭
+        缺少必要欄位或版面與表頭不符時拋出 summary_columns.MissingColumnError
+        """
+        cached = self._summary_columns
+        if cached is not None and cached[0] is df:
+            return cached[1]
+
+        columns = build_summary_columns(df, start_row=start_row, strict=self.strict_columns)
+        self._summary_columns = (df, columns)
+        print(f"🧭 欄位對應: {columns.describe()}")
+        if columns.assumed:
+            print(f"⚠️  以下欄位沒有表頭，沿用原本欄號: {', '.join(columns.assumed)}")
+        return columns
+
     def preview_employee_data(self, df):
         """預覽員工數據"""
         print("\n👥 員工數據預覽 (A14-A17):")
         print("-" * 70)
         
+        columns = self.summary_columns(df)
         for i, row in enumerate([14, 15, 16, 17], 1):
             try:
-                name = df.iloc[row-1, 0]  # A行
-                personal_performance = df.iloc[row-1, 1]  # B行
-                person_count = df.iloc[row-1, 3]  # D行
-                skill_bonus = df.iloc[row-1, 22]  # W行
+                name = columns.value(df, row, 'name')
+                personal_performance = columns.value(df, row, 'personal_performance')
+                person_count = columns.value(df, row, 'person_count')
+                skill_bonus = columns.value(df, row, 'skill_bonus_total')
                 
-                personal_performance = personal_performance if pd.notna(personal_performance) else 0
-                person_count = person_count if pd.notna(person_count) else 0
-                skill_bonus = skill_bonus if pd.notna(skill_bonus) else 0
+                personal_performance = personal_performance if _notna(personal_performance) else 0
+                person_count = person_count if _notna(person_count) else 0
+                skill_bonus = skill_bonus if _notna(skill_bonus) else 0
                 
                 print(f"行號 {row}: {name}")
                 print(f"  個人業績: {personal_performance:,.0f} 元, 人次: {person_count:.0f}, 手技獎金: {skill_bonus:,.0f} 元")
@@ -317,53 +445,111 @@ class AutoSalaryCalculator:
         
         print("-" * 70)
     
+    @profiled_stage('employee_data', rows=len)
     def get_employee_data(self, df, employee_rows):
-        """獲取員工數據"""
+        """獲取員工數據（欄位依表頭標籤對應，見 summary_columns）"""
         employees = []
+        # 缺少必要欄位時直接拋出錯誤，不以 0 計算
+        columns = self.summary_columns(df, start_row=min(employee_rows, default=14))
         
         for row in employee_rows:
             try:
-                # 獲取員工姓名 (A行)
-                name = df.iloc[row-1, 0]  # 轉換為0-indexed
-                
-                # 獲取個人業績 (B行)
-                personal_performance = df.iloc[row-1, 1]  # B列是第2列 (0-indexed: 1)
-                
-                # 獲取個人消耗 (C行)
-                personal_consumption = df.iloc[row-1, 2]  # C列是第3列 (0-indexed: 2)
+                # 姓名、個人業績、個人消耗、人次總數（標準版面為 A、B、C、D 欄）
+                name = columns.value(df, row, 'name')
+                personal_performance = columns.value(df, row, 'personal_performance')
+                personal_consumption = columns.value(df, row, 'personal_consumption')
+                person_count = columns.value(df, row, 'person_count')
                 
-                # 獲取人次總數 (D行)
-                person_count = df.iloc[row-1, 3]  # D列是第4列 (0-indexed: 3)
+                # 新客實際成交率（I 欄）
+                new_customer_rate = columns.value(df, row, 'new_customer_rate')
                 
-                # 獲取新客實際成交率 (I行)
-                new_customer_rate = df.iloc[row-1, 8]  # I列是第9列 (0-indexed: 8)
-                
-                # 獲取進階課程工獎 (V行)
-                advanced_course_bonus = df.iloc[row-1, 21]  # V列是第22列 (0-indexed: 21)
-                
-                # 獲取手計供獎累計 (W行)
-                skill_bonus_total = df.iloc[row-1, 22]  # W列是第23列 (0-indexed: 22)
-                
-                # 獲取產品銷售供獎 (X行)
-                product_sales_bonus = df.iloc[row-1, 23]  # X列是第24列 (0-indexed: 23)
+                # 進階課程工獎、手技供獎累計、產品銷售供獎（V、W、X 欄）
+                advanced_course_bonus = columns.value(df, row, 'advanced_course_bonus')
+                skill_bonus_total = columns.value(df, row, 'skill_bonus_total')
+                product_sales_bonus = columns.value(df, row, 'product_sales_bonus')
                 
                 employees.append({
                     'name': name,
-                    'personal_performance': personal_performance if pd.notna(personal_performance) else 0,
-                    'personal_consumption': personal_consumption if pd.notna(personal_consumption) else 0,
-                    'person_count': person_count if pd.notna(person_count) else 0,
-                    'new_customer_rate': new_customer_rate if pd.notna(new_customer_rate) else 0,
-                    'advanced_course_bonus': advanced_course_bonus if pd.notna(advanced_course_bonus) else 0,
-                    'skill_bonus_total': skill_bonus_total if pd.notna(skill_bonus_total) else 0,
-                    'product_sales_bonus': product_sales_bonus if pd.notna(product_sales_bonus) else 0,
+                    'personal_performance': personal_performance if _notna(personal_performance) else 0,
+                    'personal_consumption': personal_consumption if _notna(personal_consumption) else 0,
+                    'person_count': person_count if _notna(person_count) else 0,
+                    'new_customer_rate': new_customer_rate if _notna(new_customer_rate) else 0,
+                    'advanced_course_bonus': advanced_course_bonus if _notna(advanced_course_bonus) else 0,
+                    'skill_bonus_total': skill_bonus_total if _notna(skill_bonus_total) else 0,
+                    'product_sales_bonus': product_sales_bonus if _notna(product_sales_bonus) else 0,
                     'row': row
                 })
                 
             except Exception as e:
                 print(f"❌ 獲取第{row}行員工數據時發生錯誤: {e}")
-                
+
         return employees
 
+    def get_employee_records(self, df, employee_rows):
+        """獲取員工數據（Employee 紀錄），季獎金與薪水計算方式與 dict 相同，佔用記憶體較少"""
+        return employees_from_dicts(self.get_employee_data(df, employee_rows))
+
+    def read_monthly_target(self, df):
+        """當月目標（月報表彙整 E23），沒有填寫或不是數字時為 0"""
+        if df.shape[0] < 23 or df.shape[1] < 5:
+            return 0
+        value = df.iat[22, 4]
+        try:
+            return float(value) if _notna(value) else 0
+        except (TypeError, ValueError):
+            return 0
+
+    def read_activity_product_counts(self, df):
+        """公司特別計算項目：活動產品組數（月報表彙整第2-12行，W欄姓名、Z欄組數）
+
+        姓名去除開頭的「1.」與結尾的「(儲)」等職別標示，回傳 {姓名: 組數}
+        """
+        counts = {}
+        if df.shape[1] <= 25:
+            return counts
+        for row_index in range(1, min(12, df.shape[0])):
+            name = df.iat[row_index, 22]
+            if not _notna(name) or not str(name).strip():
+                continue
+            name = _clean_role_name(name)
+            if name:
+                count = df.iat[row_index, 25]
+                try:
+                    counts[name] = float(count) if _notna(count) else 0
+                except (TypeError, ValueError):
+                    counts[name] = 0
+        return counts
+
+    def get_role_employee_data(self, df, employee_rows, mask_sales=None, employees=None):
+        """四職別計算用的員工數據：get_employee_data 的欄位 + VIP升單率、預約率、活動產品組數
+
+        VIP升單率 / 預約率 以表頭標籤對應，月報表沒有該欄時為 NaN
+        活動產品組數取自 W/Z 欄的公司特別計算項目；月報表沒有這張表時改用日期工作表統計的水光面膜組數
+        （淨膚師編號與 calculate_seasonal_bonus 相同，以員工行號 - 11 推算）
+        """
+        if employees is None:
+            employees = self.get_employee_data(df, employee_rows)
+        columns = self.summary_columns(df, start_row=min(employee_rows, default=14))
+        activity_counts = self.read_activity_product_counts(df)
+
+        role_employees = []
+        for employee in employees:
+            employee = dict(employee)
+            row = employee['row']
+            for field in ('vip_upgrade_rate', 'appointment_rate'):
+                if field in columns:
+                    value = columns.value(df, row, field)
+                    employee[field] = value if _notna(value) else 0
+                else:
+                    employee[field] = float('nan')
+            if activity_counts:
+                employee['activity_product_count'] = activity_counts.get(_clean_role_name(employee['name']), 0)
+            else:
+                employee['activity_product_count'] = (mask_sales or {}).get(str(row - 11), 0)
+            role_employees.append(employee)
+        return role_employees
+
+    @profiled_stage('seasonal_bonus', rows=len)
     def calculate_seasonal_bonus(self, employees, mask_sales, total_consumption):
         """計算季獎金 - 包含所有六個季獎金細項"""
         print("\n🎉 正在計算季獎金...")
@@ -394,7 +580,9 @@ class AutoSalaryCalculator:
                 employee['personal_performance'],
                 mask_sales,
                 therapist_id,
-                total_consumption
+                total_consumption,
+                charge_bonus=charge_target_bonus,
+                consumption_bonus=consumption_bonus
             )
             
             # 5. 進階課程工獎
@@ -433,15 +621,9 @@ class AutoSalaryCalculator:
             # 顯示各項季獎金
             print(f"      📈 人次激勵獎金: {person_count_bonus:,}元", end="")
             if person_count_bonus > 0:
-                if employee['person_count'] > 132:
-                    tier1_count = 132 - 111 + 1
-                    tier2_count = employee['person_count'] - 132
-                    print(f" (111-132人: {tier1_count}×100 + 133-{employee['person_count']:.0f}人: {tier2_count}×200)")
-                elif employee['person_count'] >= 110:
-                    tier1_count = employee['person_count'] - 111 + 1
-                    print(f" (111-{employee['person_count']:.0f}人: {tier1_count:.0f}×100)")
-                else:
-                    print()
+                tiers = [f"{start}-{tier_end:.0f}人: {count:.0f}×{rate}"
+                         for start, tier_end, count, rate in self.rules.person_count_tiers(employee['person_count'])]
+                print(f" ({' + '.join(tiers)})")
             else:
                 print()
             
@@ -469,6 +651,7 @@ class AutoSalaryCalculator:
         
         return employees
 
+    @profiled_stage('team_bonus')
     def calculate_team_bonus(self, num_formal_staff, total_performance, total_consumption):
         """計算團獎"""
         if num_formal_staff not in self.team_bonus_rules:
@@ -499,8 +682,11 @@ class AutoSalaryCalculator:
         print(f"✅ 達到團獎條件！每位正式淨膚師可獲得 {bonus_amount:,} 元團獎")
         return bonus_amount
     
+    @profiled_stage('salary', rows=len)
     def calculate_salary(self, employees, team_bonus_per_person, formal_staff_positions):
-        """計算薪水"""
+        """計算薪水
+        employees 為 Employee 紀錄時回傳 SalaryResult 紀錄，為 dict 時回傳 dict
+        """
         results = []
         
         for employee in employees:
@@ -549,10 +735,20 @@ class AutoSalaryCalculator:
                 'is_formal_staff': is_formal_staff
             }
             
-            results.append(result)
+            results.append(SalaryResult.from_dict(result) if isinstance(employee, Employee) else result)
         
         return results
     
+    @profiled_stage('salary_frame', rows=len)
+    def calculate_salary_frame(self, employee_frame):
+        """欄位式批次計算薪水（季獎金 + 薪水一次完成）
+        employee_frame 可包含多間分店的員工，欄位說明見 salary_engine
+        結果與 calculate_seasonal_bonus + calculate_salary 相同
+        """
+        from salary_engine import compute_salary_frame
+
+        return compute_salary_frame(self, employee_frame)
+    
     def print_results(self, results, total_performance, total_consumption):
         """輸出結果"""
         print("\n" + "="*70)
@@ -637,36 +833,36 @@ class AutoSalaryCalculator:
         """
         bonus = 0
         reason = ""
+        min_person_count = self.rules.new_customer_min_person_count
+        min_rate = self.rules.new_customer_min_rate
         
         # 檢查人次是否達132人
-        person_count_ok = person_count >= 132
+        person_count_ok = person_count >= min_person_count
         
         # 檢查新客成交率是否達70%（0.7）
-        # I行的數據可能是百分比格式或小數格式，需要處理
-        if new_customer_rate > 1:
-            # 如果大於1，假設是百分比格式（如70表示70%）
-            actual_rate = new_customer_rate / 100
-        else:
-            # 如果小於等於1，假設是小數格式（如0.7表示70%）
-            actual_rate = new_customer_rate
+        # I行的數據可能是百分比格式（如70表示70%）或小數格式（如0.7表示70%）
+        actual_rate = self.rules.normalize_rate(new_customer_rate)
         
-        rate_ok = actual_rate >= 0.7
+        rate_ok = actual_rate >= min_rate
         
         if person_count_ok and rate_ok:
-            bonus = 4000
+            bonus = self.rules.new_customer_bonus
             reason = f"人次{person_count:.0f}人+成交率{actual_rate*100:.1f}%達標（需人工檢查出勤狀況）"
         else:
             missing = []
             if not person_count_ok:
-                missing.append(f"人次{person_count:.0f}/132人")
+                missing.append(f"人次{person_count:.0f}/{min_person_count}人")
             if not rate_ok:
-                missing.append(f"成交率{actual_rate*100:.1f}%/70%")
+                missing.append(f"成交率{actual_rate*100:.1f}%/{min_rate*100:g}%")
             reason = f"未達標準: {', '.join(missing)}"
         
         return bonus, reason
     
-    def safe_read_excel(self, file_path, **kwargs):
-        """安全讀取 Excel 檔案，處理 OLE2 compound document 錯誤"""
+    def safe_read_excel(self, file_path, backend='pandas', **kwargs):
+        """安全讀取 Excel 檔案，處理 OLE2 compound document 錯誤
+        backend='streaming' 時只串流擷取 sheet_name 指定的日期工作表，
+        回傳 DailySheetData（E3、E5、水光面膜銷售行）而不是 DataFrame
+        """
         try:
             file_path = str(file_path)
             if not os.path.exists(file_path):
@@ -674,6 +870,19 @@ class AutoSalaryCalculator:
             
             file_ext = Path(file_path).suffix.lower()
             
+            if backend == 'streaming' and file_ext != '.xls':
+                from openpyxl import load_workbook
+
+                from workbook_session import stream_daily_sheet
+                
+                workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+                try:
+                    return stream_daily_sheet(workbook[kwargs['sheet_name']])
+                finally:
+                    workbook.close()
+            
+            import pandas as pd
+
             # 根據副檔名選擇適當的引擎
             if file_ext == '.xlsx':
                 try:
@@ -704,6 +913,7 @@ class AutoSalaryCalculator:
             print(f"❌ 讀取Excel文件時發生錯誤: {e}")
             raise
 
+    @profiled_stage('employee_rows', rows=len)
     def get_dynamic_employee_rows(self, df, start_row=14):
         """動態獲取員工行號，從指定行開始，連續遇到多個空行才停止
 
@@ -715,6 +925,7 @@ class AutoSalaryCalculator:
         employee_rows = []
         row = start_row
         consecutive_zeros = 0  # 連續遇到0的次數
+        columns = self.summary_columns(df, start_row=start_row)
 
         print(f"🔍 動態搜尋員工數據（從第{start_row}行開始）...")
 
@@ -724,16 +935,16 @@ class AutoSalaryCalculator:
         while row <= max_row:
             try:
                 # 檢查B行的值（個人業績）
-                b_value = df.iloc[row-1, 1] if df.shape[1] > 1 else None
+                b_value = columns.value(df, row, 'personal_performance')
 
                 # 檢查A行是否有員工姓名
-                a_value = df.iloc[row-1, 0] if df.shape[0] >= row else None
+                a_value = columns.value(df, row, 'name') if df.shape[0] >= row else None
 
                 print(f"   第{row}行檢查: A='{a_value}' B='{b_value}'")
 
                 # 檢查B行是否為數字
                 try:
-                    b_numeric = float(b_value) if pd.notna(b_value) else 0
+                    b_numeric = float(b_value) if _notna(b_value) else 0
                 except (ValueError, TypeError):
                     # B行為文字（可能是表頭），跳過這行
                     print(f"   第{row}行 B列為文字 '{b_value}'，跳過")
@@ -754,7 +965,7 @@ class AutoSalaryCalculator:
                     consecutive_zeros = 0
 
                 # 檢查A行是否有有效的員工姓名
-                if pd.notna(a_value) and str(a_value).strip():
+                if _notna(a_value) and str(a_value).strip():
                     a_str = str(a_value).strip()
 
                     # 排除純數字的姓名（如「4」「5」「6」）
@@ -792,7 +1003,10 @@ def main():
     print("🏢 淨膚寶薪水計算小程式 - 自動化版本（含季獎金）")
     print("="*60)
     
+    from extraction_cache import ExtractionCache
+
     calculator = AutoSalaryCalculator()
+    calculator.extraction_cache = ExtractionCache()
     
     # 獲取Excel文件路徑
     excel_file = calculator.get_excel_file_path()
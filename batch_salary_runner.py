@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 多店批次計算（非互動）
+一次處理多間店的月報表，以多個行程平行計算後輸出一份合併結果
+
+使用方式:
+    python batch_salary_runner.py --input ~/skinbar_report --config stores.json --output 202506.xlsx
+    python batch_salary_runner.py ... --report 202506_報表.xlsx         # 連鎖薪資報表（每店一張 + 全店總覽）
+    python batch_salary_runner.py ... --parquet ~/skinbar_report/parquet     # 另外匯出 Parquet（見 payroll_export）
+    python batch_salary_runner.py ... --snapshot-dir ~/skinbar_report/snapshots  # 另外寫出擷取結果快照（見 workbook_snapshot）
+    python batch_salary_runner.py --input "~/skinbar_report/snapshots/*.snap" ...  # 以快照重新計算，不讀取 Excel
+    python batch_salary_runner.py ... --history ~/skinbar_report/payroll_history.sqlite  # 寫入薪資歷史（見 payroll_history）
+    python batch_salary_runner.py ... --workers 40 --max-memory 512   # 每個子行程最多再使用 512 MB（有限記憶體模式）
+
+設定檔 (JSON) 以檔名（不含副檔名）對應各店設定:
+    {
+        "default": {"employee_start_row": 14},
+        "stores": {
+            "skinbar_daan202506": {"formal_staff_rows": [14, 15, 16], "num_formal_staff": 3}
+        }
+    }
+num_formal_staff 未填時使用 formal_staff_rows 的人數；
+多個月份共用同一份設定時可用不含年月的店名（例如 "skinbar_daan"）
+
+另外設定 roles（職別 → 員工行號）時，結果多一份四職別薪資 role_results（見 role_engine），
+正式淨膚師、實習淨膚師、儲備店長、正式店長的計算方式與前端相同，未填 formal_staff_rows 時以 roles 的正式淨膚師為準:
+    "skinbar_daan": {"roles": {"正式淨膚師": [14, 15, 16], "實習淨膚師": [17], "儲備店長": [18], "正式店長": [19]}}
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from auto_salary_calculator import AutoSalaryCalculator
+from extraction_cache import ExtractionCache
+from incremental_extraction import IncrementalSheetStore
+from payroll_export import split_store_month
+from role_engine import FORMAL, ROLE_RESULT_FIELDS, assign_roles, calculate_all
+from salary_engine import employees_to_frame, frame_to_results
+from stage_profiler import StageProfiler
+from workbook_snapshot import SNAPSHOT_SUFFIX, is_snapshot
+
+
+def find_workbooks(input_path):
+    """找出要計算的月報表，input_path 可以是資料夾或 glob 樣式
+    資料夾內沒有 skinbar*.xlsx 時改找快照（skinbar*.snap）
+    """
+    input_path = os.path.expanduser(str(input_path))
+    if os.path.isdir(input_path) and not is_snapshot(input_path):
+        pattern = os.path.join(input_path, 'skinbar*.xlsx')
+        if not glob.glob(pattern):
+            pattern = os.path.join(input_path, f'skinbar*{SNAPSHOT_SUFFIX}')
+    else:
+        pattern = input_path
+    # 排除 Excel 開啟中產生的暫存檔
+    files = [f for f in glob.glob(pattern) if not os.path.basename(f).startswith('~$')]
+    return sorted(files)
+
+
+def load_store_config(config_path):
+    """讀取各店設定檔"""
+    with open(os.path.expanduser(str(config_path)), encoding='utf-8') as f:
+        config = json.load(f)
+    return config.get('default', {}), config.get('stores', {})
+
+
+def resolve_store_config(excel_file, defaults, stores):
+    """取得單一檔案的設定：先以檔名對應，再以不含年月的店名（多個月份共用），最後以所在資料夾名稱對應"""
+    path = Path(excel_file)
+    store_name = split_store_month(path.stem)[0]
+    for key in (path.stem, path.name, store_name, path.parent.name):
+        if key in stores:
+            store_config = dict(defaults)
+            store_config.update(stores[key])
+            # 共用設定時仍以檔名為店名，保留年月
+            store_config.setdefault('store', path.stem if key == store_name else key)
+            return store_config
+    return None
+
+
+def limit_worker_memory(max_bytes):
+    """子行程啟動時限制之後可再配置的記憶體：RLIMIT_AS = 目前位址空間 + max_bytes
+
+    numpy 載入時保留大量虛擬記憶體（實際用量很少），所以以子行程啟動時的位址空間為基準；
+    超過上限時該店拋出 MemoryError 記為失敗，不會讓整台主機記憶體不足。
+    沒有 resource 模組或 /proc 的系統（Windows、macOS）不限制
+    """
+    if max_bytes is None:
+        return
+    try:
+        import resource
+
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[0]) * resource.getpagesize()
+    except (ImportError, OSError):
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current + int(max_bytes)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def run_store_payroll(excel_file, store_config, backend='streaming', quiet=True, use_cache=True,
+                      incremental=False, rules_path=None, profile_dir=None, snapshot_dir=None,
+                      memory_limit=None):
+    """計算單一店家的薪資（在子行程中執行）
+
+    依序執行 read_excel_data → count_mask_sales → calculate_team_bonus
+    → 季獎金與薪水（欄位式引擎，結果與 calculate_seasonal_bonus + calculate_salary 相同），
+    回傳可序列化的結果 dict（employees / results 為 Employee / SalaryResult 紀錄）
+    店家設定有 roles 時另外計算四職別薪資（role_results，結構同前端 calculateAll）
+    profile_dir 有指定時記錄各階段效能（結果的 stages），並輸出 <店名>.prof (cProfile)
+    snapshot_dir 有指定時另外寫出擷取結果快照；excel_file 也可以是快照資料夾（<檔名>.snap）
+    memory_limit (bytes) 有指定時使用有限記憶體模式讀取日期工作表（見 workbook_session）
+    """
+    # excel_file 也可以是有 name 屬性的檔案物件（例如上傳的 BytesIO）
+    file_name = str(getattr(excel_file, 'name', excel_file))
+    store = store_config.get('store') or Path(file_name).stem
+    outcome = {
+        'store': store,
+        'file': file_name,
+        'error': None,
+    }
+
+    log = io.StringIO()
+    output = contextlib.redirect_stdout(log) if quiet else contextlib.nullcontext()
+    try:
+        with output:
+            calculator = AutoSalaryCalculator(rules=rules_path)
+            calculator.excel_backend = backend
+            profile_path = None
+            if profile_dir is not None:
+                calculator.profiler = StageProfiler()
+                profile_path = Path(os.path.expanduser(str(profile_dir))) / f"{store}.prof"
+            if use_cache:
+                calculator.extraction_cache = ExtractionCache()
+            if incremental:
+                calculator.incremental_store = IncrementalSheetStore()
+            calculator.snapshot_dir = snapshot_dir
+            calculator.memory_limit = memory_limit
+
+            with calculator.profiler.profiling(profile_path):
+                roles = store_config.get('roles')
+                if roles and 'formal_staff_rows' not in store_config:
+                    formal_staff_positions = [int(row) for row in roles.get(FORMAL, [])]
+                else:
+                    formal_staff_positions = list(store_config['formal_staff_rows'])
+                num_formal_staff = store_config.get('num_formal_staff', len(formal_staff_positions))
+
+                df, total_performance, total_consumption, date_sheets = calculator.read_excel_data(excel_file)
+                if df is None:
+                    raise ValueError("無法讀取Excel文件")
+
+                mask_sales = calculator.count_mask_sales(excel_file, date_sheets)
+
+                start_row = store_config.get('employee_start_row', 14)
+                employee_rows = calculator.get_dynamic_employee_rows(df, start_row=start_row)
+                if not employee_rows:
+                    raise ValueError("沒有找到任何員工數據")
+
+                employees = calculator.get_employee_records(df, employee_rows)
+                team_bonus_per_person = calculator.calculate_team_bonus(
+                    num_formal_staff, total_performance, total_consumption
+                )
+                employee_frame = employees_to_frame(
+                    employees, mask_sales, formal_staff_positions, team_bonus_per_person
+                )
+                results = frame_to_results(calculator.calculate_salary_frame(employee_frame), records=True)
+
+                role_results = None
+                if roles:
+                    role_employees = assign_roles(
+                        calculator.get_role_employee_data(df, employee_rows, mask_sales, employees), roles
+                    )
+                    role_results = calculate_all(
+                        role_employees, total_performance, total_consumption,
+                        calculator.read_monthly_target(df), rules=calculator.rules,
+                    )
+                calculator.open_workbook(excel_file).close()
+
+        outcome.update({
+            'total_performance': total_performance,
+            'total_consumption': total_consumption,
+            'date_sheets': date_sheets,
+            'mask_sales': mask_sales,
+            'employees': employees,
+            'formal_staff_rows': formal_staff_positions,
+            'num_formal_staff': num_formal_staff,
+            'team_bonus_per_person': team_bonus_per_person,
+            'results': results,
+        })
+        if role_results is not None:
+            outcome['role_results'] = role_results
+        if profile_dir is not None:
+            outcome['stages'] = calculator.profiler.records
+    except MemoryError:
+        outcome['error'] = "MemoryError: 超過子行程記憶體上限 (--max-memory)"
+        outcome['log'] = log.getvalue()
+    except Exception as e:
+        outcome['error'] = f"{type(e).__name__}: {e}"
+        outcome['log'] = log.getvalue()
+
+    return outcome
+
+
+def run_batch(excel_files, defaults, stores, max_workers=None, backend='streaming', use_cache=True,
+              incremental=False, rules_path=None, profile_dir=None, snapshot_dir=None, max_memory=None):
+    """以 ProcessPoolExecutor 平行計算多間店，回傳依檔名排序的結果列表
+    max_memory (bytes) 有指定時每個子行程限制記憶體，並以有限記憶體模式讀取日期工作表
+    """
+    outcomes = []
+    jobs = []
+    for excel_file in excel_files:
+        store_config = resolve_store_config(excel_file, defaults, stores)
+        if store_config is None or not ('formal_staff_rows' in store_config or store_config.get('roles')):
+            outcomes.append({
+                'store': Path(excel_file).stem,
+                'file': str(excel_file),
+                'error': "設定檔中沒有此店的 formal_staff_rows 或 roles",
+            })
+            continue
+        jobs.append((excel_file, store_config))
+
+    # 最大的檔案先送出，整批完成時間接近最大檔案的解析時間
+    jobs.sort(key=lambda job: os.path.getsize(job[0]), reverse=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=limit_worker_memory,
+                             initargs=(max_memory,)) as executor:
+        futures = {
+            executor.submit(run_store_payroll, excel_file, store_config, backend=backend,
+                            use_cache=use_cache, incremental=incremental, rules_path=rules_path,
+                            profile_dir=profile_dir, snapshot_dir=snapshot_dir,
+                            memory_limit=max_memory): excel_file
+            for excel_file, store_config in jobs
+        }
+        for future in as_completed(futures):
+            outcome = future.result()
+            status = "❌" if outcome['error'] else "✅"
+            print(f"{status} {outcome['store']}: {outcome['error'] or '計算完成'}")
+            outcomes.append(outcome)
+
+    outcomes.sort(key=lambda outcome: outcome['file'])
+    return outcomes
+
+
+def print_slowest_sheets(outcomes, limit=10):
+    """顯示所有分店中最耗時的工作表（需以 --profile 執行）"""
+    records = [
+        (outcome['store'], record)
+        for outcome in outcomes
+        for record in outcome.get('stages', [])
+        if record['sheet'] is not None
+    ]
+    records.sort(key=lambda item: item[1]['wall_time'], reverse=True)
+    if records:
+        print("\n🐢 最耗時的工作表:")
+    for store, record in records[:limit]:
+        print(f"   {store} {record['stage']} {record['sheet']}: {record['wall_time'] * 1000:.1f} ms"
+              f"（{record['rows'] or 0:,} 行）")
+
+
+def json_default(value):
+    """numpy 數值轉成 Python 原生型別、紀錄轉成 dict 後再輸出 JSON"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def write_consolidated(outcomes, output_path):
+    """輸出合併結果，依副檔名決定格式（.json / .csv / .xlsx）"""
+    import pandas as pd
+
+    output_path = Path(os.path.expanduser(str(output_path)))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if output_path.suffix.lower() == '.json':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(outcomes, f, ensure_ascii=False, indent=2, default=json_default)
+        return output_path
+
+    detail_rows = []
+    summary_rows = []
+    role_rows = []
+    for outcome in outcomes:
+        summary_rows.append({
+            'store': outcome['store'],
+            'file': outcome['file'],
+            'total_performance': outcome.get('total_performance'),
+            'total_consumption': outcome.get('total_consumption'),
+            'num_formal_staff': outcome.get('num_formal_staff'),
+            'team_bonus_per_person': outcome.get('team_bonus_per_person'),
+            'total_salary': sum(r['total_salary'] for r in outcome.get('results', [])),
+            'error': outcome['error'],
+        })
+        for result in outcome.get('results', []):
+            detail_rows.append({'store': outcome['store'], **result})
+        for role_key in ROLE_RESULT_FIELDS:
+            for result in (outcome.get('role_results') or {}).get(role_key, []):
+                row = {'store': outcome['store'], **result}
+                if 'failed_metrics' in row:
+                    row['failed_metrics'] = '、'.join(row['failed_metrics'])
+                role_rows.append(row)
+
+    detail_df = pd.DataFrame(detail_rows)
+    summary_df = pd.DataFrame(summary_rows)
+
+    if output_path.suffix.lower() == '.csv':
+        detail_df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    else:
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            detail_df.to_excel(writer, sheet_name='薪資明細', index=False)
+            summary_df.to_excel(writer, sheet_name='各店總覽', index=False)
+            if role_rows:
+                pd.DataFrame(role_rows).to_excel(writer, sheet_name='四職別薪資', index=False)
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - 多店批次計算")
+    parser.add_argument('--input', required=True, help="月報表資料夾或 glob 樣式（預設搜尋 skinbar*.xlsx，沒有時搜尋 skinbar*.snap）")
+    parser.add_argument('--config', required=True, help="各店設定檔 (JSON)")
+    parser.add_argument('--output', required=True, help="合併結果輸出路徑 (.xlsx / .csv / .json)")
+    parser.add_argument('--workers', type=int, default=None, help="平行行程數（預設為 CPU 核心數）")
+    parser.add_argument('--backend', choices=['pandas', 'streaming'], default='streaming',
+                        help="日期工作表讀取方式")
+    parser.add_argument('--no-cache', action='store_true', help="不使用擷取結果快取，每次重新解析")
+    parser.add_argument('--incremental', action='store_true',
+                        help="月中進度追蹤：只解析新增或變動的日期工作表")
+    parser.add_argument('--rules', default=None, help="獎金規則檔 (JSON)，預設 salary_rules.json")
+    parser.add_argument('--report', default=None,
+                        help="另外輸出連鎖薪資報表 (.xlsx)：每店一張薪資明細 + 全店總覽")
+    parser.add_argument('--parquet', default=None, metavar='DIR',
+                        help="另外匯出 Parquet 資料集（依分店 / 月份分區，需要 pyarrow）")
+    parser.add_argument('--month', default=None, help="Parquet 分區的年月（例如 202506），未指定時由檔名判斷")
+    parser.add_argument('--profile', default=None, metavar='DIR',
+                        help="記錄各店各階段效能，並把 cProfile 結果輸出到此資料夾")
+    parser.add_argument('--snapshot-dir', default=None, metavar='DIR',
+                        help="另外寫出擷取結果快照 (<檔名>.snap)，之後可用 --input 直接重新計算")
+    parser.add_argument('--history', default=None, metavar='DB',
+                        help="把計算結果與輸入寫入薪資歷史資料庫 (SQLite，只新增不修改)")
+    parser.add_argument('--max-memory', type=int, default=None, metavar='MB',
+                        help="每個子行程最多再使用的記憶體 (MB)，並只解析日期工作表需要的欄位、過大時逐列讀取")
+    args = parser.parse_args(argv)
+
+    excel_files = find_workbooks(args.input)
+    if not excel_files:
+        print(f"❌ 找不到任何月報表: {args.input}")
+        return 1
+    print(f"📁 找到 {len(excel_files)} 個月報表")
+
+    defaults, stores = load_store_config(args.config)
+    outcomes = run_batch(excel_files, defaults, stores, max_workers=args.workers, backend=args.backend,
+                         use_cache=not args.no_cache, incremental=args.incremental, rules_path=args.rules,
+                         profile_dir=args.profile, snapshot_dir=args.snapshot_dir,
+                         max_memory=args.max_memory * 1024 * 1024 if args.max_memory else None)
+
+    output_path = write_consolidated(outcomes, args.output)
+    failed = [outcome for outcome in outcomes if outcome['error']]
+    print(f"\n💾 合併結果已輸出: {output_path}")
+    if args.report:
+        from salary_report import write_chain_report
+
+        report_path = Path(os.path.expanduser(args.report))
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        write_chain_report(outcomes, report_path)
+        print(f"💾 連鎖薪資報表已輸出: {report_path}")
+    if args.parquet:
+        from payroll_export import write_parquet_dataset
+
+        try:
+            written = write_parquet_dataset(outcomes, args.parquet, month=args.month)
+            print(f"💾 Parquet 已匯出: {args.parquet}（薪水結果 {written['results']:,} 筆）")
+        except (ImportError, ValueError) as e:
+            print(f"❌ Parquet 匯出失敗: {e}")
+    if args.history:
+        from payroll_history import PayrollHistory
+
+        try:
+            with PayrollHistory(args.history) as history:
+                run_ids = history.append_outcomes(outcomes, month=args.month)
+            print(f"💾 已寫入薪資歷史: {args.history}（{len(run_ids)} 間店）")
+        except ValueError as e:
+            print(f"❌ 寫入薪資歷史失敗: {e}")
+    print(f"📊 成功 {len(outcomes) - len(failed)} 間，失敗 {len(failed)} 間")
+    if args.profile:
+        print_slowest_sheets(outcomes)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 效能測試
+以產生的測試月報表分別計時各階段，結果輸出成 JSON，方便在同一台機器上比較不同版本
+
+計時階段:
+    safe_read_excel              舊方式：以 safe_read_excel 逐一讀取月報表彙整與每張日期工作表
+    read_excel_data              月報表彙整 + 各日期工作表 E3/E5
+    count_mask_sales             水光面膜銷售統計
+    get_dynamic_employee_rows    員工行號搜尋
+    get_employee_data            員工數據擷取
+    calculate_seasonal_bonus     季獎金
+    calculate_salary             團獎與薪水
+    report_export                Streamlit 下載報表（salary_report.write_salary_report）
+
+使用方式:
+    python benchmarks/run_benchmarks.py --days 31 --rows 400 --repeat 3 --output bench.json
+    python benchmarks/run_benchmarks.py --workbook skinbar202506.xlsx --compare bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from auto_salary_calculator import AutoSalaryCalculator  # noqa: E402
+from salary_report import write_salary_report  # noqa: E402
+from workbook_generator import generate_workbook  # noqa: E402
+
+STAGES = [
+    'safe_read_excel',
+    'read_excel_data',
+    'count_mask_sales',
+    'get_dynamic_employee_rows',
+    'get_employee_data',
+    'calculate_seasonal_bonus',
+    'calculate_salary',
+    'report_export',
+]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _package_versions():
+    versions = {}
+    for name in ('pandas', 'openpyxl', 'numpy'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def run_pipeline(excel_file, backend='pandas', include_legacy=True, start_row=14):
+    """執行一次完整流程，回傳 {階段: 秒數}
+
+    每次使用新的 AutoSalaryCalculator 且不使用快取，計時的是實際解析 Excel 的時間
+    """
+    timings = {}
+
+    @contextlib.contextmanager
+    def stage(name):
+        started = time.perf_counter()
+        yield
+        timings[name] = time.perf_counter() - started
+
+    # 各階段的輸出很多，計時時不顯示
+    with contextlib.redirect_stdout(io.StringIO()):
+        calculator = AutoSalaryCalculator()
+        calculator.excel_backend = backend
+
+        if include_legacy:
+            with stage('safe_read_excel'):
+                sheet_names = calculator.open_workbook(excel_file).sheet_names
+                calculator.safe_read_excel(excel_file, sheet_name='月報表彙整', header=None)
+                for sheet_name in sheet_names:
+                    if sheet_name != '月報表彙整' and sheet_name[0].isdigit():
+                        calculator.safe_read_excel(excel_file, backend=backend, sheet_name=sheet_name, header=None)
+            # 重新開始，避免上一個階段開啟的 session 影響後續計時
+            calculator = AutoSalaryCalculator()
+            calculator.excel_backend = backend
+
+        with stage('read_excel_data'):
+            df, total_performance, total_consumption, date_sheets = calculator.read_excel_data(excel_file)
+        if df is None:
+            raise ValueError(f"無法讀取測試月報表: {excel_file}")
+
+        with stage('count_mask_sales'):
+            mask_sales = calculator.count_mask_sales(excel_file, date_sheets)
+
+        with stage('get_dynamic_employee_rows'):
+            employee_rows = calculator.get_dynamic_employee_rows(df, start_row=start_row)
+
+        with stage('get_employee_data'):
+            employees = calculator.get_employee_data(df, employee_rows)
+
+        with stage('calculate_seasonal_bonus'):
+            employees = calculator.calculate_seasonal_bonus(employees, mask_sales, total_consumption)
+
+        # 除了最後一位（產生器中的非正式員工）都是正式淨膚師
+        formal_staff_positions = employee_rows[:-1]
+        with stage('calculate_salary'):
+            team_bonus_per_person = calculator.calculate_team_bonus(
+                len(formal_staff_positions), total_performance, total_consumption
+            )
+            results = calculator.calculate_salary(employees, team_bonus_per_person, formal_staff_positions)
+
+        with stage('report_export'):
+            write_salary_report(results, total_performance, total_consumption)
+
+        calculator.open_workbook(excel_file).close()
+
+    return timings
+
+
+def summarize(runs):
+    """每個階段的 min / median / mean 與各次結果"""
+    summary = {}
+    for name in STAGES:
+        values = [run[name] for run in runs if name in run]
+        if values:
+            summary[name] = {
+                'min': min(values),
+                'median': statistics.median(values),
+                'mean': statistics.fmean(values),
+                'runs': values,
+            }
+    return summary
+
+
+def print_report(result, baseline=None):
+    """顯示各階段時間，有基準結果時一併顯示倍數"""
+    baseline_stages = (baseline or {}).get('stages', {})
+    print(f"\n⏱️  各階段時間（取中位數，{result['parameters']['repeat']} 次）")
+    for name, stats in result['stages'].items():
+        line = f"   {name:<28} {stats['median'] * 1000:>10.1f} ms"
+        previous = baseline_stages.get(name)
+        if previous and previous['median'] > 0:
+            ratio = stats['median'] / previous['median']
+            marker = "🔺" if ratio > 1.1 else ("🔻" if ratio < 0.9 else "  ")
+            line += f"   {marker} {ratio:.2f}x（基準 {previous['median'] * 1000:.1f} ms）"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - 效能測試")
+    parser.add_argument('--workbook', default=None, help="使用現有的月報表（未指定時產生測試月報表）")
+    parser.add_argument('--days', type=int, default=31, help="日期工作表數量")
+    parser.add_argument('--rows', type=int, default=200, help="每張日期工作表的交易明細行數")
+    parser.add_argument('--mask-density', type=float, default=0.05, help="含水光面膜的交易比例")
+    parser.add_argument('--employees', type=int, default=8, help="員工人數")
+    parser.add_argument('--seed', type=int, default=0, help="亂數種子")
+    parser.add_argument('--repeat', type=int, default=3, help="重複次數")
+    parser.add_argument('--backend', choices=['pandas', 'streaming'], default='pandas', help="日期工作表讀取方式")
+    parser.add_argument('--skip-legacy', action='store_true', help="不測量 safe_read_excel 逐一讀取（較慢）")
+    parser.add_argument('--output', default='benchmark_results.json', help="結果輸出路徑 (JSON)")
+    parser.add_argument('--compare', default=None, help="與先前的結果 JSON 比較")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.workbook:
+            excel_file = os.path.expanduser(args.workbook)
+        else:
+            excel_file = os.path.join(temp_dir, 'skinbar_bench.xlsx')
+            print(f"🛠️  產生測試月報表: {args.days} 張日期工作表 × {args.rows} 行")
+            generate_workbook(excel_file, days=args.days, rows=args.rows, mask_density=args.mask_density,
+                              employees=args.employees, seed=args.seed)
+
+        runs = []
+        for index in range(args.repeat):
+            runs.append(run_pipeline(excel_file, backend=args.backend, include_legacy=not args.skip_legacy))
+            print(f"   第 {index + 1}/{args.repeat} 次完成，共 {sum(runs[-1].values()):.2f} 秒")
+
+        result = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'packages': _package_versions(),
+            'parameters': {
+                'workbook': args.workbook,
+                'workbook_bytes': os.path.getsize(excel_file),
+                'days': None if args.workbook else args.days,
+                'rows': None if args.workbook else args.rows,
+                'mask_density': None if args.workbook else args.mask_density,
+                'employees': None if args.workbook else args.employees,
+                'seed': None if args.workbook else args.seed,
+                'repeat': args.repeat,
+                'backend': args.backend,
+            },
+            'stages': summarize(runs),
+        }
+
+    baseline = None
+    if args.compare:
+        with open(os.path.expanduser(args.compare), encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output_path = Path(os.path.expanduser(args.output))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 結果已輸出: {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
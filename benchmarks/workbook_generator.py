@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 效能測試用月報表產生器
+產生與實際月報表相同結構的 skinbar*.xlsx:
+- 「月報表彙整」: 第13行表頭，第14行起為員工（A姓名、B業績、C消耗、D人次、I新客成交率、R VIP成交率、
+  V/W/X獎金、Y預約率）；第2-12行 W/Z 欄為活動產品組數，E23 為當月目標（員工 7 人以下時）
+- N 張日期工作表（0601、0602…）: E3 業績、E5 消耗，第21行起為交易明細，
+  F-H 為品項、N 為淨膚師編號（員工行號 - 11）
+
+使用方式:
+    python benchmarks/workbook_generator.py skinbar_bench.xlsx --days 31 --rows 400 --mask-density 0.05
+"""
+
+import argparse
+import random
+
+from openpyxl import Workbook
+
+SUMMARY_HEADER_ROW = 13
+EMPLOYEE_START_ROW = 14
+TRANSACTION_START_ROW = 21
+MASK_PRODUCT = '水光面膜3入'
+OTHER_PRODUCTS = ['保養課程', '深層清潔', '精華液', '保濕霜', '美白療程', '舒緩面膜']
+
+# 「月報表彙整」表頭（欄號從 1 開始）
+SUMMARY_HEADERS = {
+    1: '姓名',
+    2: '個人業績',
+    3: '個人消耗',
+    4: '人次總數',
+    9: '新客實際成交率',
+    18: 'VIP成交率',
+    22: '進階課程工獎',
+    23: '手技供獎累計',
+    24: '產品銷售供獎',
+    25: '預約率',
+}
+
+ACTIVITY_NAME_COLUMN = 23   # W
+ACTIVITY_COUNT_COLUMN = 26  # Z
+MONTHLY_TARGET_ROW = 23     # E23
+
+EMPLOYEE_NAMES = ['王小美', '林小華', '陳大文', '黃小芳', '張雅婷', '李怡君', '吳佩珊', '劉淑芬',
+                  '蔡宜蓁', '楊佳穎', '許雅雯', '鄭美玲', '謝欣怡', '郭靜宜', '洪筱涵', '曾詩涵']
+
+
+def _row(values, width):
+    """把 {欄號: 值} 轉成 write_only 模式 append 用的整列"""
+    row = [None] * width
+    for column, value in values.items():
+        row[column - 1] = value
+    return row
+
+
+def generate_workbook(path, days=31, rows=200, mask_density=0.05, employees=8, month=6, seed=0):
+    """產生測試用月報表
+
+    days: 日期工作表數量
+    rows: 每張日期工作表的交易明細行數
+    mask_density: 交易明細中含水光面膜的比例
+    employees: 員工人數（最多 16 人，最後一位為非正式員工）
+    """
+    rnd = random.Random(seed)
+    # 四職別計算用的欄位另外產生，原本欄位的數值不受影響
+    role_rnd = random.Random(seed + 1)
+    employees = max(1, min(employees, len(EMPLOYEE_NAMES)))
+    workbook = Workbook(write_only=True)
+
+    summary = workbook.create_sheet('月報表彙整')
+    summary_width = max(max(SUMMARY_HEADERS), ACTIVITY_COUNT_COLUMN)
+    for row_number in range(1, SUMMARY_HEADER_ROW):
+        if row_number == 1:
+            summary.append([f"淨膚寶 {month}月 月報表彙整"])
+        elif row_number - 2 < employees:
+            # 公司特別計算項目：活動產品組數
+            index = row_number - 2
+            summary.append(_row({
+                ACTIVITY_NAME_COLUMN: f"{index + 1}.{EMPLOYEE_NAMES[index]}",
+                ACTIVITY_COUNT_COLUMN: role_rnd.randint(0, 12),
+            }, summary_width))
+        else:
+            summary.append([])
+    summary.append(_row(SUMMARY_HEADERS, summary_width))
+    for index in range(employees):
+        formal = index < employees - 1
+        summary.append(_row({
+            1: EMPLOYEE_NAMES[index],
+            2: rnd.choice([160000, 240000, 260000, 310000, rnd.randint(100000, 400000)]) if formal else rnd.randint(1000, 50000),
+            3: rnd.choice([170000, 185000, 210000, rnd.randint(80000, 260000)]),
+            4: rnd.randint(80, 160),
+            9: rnd.choice([0.65, 0.72, 72, rnd.uniform(0.4, 0.9)]),
+            22: rnd.randint(0, 5000),
+            23: rnd.randint(0, 8000),
+            24: rnd.randint(0, 4000),
+            18: role_rnd.choice([0.6, 0.7, 68, role_rnd.uniform(0.4, 0.9)]),
+            25: role_rnd.choice([0.65, 0.75, 80, role_rnd.uniform(0.4, 0.9)]),
+        }, summary_width))
+    # 員工以兩個空白行結束
+    summary.append(_row({2: 0}, summary_width))
+    summary.append(_row({2: 0}, summary_width))
+    last_row = EMPLOYEE_START_ROW + employees + 1
+    if last_row < MONTHLY_TARGET_ROW:
+        for _ in range(last_row + 1, MONTHLY_TARGET_ROW):
+            summary.append([])
+        summary.append(_row({5: role_rnd.choice([1500000, 2000000, 2500000])}, summary_width))
+
+    therapist_ids = [EMPLOYEE_START_ROW + index - 11 for index in range(employees)]
+    for day in range(1, days + 1):
+        sheet = workbook.create_sheet(f"{month:02d}{day:02d}")
+        amounts = [rnd.randint(800, 12000) for _ in range(rows)]
+        sheet.append([f"{month}/{day} 日報表"])
+        sheet.append([])
+        sheet.append(_row({4: '當日業績', 5: sum(amounts)}, 5))
+        sheet.append([])
+        sheet.append(_row({4: '當日消耗', 5: int(sum(amounts) * rnd.uniform(0.6, 0.95))}, 5))
+        for _ in range(6, TRANSACTION_START_ROW - 1):
+            sheet.append([])
+        sheet.append(['時間', '顧客', '', '', '金額', '品項1', '品項2', '品項3',
+                      '', '', '', '', '', '淨膚師'])
+        for index, amount in enumerate(amounts):
+            products = [rnd.choice(OTHER_PRODUCTS) if rnd.random() < 0.6 else None for _ in range(3)]
+            if rnd.random() < mask_density:
+                products[rnd.randrange(3)] = MASK_PRODUCT
+            therapist = rnd.choice(therapist_ids)
+            # 實際檔案中淨膚師編號偶爾是文字或 3.0 形式
+            therapist = rnd.choice([therapist, therapist, str(therapist), f"{therapist}.0"])
+            sheet.append([f"{10 + index % 10}:{index % 60:02d}", f"顧客{rnd.randint(1, 5000)}", None, None,
+                          amount, *products, None, None, None, None, None, therapist])
+
+    workbook.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="產生效能測試用的月報表")
+    parser.add_argument('output', help="輸出路徑（建議以 skinbar 開頭，例如 skinbar_bench.xlsx）")
+    parser.add_argument('--days', type=int, default=31, help="日期工作表數量")
+    parser.add_argument('--rows', type=int, default=200, help="每張日期工作表的交易明細行數")
+    parser.add_argument('--mask-density', type=float, default=0.05, help="含水光面膜的交易比例")
+    parser.add_argument('--employees', type=int, default=8, help="員工人數")
+    parser.add_argument('--seed', type=int, default=0, help="亂數種子")
+    args = parser.parse_args(argv)
+
+    path = generate_workbook(args.output, days=args.days, rows=args.rows, mask_density=args.mask_density,
+                             employees=args.employees, seed=args.seed)
+    print(f"💾 已產生測試月報表: {path}")
+
+
+if __name__ == "__main__":
+    main()
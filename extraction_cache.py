@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 月報表擷取結果快取
+以檔案內容的 SHA-256 與擷取版本 (PARSER_VERSION) 為鍵值，
+把月報表彙整、各日期工作表的 E3/E5 與水光面膜銷售行存到 ~/skinbar_report/.cache，
+同一個檔案再次讀取時直接還原，不需重新解析 Excel
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from workbook_session import PARSER_VERSION, WorkbookSession
+
+DEFAULT_CACHE_DIR = Path.home() / "skinbar_report" / ".cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+DEFAULT_MAX_ENTRIES = 500
+
+
+def file_sha256(source, chunk_size=1024 * 1024):
+    """計算檔案內容的 SHA-256，source 可以是路徑或檔案物件"""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    elif hasattr(source, 'getbuffer'):
+        digest.update(source.getbuffer())
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """磁碟上的擷取結果快取，依最近使用時間 (LRU) 與總容量淘汰"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def key_for(self, source):
+        """快取鍵值：檔案內容 SHA-256 + 擷取版本"""
+        return f"{file_sha256(source)}-v{PARSER_VERSION}"
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def open(self, source, backend='pandas'):
+        """取得工作簿 session：有快取時直接還原，否則回傳尚未讀取的新 session"""
+        key = self.key_for(source)
+        path = self._entry_path(key)
+
+        if path.exists():
+            try:
+                with open(path, 'rb') as f:
+                    state = pickle.load(f)
+                # 更新修改時間作為最近使用紀錄
+                os.utime(path)
+                session = WorkbookSession.from_state(source, state, backend=backend)
+                session.cache_key = key
+                print(f"⚡ 使用快取的擷取結果: {path.name}")
+                return session
+            except Exception as e:
+                print(f"⚠️  快取檔案損毀，重新讀取: {e}")
+                path.unlink(missing_ok=True)
+
+        session = WorkbookSession(source, backend=backend)
+        session.cache_key = key
+        return session
+
+    def save(self, session):
+        """寫入 session 已擷取的內容，並視需要淘汰舊快取"""
+        if session.cache_key is None:
+            session.cache_key = self.key_for(session.source)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(session.cache_key)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'wb') as f:
+            pickle.dump(session.export_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        # 先寫暫存檔再取代，避免多個行程同時寫入時讀到不完整的檔案
+        os.replace(temp_path, path)
+
+        self.evict()
+        return path
+
+    def evict(self):
+        """超過容量或筆數上限時，從最久未使用的快取開始刪除"""
+        if not self.cache_dir.exists():
+            return
+
+        entries = []
+        for path in self.cache_dir.glob('*.pkl'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (total_bytes > self.max_bytes or len(entries) > self.max_entries):
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+
+    def clear(self):
+        """刪除所有快取"""
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob('*.pkl'):
+                path.unlink(missing_ok=True)
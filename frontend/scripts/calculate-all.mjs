@@ -0,0 +1,58 @@
+/**
+ * 以前端的薪資計算（src/lib/salary 的 calculateAll）計算一批輸入，給 Python 的一致性檢查使用
+ * （salary_conformance.py）。
+ *
+ * 輸入（stdin）: [{ employees: EmployeeWithRole[], excelData: ExcelData }, ...]
+ * 輸出（stdout）: CalculationResults[]（順序與輸入相同）
+ *
+ * Node 無法直接執行 .ts，先以專案的 typescript 套件（npm ci 安裝）逐檔轉成 .mjs 再載入。
+ */
+import { createRequire } from 'node:module';
+import { mkdtempSync, readFileSync, readdirSync, rmSync, writeFileSync } from 'node:fs';
+import { tmpdir } from 'node:os';
+import { dirname, join } from 'node:path';
+import { fileURLToPath, pathToFileURL } from 'node:url';
+
+const here = dirname(fileURLToPath(import.meta.url));
+const salaryDir = join(here, '..', 'src', 'lib', 'salary');
+
+function loadTypeScript() {
+  try {
+    return createRequire(import.meta.url)('typescript');
+  } catch {
+    process.stderr.write('找不到 typescript 套件，請先在 frontend 目錄執行 npm ci\n');
+    process.exit(2);
+  }
+}
+
+/** 把 src/lib/salary/*.ts 轉成 outDir 下的 .mjs（相對路徑的 import 加上 .mjs） */
+function transpileSalaryModules(ts, outDir) {
+  for (const file of readdirSync(salaryDir).filter((name) => name.endsWith('.ts'))) {
+    const source = readFileSync(join(salaryDir, file), 'utf8');
+    const { outputText } = ts.transpileModule(source, {
+      fileName: file,
+      compilerOptions: {
+        module: ts.ModuleKind.ESNext,
+        target: ts.ScriptTarget.ES2022,
+        verbatimModuleSyntax: true,
+      },
+    });
+    const rewritten = outputText.replace(
+      /(from\s+['"])(\.{1,2}\/[^'"]+)(['"])/g,
+      (_, head, specifier, tail) => `${head}${specifier}.mjs${tail}`
+    );
+    writeFileSync(join(outDir, file.replace(/\.ts$/, '.mjs')), rewritten);
+  }
+}
+
+const ts = loadTypeScript();
+const outDir = mkdtempSync(join(tmpdir(), 'salary-ts-'));
+try {
+  transpileSalaryModules(ts, outDir);
+  const { calculateAll } = await import(pathToFileURL(join(outDir, 'calculator.mjs')).href);
+  const cases = JSON.parse(readFileSync(0, 'utf8'));
+  const results = cases.map(({ employees, excelData }) => calculateAll(employees, excelData));
+  process.stdout.write(JSON.stringify(results));
+} finally {
+  rmSync(outDir, { recursive: true, force: true });
+}
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 日期工作表增量讀取
+月中每天新增一張日期工作表時，只解析新增或內容有變動的工作表
+
+每張工作表以 xlsx 壓縮檔內對應 XML 與共用字串表 (sharedStrings.xml) 的 CRC32 與大小作為指紋
+（文字儲存格如面膜品名、文字淨膚師編號存在共用字串表，工作表 XML 只存索引），
+指紋與擷取結果 (E3/E5、水光面膜銷售行) 依檔案路徑存在 ~/skinbar_report/.cache/incremental，
+下次讀取時指紋相同的工作表直接沿用，不需重新解析
+"""
+
+import hashlib
+import os
+import pickle
+import posixpath
+import zipfile
+from pathlib import Path
+from xml.etree import ElementTree
+
+from workbook_session import PARSER_VERSION, DailySheetData
+
+DEFAULT_STATE_DIR = Path.home() / "skinbar_report" / ".cache" / "incremental"
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def sheet_fingerprints(source):
+    """讀取 xlsx 內各工作表 XML 的指紋 {工作表名稱: (CRC32, 大小, 共用字串表 CRC32, 共用字串表大小)}
+
+    只讀取壓縮檔目錄與 workbook.xml，不解壓縮工作表內容。
+    不是 xlsx（例如 .xls）時回傳 None。
+    """
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        return None
+
+    with archive:
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        relations = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+
+        targets = {}
+        shared_strings = None
+        for relation in relations.iter(f'{_PKG_REL_NS}Relationship'):
+            target = relation.get('Target')
+            # Target 可能是絕對路徑 (/xl/worksheets/...) 或相對於 xl/ 的路徑
+            if target.startswith('/'):
+                part = target.lstrip('/')
+            else:
+                part = posixpath.normpath(posixpath.join('xl', target))
+            targets[relation.get('Id')] = part
+            if relation.get('Type', '').endswith('/sharedStrings'):
+                shared_strings = part
+
+        parts = {info.filename: info for info in archive.infolist()}
+        # 共用字串表變動時所有工作表的文字內容都可能改變，沒有共用字串表時為 (None, None)
+        shared_info = parts.get(shared_strings)
+        shared_fingerprint = (shared_info.CRC, shared_info.file_size) if shared_info is not None else (None, None)
+        fingerprints = {}
+        for sheet in workbook.iter(f'{_MAIN_NS}sheet'):
+            info = parts.get(targets.get(sheet.get(f'{_REL_NS}id')))
+            if info is not None:
+                fingerprints[sheet.get('name')] = (info.CRC, info.file_size, *shared_fingerprint)
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return fingerprints
+
+
+class IncrementalSheetStore:
+    """依檔案路徑保存各日期工作表的指紋與擷取結果"""
+
+    def __init__(self, state_dir=DEFAULT_STATE_DIR):
+        self.state_dir = Path(state_dir).expanduser()
+
+    def _state_path(self, source):
+        path_key = hashlib.sha1(os.path.abspath(str(source)).encode('utf-8')).hexdigest()
+        return self.state_dir / f"{path_key}.pkl"
+
+    def _load(self, source):
+        path = self._state_path(source)
+        if not path.exists():
+            return {}
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️  增量紀錄損毀，全部重新讀取: {e}")
+            return {}
+        if state.get('parser_version') != PARSER_VERSION:
+            return {}
+        return state.get('sheets', {})
+
+    def restore(self, session):
+        """把指紋未變的日期工作表擷取結果放回 session，回傳 (目前指紋, 沿用的工作表)
+
+        source 不是檔案路徑或不是 xlsx 時不做增量，回傳 (None, [])
+        """
+        if not isinstance(session.source, (str, os.PathLike)):
+            return None, []
+        fingerprints = sheet_fingerprints(session.source)
+        if fingerprints is None:
+            return None, []
+
+        reused = []
+        for sheet_name, (fingerprint, data) in self._load(session.source).items():
+            if fingerprints.get(sheet_name) == fingerprint:
+                session.preload_daily(sheet_name, DailySheetData(*data))
+                reused.append(sheet_name)
+        return fingerprints, reused
+
+    def update(self, session, fingerprints, date_sheets):
+        """保存本次所有日期工作表的指紋與擷取結果"""
+        if fingerprints is None:
+            return
+        sheets = {}
+        for sheet_name in date_sheets:
+            data = session.cached_daily(sheet_name)
+            if data is not None and sheet_name in fingerprints:
+                sheets[sheet_name] = (fingerprints[sheet_name], tuple(data))
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        path = self._state_path(session.source)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'wb') as f:
+            pickle.dump({'parser_version': PARSER_VERSION, 'sheets': sheets}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
@@ -6,16 +6,191 @@
 """
 
 import streamlit as st
-import pandas as pd
+import hashlib
 import io
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
 from auto_salary_calculator import AutoSalaryCalculator
+from extraction_cache import ExtractionCache
+from result_cache import ResultCache, rules_fingerprint
+from salary_rules import load_salary_rules
+from stage_profiler import StageProfiler
+from summary_columns import MissingColumnError
 
 class StreamlitSalaryCalculator(AutoSalaryCalculator):
     """Streamlit 網頁版薪資計算器"""
 
     def __init__(self):
         super().__init__()
+        # 重新開始或重新整理頁面後，同一個檔案直接使用快取的擷取結果
+        self.extraction_cache = ExtractionCache()
+
+def create_profiler():
+    """依側邊欄「效能分析」設定建立 StageProfiler（關閉時只轉送進度）"""
+    return StageProfiler(enabled=st.session_state.get('profiling_enabled', False))
+
+def profile_dump_path(step):
+    """側邊欄勾選輸出 cProfile 時的 pstats 檔路徑，否則為 None"""
+    if not (st.session_state.get('profiling_enabled', False) and st.session_state.get('profiling_dump', False)):
+        return None
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = Path.home() / "skinbar_report" / "profiles" / f"{step}_{timestamp}.prof"
+    st.session_state.profile_dump_path = str(path)
+    return path
+
+# 背景解析上傳檔案的執行緒數（所有使用者共用）
+UPLOAD_WORKERS = 4
+
+@st.cache_resource
+def get_upload_executor():
+    """所有使用者共用的背景解析執行緒池"""
+    return ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='skinbar-upload')
+
+class UploadProgress:
+    """背景解析與畫面之間共用的進度，由背景執行緒更新、畫面定時讀取"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fraction = 0.0
+        self.message = "⏳ 等待解析..."
+
+    def callback(self, start, end, icon):
+        """把 calculator.profiler 回報的 (完成數, 總數) 換算到進度條 start ~ end 的區間"""
+        def update(done, total, message):
+            fraction = start + (end - start) * (done / total if total else 1)
+            with self._lock:
+                self.fraction = min(fraction, 1.0)
+                self.message = f"{icon} {message}（{done}/{total}）"
+        return update
+
+    def snapshot(self):
+        with self._lock:
+            return self.fraction, self.message
+
+def progress_display(bar, status, percentage, label):
+    """把 StageProfiler 回報的 (完成數, 總數) 直接顯示在前景的進度條上"""
+    def update(done, total, message):
+        fraction = min(done / total if total else 1, 1.0)
+        bar.progress(fraction)
+        status.text(message)
+        percentage.text(f"{label}: {fraction * 100:.0f}%（{done}/{total}）")
+    return update
+
+@st.cache_resource
+def get_result_cache():
+    """所有使用者共用的解析與計算結果快取（LRU + TTL），快取內容視為唯讀"""
+    return ResultCache()
+
+def calculation_cache_key(employee_rows, num_formal_staff, formal_staff_positions):
+    """計算結果的快取鍵值：檔案內容 + 員工行號 + 正式淨膚師設定 + 獎金規則"""
+    file_hash = st.session_state.excel_data.get('file_hash')
+    if file_hash is None:
+        return None
+    return ('results', file_hash, tuple(employee_rows), num_formal_staff,
+            tuple(formal_staff_positions), rules_fingerprint(load_salary_rules()))
+
+def load_workbook_inputs(cache, data, file_name, file_hash, progress, profiling_enabled=False, profile_path=None):
+    """在背景執行緒取得上傳檔案的解析結果：共用快取中沒有時才解析，
+    多位使用者同時上傳同一份檔案時只解析一次
+    """
+    profile_records = []
+
+    def parse():
+        parsed = parse_uploaded_workbook(data, file_name, progress, profiling_enabled, profile_path)
+        profile_records.extend(parsed['profile_records'])
+        return parsed['excel_data']
+
+    excel_data = cache.get_or_compute(('inputs', file_hash), parse)
+    return {'excel_data': {**excel_data, 'file_hash': file_hash}, 'profile_records': profile_records}
+
+def parse_uploaded_workbook(data, file_name, progress, profiling_enabled=False, profile_path=None):
+    """在背景執行緒直接從記憶體解析上傳的檔案（不寫暫存檔）
+
+    回傳 {'excel_data': ..., 'profile_records': ...}；讀取失敗時拋出例外
+    """
+    source = io.BytesIO(data)
+    source.name = file_name  # 依副檔名選擇讀取引擎
+    calculator = StreamlitSalaryCalculator()
+    profiler = StageProfiler(enabled=profiling_enabled)
+    calculator.profiler = profiler
+
+    with profiler.profiling(profile_path):
+        # 讀取月報表彙整與各日期工作表（進度依實際讀完的工作表數）
+        # 同一個 session 供讀取總額與面膜統計共用，每個工作表只解析一次
+        workbook = calculator.open_workbook(source)
+        try:
+            profiler.progress_callback = progress.callback(0.0, 0.8, "📖")
+            df, total_performance, total_consumption, date_sheets = calculator.read_excel_data(workbook)
+            if df is None:
+                raise ValueError("無法讀取 Excel 檔案，請檢查檔案格式")
+
+            # 統計面膜銷售
+            profiler.progress_callback = progress.callback(0.8, 1.0, "🎭")
+            mask_sales = calculator.count_mask_sales(workbook, date_sheets)
+        finally:
+            workbook.close()
+
+    return {
+        'excel_data': {
+            'df': df,
+            'total_performance': total_performance,
+            'total_consumption': total_consumption,
+            'date_sheets': date_sheets,
+            'mask_sales': mask_sales,
+        },
+        'profile_records': profiler.records,
+    }
+
+@st.fragment(run_every=0.3)
+def show_upload_progress():
+    """背景解析進行中時定時更新進度條，只重跑此區塊，完成後重新整理整頁"""
+    job = st.session_state.get('upload_job')
+    if job is None:
+        return
+    if job['future'].done():
+        st.rerun()
+    fraction, message = job['progress'].snapshot()
+    st.progress(fraction)
+    st.text(message)
+    st.text(f"進度: {fraction * 100:.0f}%")
+
+def display_profile():
+    """顯示各階段效能與最耗時的工作表"""
+    records = st.session_state.get('profile_records')
+    if not st.session_state.get('profiling_enabled', False) or not records:
+        return
+
+    with st.expander("⏱️ 效能分析", expanded=False):
+        import pandas as pd
+
+        profiler = StageProfiler()
+        profiler.records = records
+        summary_df = pd.DataFrame(profiler.summary())
+        summary_df['wall_time'] = (summary_df['wall_time'] * 1000).round(1)
+        summary_df['peak_rss'] = (summary_df['peak_rss'] / 1024 / 1024).round(1)
+        st.dataframe(summary_df.rename(columns={
+            'stage': '階段', 'calls': '次數', 'wall_time': '時間 (ms)', 'rows': '掃描行數', 'peak_rss': '最高記憶體 (MB)'
+        }), use_container_width=True)
+
+        slowest = profiler.slowest_sheets(10)
+        if slowest:
+            st.write("🐢 最耗時的工作表:")
+            st.dataframe(pd.DataFrame([{
+                '階段': record['stage'],
+                '工作表': record['sheet'],
+                '時間 (ms)': round(record['wall_time'] * 1000, 1),
+                '掃描行數': record['rows'],
+            } for record in slowest]), use_container_width=True)
+
+        dump_path = st.session_state.get('profile_dump_path')
+        if dump_path and os.path.exists(dump_path):
+            st.caption(f"📄 cProfile 結果: {dump_path}")
+            with open(dump_path, 'rb') as f:
+                st.download_button("📥 下載 cProfile 結果", data=f.read(),
+                                   file_name=os.path.basename(dump_path))
 
 def upload_excel_file():
     """處理 Excel 檔案上傳"""
@@ -36,108 +211,57 @@ def upload_excel_file():
     )
 
     if uploaded_file is not None:
-        # 檢查檔案是否變更
-        if st.session_state.uploaded_file != uploaded_file.name:
-            st.session_state.uploaded_file = uploaded_file.name
+        # 檢查檔案是否變更（同名的不同檔案也視為變更）
+        file_key = getattr(uploaded_file, 'file_id', None) or uploaded_file.name
+        if st.session_state.uploaded_file != file_key:
+            st.session_state.uploaded_file = file_key
             st.session_state.excel_data = None
             st.session_state.calculation_results = None
+            st.session_state.upload_job = None
+            st.session_state.uploaded_file_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
 
-        # 如果還沒處理過這個檔案，就處理它
+        # 如果還沒處理過這個檔案：其他使用者已解析過時直接使用，否則交給背景執行緒解析
         if st.session_state.excel_data is None:
-            try:
-                # 建立進度容器
-                progress_container = st.container()
-                
-                with progress_container:
-                    # 進度條和狀態文字
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    percentage_text = st.empty()
-                    
-                    # 步驟 1: 儲存檔案
-                    current_progress = 10
-                    status_text.text("📁 正在儲存上傳的檔案...")
-                    percentage_text.text(f"進度: {current_progress}%")
-                    progress_bar.progress(current_progress / 100)
-                    
-                    temp_file_path = f"temp_{uploaded_file.name}"
-                    with open(temp_file_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    
-                    # 步驟 2: 初始化計算器
-                    current_progress = 20
-                    status_text.text("🔧 正在初始化計算器...")
-                    percentage_text.text(f"進度: {current_progress}%")
-                    progress_bar.progress(current_progress / 100)
-                    calculator = StreamlitSalaryCalculator()
-                    
-                    # 步驟 3: 讀取主要 Excel 數據
-                    current_progress = 30
-                    status_text.text("📖 正在讀取 Excel 主要數據...")
-                    percentage_text.text(f"進度: {current_progress}%")
-                    progress_bar.progress(current_progress / 100)
-                    df, total_performance, total_consumption, date_sheets = calculator.read_excel_data(temp_file_path)
-                    
-                    if df is None:
-                        progress_container.empty()
-                        st.error("❌ 無法讀取 Excel 檔案，請檢查檔案格式")
-                        return False
-                    
-                    # 步驟 4: 分析工作表結構
-                    current_progress = 50
-                    status_text.text(f"🗓️ 正在分析 {len(date_sheets)} 個日期工作表...")
-                    percentage_text.text(f"進度: {current_progress}%")
-                    progress_bar.progress(current_progress / 100)
-                    
-                    # 步驟 5: 統計面膜銷售（這是比較耗時的部分）
-                    current_progress = 70
-                    status_text.text("🎭 正在統計水光面膜銷售數據...")
-                    percentage_text.text(f"進度: {current_progress}%")
-                    progress_bar.progress(current_progress / 100)
-                    mask_sales = calculator.count_mask_sales(temp_file_path, date_sheets)
-                    
-                    # 步驟 6: 數據驗證
-                    current_progress = 85
-                    status_text.text("✅ 正在驗證數據完整性...")
-                    percentage_text.text(f"進度: {current_progress}%")
-                    progress_bar.progress(current_progress / 100)
-                    
-                    # 儲存數據到 session state
-                    st.session_state.excel_data = {
-                        'df': df,
-                        'total_performance': total_performance,
-                        'total_consumption': total_consumption,
-                        'date_sheets': date_sheets,
-                        'mask_sales': mask_sales,
-                        'temp_file_path': temp_file_path
-                    }
-                    
-                    # 步驟 7: 清理臨時檔案
-                    current_progress = 95
-                    status_text.text("🧹 正在清理臨時檔案...")
-                    percentage_text.text(f"進度: {current_progress}%")
-                    progress_bar.progress(current_progress / 100)
-                    
-                    if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-                    
-                    # 完成
-                    current_progress = 100
-                    status_text.text("🎉 檔案處理完成！")
-                    percentage_text.text(f"進度: {current_progress}% - 完成！")
-                    progress_bar.progress(current_progress / 100)
-                    
-                    # 短暫顯示完成狀態後清除進度
-                    import time
-                    time.sleep(1.0)  # 延長顯示時間讓用戶看到100%
-                    progress_container.empty()
-
-                st.success("✅ Excel 檔案讀取成功！")
+            job = st.session_state.get('upload_job')
+            if job is None or job['file_key'] != file_key:
+                file_hash = st.session_state.uploaded_file_hash
+                cached = get_result_cache().get(('inputs', file_hash))
+                if cached is not None:
+                    st.session_state.excel_data = {**cached, 'file_hash': file_hash}
+                    st.session_state.profile_records = []
+                    st.success("⚡ 使用相同檔案已解析的結果")
+                else:
+                    progress = UploadProgress()
+                    future = get_upload_executor().submit(
+                        load_workbook_inputs,
+                        get_result_cache(),
+                        uploaded_file.getvalue(),
+                        uploaded_file.name,
+                        file_hash,
+                        progress,
+                        st.session_state.get('profiling_enabled', False),
+                        profile_dump_path('upload'),
+                    )
+                    job = {'file_key': file_key, 'future': future, 'progress': progress}
+                    st.session_state.upload_job = job
+
+        if st.session_state.excel_data is None:
+            if not job['future'].done():
+                show_upload_progress()
+                return False
 
+            try:
+                parsed = job['future'].result()
             except Exception as e:
+                # 保留失敗的工作，同一個檔案在重跑時不會重新解析
                 st.error(f"❌ 讀取檔案時發生錯誤: {e}")
                 return False
 
+            st.session_state.upload_job = None
+            st.session_state.excel_data = parsed['excel_data']
+            st.session_state.profile_records = parsed['profile_records']
+            st.success("✅ Excel 檔案讀取成功！")
+
         # 顯示讀取結果
         if st.session_state.excel_data:
             data = st.session_state.excel_data
@@ -157,6 +281,8 @@ def upload_excel_file():
 
             # 顯示水光面膜銷售統計
             if data['mask_sales']:
+                import pandas as pd
+
                 st.write("🎭 水光面膜銷售統計:")
                 mask_df = pd.DataFrame(
                     list(data['mask_sales'].items()),
@@ -176,11 +302,20 @@ def get_employee_preview():
         st.warning("請先上傳 Excel 檔案")
         return None
 
+    import pandas as pd
+
     df = st.session_state.excel_data['df']
     calculator = StreamlitSalaryCalculator()
 
-    # 獲取動態員工行號（從第14行開始，跳過合計行和表頭）
-    employee_rows = calculator.get_dynamic_employee_rows(df, start_row=14)
+    # 獲取動態員工行號（從第14行開始，跳過合計行和表頭），欄位依表頭標籤對應
+    try:
+        employee_rows = calculator.get_dynamic_employee_rows(df, start_row=14)
+        columns = calculator.summary_columns(df)
+    except MissingColumnError as e:
+        st.error(f"❌ {e}")
+        return None
+    if columns.assumed:
+        st.caption(f"⚠️ 月報表沒有以下欄位的表頭，沿用原本欄號: {', '.join(columns.assumed)}")
 
     st.write(f"🔍 自動檢測到 {len(employee_rows)} 位員工（行號: {employee_rows}）")
 
@@ -188,10 +323,10 @@ def get_employee_preview():
     preview_data = []
     for row in employee_rows:
         try:
-            name = df.iloc[row-1, 0] if row <= df.shape[0] else None
-            performance = df.iloc[row-1, 1] if row <= df.shape[0] and df.shape[1] > 1 else 0
-            consumption = df.iloc[row-1, 2] if row <= df.shape[0] and df.shape[1] > 2 else 0
-            person_count = df.iloc[row-1, 3] if row <= df.shape[0] and df.shape[1] > 3 else 0
+            name = columns.value(df, row, 'name') if row <= df.shape[0] else None
+            performance = columns.value(df, row, 'personal_performance') if row <= df.shape[0] else 0
+            consumption = columns.value(df, row, 'personal_consumption') if row <= df.shape[0] else 0
+            person_count = columns.value(df, row, 'person_count') if row <= df.shape[0] else 0
 
             if pd.notna(name):
                 preview_data.append({
@@ -274,6 +409,14 @@ def calculate_salary():
 
     # 計算按鈕
     if st.button("🎯 開始計算薪資", type="primary", use_container_width=True):
+        # 相同檔案與設定已計算過時直接使用結果
+        results_key = calculation_cache_key(employee_rows, num_formal_staff, formal_staff_positions)
+        cached = get_result_cache().get(results_key) if results_key is not None else None
+        if cached is not None:
+            st.session_state.calculation_results = cached
+            st.success("⚡ 使用相同檔案與設定的計算結果")
+            return
+
         # 建立計算進度容器
         calc_progress_container = st.container()
         
@@ -284,80 +427,56 @@ def calculate_salary():
             calc_percentage = st.empty()
             
             try:
-                # 步驟 1: 初始化
-                current_progress = 10
-                calc_status.text("🔧 正在初始化計算器...")
-                calc_percentage.text(f"計算進度: {current_progress}%")
-                calc_progress.progress(current_progress / 100)
                 calculator = StreamlitSalaryCalculator()
+                calculator.profiler = create_profiler()
+                calculator.profiler.progress_callback = progress_display(
+                    calc_progress, calc_status, calc_percentage, "計算進度"
+                )
                 excel_data = st.session_state.excel_data
-                
-                # 步驟 2: 獲取員工數據
-                current_progress = 25
-                calc_status.text("👥 正在獲取員工數據...")
-                calc_percentage.text(f"計算進度: {current_progress}%")
-                calc_progress.progress(current_progress / 100)
+                # 進度為已完成的計算階段數：員工數據、季獎金、團獎、最終薪資
+                total_steps = 4
+
+                calculator.profiler.progress(0, total_steps, "👥 正在獲取員工數據...")
                 employees = calculator.get_employee_data(excel_data['df'], employee_rows)
 
                 if not employees:
                     calc_progress_container.empty()
                     st.error("❌ 無法獲取員工數據")
                     return
-                
-                # 步驟 3: 計算季獎金
-                current_progress = 50
-                calc_status.text("🎊 正在計算季獎金...")
-                calc_percentage.text(f"計算進度: {current_progress}%")
-                calc_progress.progress(current_progress / 100)
+
+                calculator.profiler.progress(1, total_steps, "🎊 正在計算季獎金...")
                 employees = calculator.calculate_seasonal_bonus(
                     employees,
                     excel_data['mask_sales'],
                     excel_data['total_consumption']
                 )
 
-                # 步驟 4: 計算團獎
-                current_progress = 70
-                calc_status.text("🏆 正在計算團獎...")
-                calc_percentage.text(f"計算進度: {current_progress}%")
-                calc_progress.progress(current_progress / 100)
+                calculator.profiler.progress(2, total_steps, "🏆 正在計算團獎...")
                 team_bonus_per_person = calculator.calculate_team_bonus(
                     num_formal_staff,
                     excel_data['total_performance'],
                     excel_data['total_consumption']
                 )
 
-                # 步驟 5: 計算最終薪資
-                current_progress = 85
-                calc_status.text("💰 正在計算最終薪資...")
-                calc_percentage.text(f"計算進度: {current_progress}%")
-                calc_progress.progress(current_progress / 100)
+                calculator.profiler.progress(3, total_steps, "💰 正在計算最終薪資...")
                 results = calculator.calculate_salary(
                     employees,
                     team_bonus_per_person,
                     formal_staff_positions
                 )
+                calculator.profiler.progress(total_steps, total_steps, "🎉 薪資計算完成！")
 
-                # 步驟 6: 儲存結果
-                current_progress = 95
-                calc_status.text("💾 正在儲存計算結果...")
-                calc_percentage.text(f"計算進度: {current_progress}%")
-                calc_progress.progress(current_progress / 100)
                 st.session_state.calculation_results = {
                     'results': results,
                     'total_performance': excel_data['total_performance'],
                     'total_consumption': excel_data['total_consumption'],
                     'team_bonus_per_person': team_bonus_per_person
                 }
-                
-                # 完成
-                current_progress = 100
-                calc_status.text("🎉 薪資計算完成！")
-                calc_percentage.text(f"計算進度: {current_progress}% - 完成！")
-                calc_progress.progress(current_progress / 100)
-                
-                # 短暫顯示完成狀態後清除進度
-                import time
-                time.sleep(1.0)
+                st.session_state.profile_records = (
+                    st.session_state.get('profile_records', []) + calculator.profiler.records
+                )
+                if results_key is not None:
+                    get_result_cache().put(results_key, st.session_state.calculation_results)
                 calc_progress_container.empty()
 
                 st.success("🎉 薪資計算完成！")
@@ -371,6 +490,8 @@ def display_results():
     if st.session_state.calculation_results is None:
         return
 
+    import pandas as pd
+
     results_data = st.session_state.calculation_results
     results = results_data['results']
     total_performance = results_data['total_performance']
@@ -535,6 +656,10 @@ def display_results():
 
 def create_download_report(results, total_performance, total_consumption):
     """建立下載報表"""
+    import pandas as pd
+
+    from salary_report import write_salary_report
+
     st.subheader("📄 下載報表")
 
     # 下載報表按鈕
@@ -549,101 +674,19 @@ def create_download_report(results, total_performance, total_consumption):
             report_percentage = st.empty()
             
             try:
-                # 步驟 1: 準備數據
-                current_progress = 20
-                report_status.text("📊 正在準備報表數據...")
-                report_percentage.text(f"報表進度: {current_progress}%")
-                report_progress.progress(current_progress / 100)
-                
-                # 建立 Excel 報表
-                output = io.BytesIO()
-
-                # 建立詳細資料
-                report_data = []
-                for result in results:
-                    basic_salary = (
-                        result['base_salary'] + result['meal_allowance'] +
-                        result['overtime_pay'] + result['skill_bonus'] + result['team_bonus']
-                    )
-                    seasonal_bonus_total = (
-                        result['person_count_bonus'] + result['charge_target_bonus'] +
-                        result['consumption_bonus'] + result['dual_target_bonus'] +
-                        result['advanced_course_bonus'] + result['product_sales_bonus'] +
-                        result['new_customer_rate_bonus']
-                    )
-
-                    report_data.append({
-                        '員工姓名': result['name'],
-                        '身份': '正式淨膚師' if result['is_formal_staff'] else '一般員工',
-                        '底薪': result['base_salary'],
-                        '伙食費': result['meal_allowance'],
-                        '加班費': result['overtime_pay'],
-                        '手技獎金': result['skill_bonus'],
-                        '團獎': result['team_bonus'],
-                        '基本薪資小計': basic_salary,
-                        '人次激勵獎金': result['person_count_bonus'],
-                        '充值目標達成獎': result['charge_target_bonus'],
-                        '個人消耗獎勵': result['consumption_bonus'],
-                        '消耗充值雙達標獎': result['dual_target_bonus'],
-                        '進階課程工獎': result['advanced_course_bonus'],
-                        '產品銷售供獎': result['product_sales_bonus'],
-                        '新客成交率70%獎金': result['new_customer_rate_bonus'],
-                        '季獎金小計': seasonal_bonus_total,
-                        '總薪資': result['total_salary']
-                    })
-
-                # 步驟 2: 建立 DataFrame
-                current_progress = 50
-                report_status.text("📋 正在建立薪資明細表...")
-                report_percentage.text(f"報表進度: {current_progress}%")
-                report_progress.progress(current_progress / 100)
-                report_df = pd.DataFrame(report_data)
-
-                # 步驟 3: 寫入 Excel
-                current_progress = 70
+                # 進度為已寫入的員工數，最後一步為存檔
                 report_status.text("📝 正在寫入 Excel 檔案...")
-                report_percentage.text(f"報表進度: {current_progress}%")
-                report_progress.progress(current_progress / 100)
-                
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    report_df.to_excel(writer, sheet_name='薪資明細', index=False)
-
-                    # 建立總覽表
-                    current_progress = 85
-                    report_status.text("📊 正在建立總覽表...")
-                    report_percentage.text(f"報表進度: {current_progress}%")
-                    report_progress.progress(current_progress / 100)
-                    
-                    summary_data = {
-                        '項目': ['業績總額', '消耗總額', '消耗比例', '基本薪資總計', '季獎金總計', '全店薪資總額'],
-                        '金額/比例': [
-                            f"{total_performance:,.0f} 元",
-                            f"{total_consumption:,.0f} 元",
-                            f"{(total_consumption/total_performance)*100:.1f}%" if total_performance > 0 else "0%",
-                            f"{sum([r['base_salary']+r['meal_allowance']+r['overtime_pay']+r['skill_bonus']+r['team_bonus'] for r in results]):,.0f} 元",
-                            f"{sum([r['person_count_bonus']+r['charge_target_bonus']+r['consumption_bonus']+r['dual_target_bonus']+r['advanced_course_bonus']+r['product_sales_bonus']+r['new_customer_rate_bonus'] for r in results]):,.0f} 元",
-                            f"{sum([r['total_salary'] for r in results]):,.0f} 元"
-                        ]
-                    }
-                    summary_df = pd.DataFrame(summary_data)
-                    summary_df.to_excel(writer, sheet_name='總覽', index=False)
-
-                # 步驟 4: 完成
-                current_progress = 100
-                report_status.text("✅ 報表生成完成！")
-                report_percentage.text(f"報表進度: {current_progress}% - 完成！")
-                report_progress.progress(current_progress / 100)
-                
-                # 短暫顯示完成狀態後清除進度
-                import time
-                time.sleep(1.0)
+                output = write_salary_report(
+                    results, total_performance, total_consumption,
+                    progress=progress_display(report_progress, report_status, report_percentage, "報表進度"),
+                )
                 report_progress_container.empty()
-                
+
                 # 顯示下載按鈕
                 st.download_button(
                     label="📥 下載 Excel 薪資報表",
                     data=output.getvalue(),
-                    file_name=f"淨膚寶薪資計算報表_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.xlsx",
+                    file_name=f"淨膚寶薪資計算報表_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     use_container_width=True
                 )
@@ -670,7 +713,7 @@ def create_download_report(results, total_performance, total_consumption):
             st.download_button(
                 label="⚡ 快速下載簡化版",
                 data=output.getvalue(),
-                file_name=f"薪資簡表_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.xlsx",
+                file_name=f"薪資簡表_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 help="僅包含員工姓名、總薪資和身份的簡化版本"
             )
@@ -747,17 +790,27 @@ def main():
             if st.button("⚡ 快速計算", use_container_width=True, help="使用預設設定快速計算"):
                 st.info("💡 請先在主頁面設定正式淨膚師人數後再計算")
         
+        # 效能分析
+        st.markdown("---")
+        st.markdown("### ⏱️ 效能分析")
+        st.checkbox("記錄各階段時間與記憶體", key='profiling_enabled')
+        st.checkbox("輸出 cProfile 結果", key='profiling_dump', disabled=not st.session_state.get('profiling_enabled', False))
+        
         # 系統資訊
         st.markdown("---")
         st.markdown("### ℹ️ 系統資訊")
         st.caption("🐍 Python 3.13.2")
         st.caption("📊 Streamlit Web App")
         st.caption("🔧 基於 auto_salary_calculator.py")
+        cache_stats = get_result_cache().stats()
+        st.caption(f"⚡ 共用快取: {cache_stats['entries']} 筆，"
+                   f"{cache_stats['bytes'] / 1024 / 1024:.1f} MB，命中 {cache_stats['hits']} 次")
 
     # 主要流程
     if upload_excel_file():
         calculate_salary()
         display_results()
+    display_profile()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
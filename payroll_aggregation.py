@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 多月份彙總（每季 / 年初至今）
+季獎金以季為單位，一次載入多個月份的月報表（多行程平行計算，沿用擷取結果快取），
+所有月份的薪水結果放在同一個有索引的記憶體資料 (PayrollLedger)，依員工彙總每季與年初至今 (YTD) 的薪資與各項獎金
+
+員工跨月份比對:
+    同一分店以姓名比對（去除前後空白與「1.」這類編號前綴），沒有姓名時以淨膚師編號（員工行號 - 11）比對
+月份:
+    由檔名結尾的年月判斷（例如 skinbar_daan202506.xlsx → 202506）
+
+使用方式:
+    python payroll_aggregation.py --input "~/skinbar_report/skinbar*2025*.xlsx" --config stores.json --output 2025Q.xlsx
+    python payroll_aggregation.py --input ... --config ... --period ytd --through 202506 --output 2025YTD.csv
+    python payroll_aggregation.py --from-json 202504.json 202505.json 202506.json --output 2025Q2.xlsx
+    python payroll_aggregation.py --input "~/skinbar_report/snapshots/*2025*.snap" --config ... --output 2025Q.xlsx
+--input 也可以是擷取結果快照（batch_salary_runner.py --snapshot-dir 寫出），不需重新讀取 Excel
+設定檔格式同 batch_salary_runner.py，各店設定可用不含年月的店名（例如 skinbar_daan）供所有月份共用
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+from batch_salary_runner import find_workbooks, load_store_config, run_batch
+from payroll_export import split_store_month
+from payroll_records import SalaryResult
+from salary_engine import SALARY_RESULT_COLUMNS
+
+PERIODS = ('month', 'quarter', 'ytd')
+
+# 彙總的金額欄位（calculate_salary 結果中姓名與身份以外的欄位）
+AMOUNT_FIELDS = [column for column in SALARY_RESULT_COLUMNS if column not in ('name', 'is_formal_staff')]
+
+# 姓名前的編號，例如「1.王小美」、「2、林小華」
+_NUMBER_PREFIX = re.compile(r'^\s*\d+\s*[.．、]\s*')
+
+
+def month_quarter(month):
+    """年月 → 季，例如 202505 → 2025Q2"""
+    month = str(month)
+    return f"{month[:4]}Q{(int(month[4:6]) - 1) // 3 + 1}"
+
+
+def employee_key(name, therapist_id):
+    """跨月份比對員工的鍵值：正規化後的姓名，沒有姓名時為淨膚師編號"""
+    text = '' if name is None or name != name else str(name)
+    text = _NUMBER_PREFIX.sub('', text).strip()
+    return text if text else f"#{therapist_id}"
+
+
+def outcome_store_month(outcome, month=None):
+    """run_store_payroll 結果的 (分店, 年月)：年月依序取 month、檔名結尾、店名結尾"""
+    store, store_month = split_store_month(outcome['store'])
+    file_month = split_store_month(outcome.get('file') or '')[1]
+    month = str(month or file_month or store_month or '')
+    if not month:
+        raise ValueError(f"無法由「{outcome.get('file') or outcome['store']}」判斷月份")
+    return store, month
+
+
+@dataclass(slots=True)
+class LedgerEntry:
+    """單一員工單月的薪水結果"""
+
+    store: str
+    month: str
+    employee: str
+    therapist_id: int
+    result: SalaryResult
+
+
+class PayrollLedger:
+    """多月份薪水結果的記憶體資料，依員工、月份、分店建立索引"""
+
+    def __init__(self):
+        self.entries = []
+        self._by_employee = defaultdict(list)  # (分店, 員工) → entries 索引
+        self._by_month = defaultdict(list)
+        self._by_store = defaultdict(list)
+        self.store_months = {}  # (分店, 年月) → 總業績、總消耗等店家數據
+        self.errors = []  # 解析失敗的月報表
+
+    def add_outcome(self, outcome, month=None):
+        """加入 run_store_payroll 的結果；同一店同一月份重複加入時以後者為準"""
+        if outcome.get('error'):
+            self.errors.append({'store': outcome['store'], 'file': outcome.get('file'), 'error': outcome['error']})
+            return
+
+        store, month = outcome_store_month(outcome, month)
+        if (store, month) in self.store_months:
+            self._remove(store, month)
+
+        self.store_months[(store, month)] = {
+            'total_performance': float(outcome['total_performance']),
+            'total_consumption': float(outcome['total_consumption']),
+            'num_formal_staff': outcome.get('num_formal_staff'),
+            'team_bonus_per_person': outcome.get('team_bonus_per_person'),
+        }
+
+        # employees 與 results 順序相同（calculate_salary 依員工順序產生結果）
+        seen = set()
+        for employee, result in zip(outcome['employees'], outcome['results']):
+            therapist_id = employee['row'] - 11
+            key = employee_key(employee['name'], therapist_id)
+            if key in seen:  # 同月份同名時以編號區分
+                key = f"{key}#{therapist_id}"
+            seen.add(key)
+            if not isinstance(result, SalaryResult):
+                result = SalaryResult.from_dict(result)
+            self._append(LedgerEntry(store, month, key, therapist_id, result))
+
+    def _append(self, entry):
+        index = len(self.entries)
+        self.entries.append(entry)
+        self._by_employee[(entry.store, entry.employee)].append(index)
+        self._by_month[entry.month].append(index)
+        self._by_store[entry.store].append(index)
+
+    def _remove(self, store, month):
+        kept = [entry for entry in self.entries if not (entry.store == store and entry.month == month)]
+        self.entries = []
+        self._by_employee.clear()
+        self._by_month.clear()
+        self._by_store.clear()
+        for entry in kept:
+            self._append(entry)
+        del self.store_months[(store, month)]
+
+    def months(self):
+        return sorted({month for _, month in self.store_months})
+
+    def stores(self):
+        return sorted(self._by_store)
+
+    def employees(self, store=None):
+        return sorted(key for key in self._by_employee if store is None or key[0] == store)
+
+    def select(self, store=None, month=None, employee=None):
+        """依分店 / 月份 / 員工查詢，使用最小的索引後再過濾"""
+        candidates = []
+        if store is not None and employee is not None:
+            candidates.append(self._by_employee.get((store, employee), []))
+        if month is not None:
+            candidates.append(self._by_month.get(str(month), []))
+        if store is not None:
+            candidates.append(self._by_store.get(store, []))
+        indexes = min(candidates, key=len) if candidates else range(len(self.entries))
+
+        selected = []
+        for index in indexes:
+            entry = self.entries[index]
+            if ((store is None or entry.store == store) and (month is None or entry.month == str(month))
+                    and (employee is None or entry.employee == employee)):
+                selected.append(entry)
+        return selected
+
+    def _period_of(self, month, period, through):
+        if period == 'month':
+            return month
+        if period == 'quarter':
+            return month_quarter(month)
+        if period == 'ytd':
+            # 指定 through 時只彙總該年度到該月份；未指定時 through 為各年度的最後月份
+            year_through = through.get(month[:4]) if isinstance(through, dict) else through
+            if month[:4] != year_through[:4] or month > year_through:
+                return None
+            return f"{month[:4]}YTD"
+        raise ValueError(f"period 必須是 {', '.join(PERIODS)} 其中之一")
+
+    def _ytd_through(self, through):
+        if through is not None:
+            return str(through)
+        # 未指定時每年彙總到該年最後一個月份（依 store_months，沒有員工的月份也算）
+        latest = {}
+        for _, month in self.store_months:
+            latest[month[:4]] = max(latest.get(month[:4], month), month)
+        return latest
+
+    def employee_totals(self, period='quarter', through=None):
+        """依員工與期間彙總，回傳 dict 列表（依分店、員工、期間排序）"""
+        through = self._ytd_through(through) if period == 'ytd' else None
+        totals = {}
+        for entry in self.entries:
+            period_key = self._period_of(entry.month, period, through)
+            if period_key is None:
+                continue
+            key = (entry.store, entry.employee, period_key)
+            row = totals.get(key)
+            if row is None:
+                row = totals[key] = {
+                    'store': entry.store, 'employee': entry.employee, 'period': period_key,
+                    'name': entry.result.name, 'therapist_ids': set(), 'months': 0, 'formal_months': 0,
+                    'first_month': entry.month, 'last_month': entry.month,
+                    **dict.fromkeys(AMOUNT_FIELDS, 0),
+                }
+            row['therapist_ids'].add(entry.therapist_id)
+            row['months'] += 1
+            row['formal_months'] += bool(entry.result.is_formal_staff)
+            if entry.month >= row['last_month']:
+                row['last_month'] = entry.month
+                row['name'] = entry.result.name  # 顯示最近月份的姓名
+            row['first_month'] = min(row['first_month'], entry.month)
+            result = entry.result
+            for field in AMOUNT_FIELDS:
+                row[field] += getattr(result, field)
+
+        rows = [totals[key] for key in sorted(totals)]
+        for row in rows:
+            row['therapist_ids'] = ','.join(str(therapist_id) for therapist_id in sorted(row['therapist_ids']))
+        return rows
+
+    def store_totals(self, period='quarter', through=None):
+        """依分店與期間彙總總業績、總消耗與薪資"""
+        through = self._ytd_through(through) if period == 'ytd' else None
+        totals = {}
+        for (store, month), data in self.store_months.items():
+            period_key = self._period_of(month, period, through)
+            if period_key is None:
+                continue
+            row = totals.setdefault((store, period_key), {
+                'store': store, 'period': period_key, 'months': 0,
+                'total_performance': 0.0, 'total_consumption': 0.0, 'employees': 0, 'total_salary': 0,
+            })
+            row['months'] += 1
+            row['total_performance'] += data['total_performance']
+            row['total_consumption'] += data['total_consumption']
+            for entry in self.select(store=store, month=month):
+                row['employees'] += 1
+                row['total_salary'] += entry.result.total_salary
+        return [totals[key] for key in sorted(totals)]
+
+
+def ledger_from_outcomes(outcomes, month=None):
+    ledger = PayrollLedger()
+    for outcome in outcomes:
+        ledger.add_outcome(outcome, month=month)
+    return ledger
+
+
+def load_ledger(excel_files, defaults, stores, max_workers=None, backend='streaming', use_cache=True,
+                rules_path=None):
+    """平行計算多個月份的月報表（沿用擷取結果快取），回傳 PayrollLedger"""
+    outcomes = run_batch(excel_files, defaults, stores, max_workers=max_workers, backend=backend,
+                         use_cache=use_cache, rules_path=rules_path)
+    return ledger_from_outcomes(outcomes)
+
+
+def write_aggregation(ledger, output_path, period='quarter', through=None):
+    """輸出彙總結果，依副檔名決定格式（.json / .csv / .xlsx）"""
+    import pandas as pd
+
+    output_path = Path(os.path.expanduser(str(output_path)))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    employee_rows = ledger.employee_totals(period=period, through=through)
+    store_rows = ledger.store_totals(period=period, through=through)
+
+    if output_path.suffix.lower() == '.json':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'employees': employee_rows, 'stores': store_rows, 'errors': ledger.errors},
+                      f, ensure_ascii=False, indent=2)
+        return output_path
+
+    employee_df = pd.DataFrame(employee_rows)
+    if output_path.suffix.lower() == '.csv':
+        employee_df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    else:
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            employee_df.to_excel(writer, sheet_name='員工彙總', index=False)
+            pd.DataFrame(store_rows).to_excel(writer, sheet_name='分店彙總', index=False)
+            if ledger.errors:
+                pd.DataFrame(ledger.errors).to_excel(writer, sheet_name='失敗月報表', index=False)
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - 多月份彙總")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help="月報表資料夾或 glob 樣式（預設搜尋 skinbar*.xlsx，沒有時搜尋 skinbar*.snap）")
+    source.add_argument('--from-json', nargs='+', metavar='JSON',
+                        help="使用 batch_salary_runner.py 輸出的結果 JSON，不重新讀取 Excel")
+    parser.add_argument('--config', help="各店設定檔 (JSON)，使用 --input 時必填")
+    parser.add_argument('--output', required=True, help="彙總結果輸出路徑 (.xlsx / .csv / .json)")
+    parser.add_argument('--period', choices=PERIODS, default='quarter', help="彙總期間")
+    parser.add_argument('--through', default=None, help="年初至今彙總到哪個月份（例如 202506）")
+    parser.add_argument('--workers', type=int, default=None, help="平行行程數（預設為 CPU 核心數）")
+    parser.add_argument('--backend', choices=['pandas', 'streaming'], default='streaming',
+                        help="日期工作表讀取方式")
+    parser.add_argument('--no-cache', action='store_true', help="不使用擷取結果快取，每次重新解析")
+    parser.add_argument('--rules', default=None, help="獎金規則檔 (JSON)，預設 salary_rules.json")
+    args = parser.parse_args(argv)
+
+    if args.from_json:
+        outcomes = []
+        for path in args.from_json:
+            with open(os.path.expanduser(path), encoding='utf-8') as f:
+                data = json.load(f)
+            outcomes.extend(data if isinstance(data, list) else [data])
+        ledger = ledger_from_outcomes(outcomes)
+    else:
+        if not args.config:
+            parser.error("使用 --input 時需要 --config")
+        excel_files = find_workbooks(args.input)
+        if not excel_files:
+            print(f"❌ 找不到任何月報表: {args.input}")
+            return 1
+        print(f"📁 找到 {len(excel_files)} 個月報表")
+        defaults, stores = load_store_config(args.config)
+        ledger = load_ledger(excel_files, defaults, stores, max_workers=args.workers, backend=args.backend,
+                             use_cache=not args.no_cache, rules_path=args.rules)
+
+    output_path = write_aggregation(ledger, args.output, period=args.period, through=args.through)
+    print(f"\n💾 彙總結果已輸出: {output_path}")
+    print(f"📊 {len(ledger.stores())} 間分店、{len(ledger.months())} 個月份、{len(ledger.entries)} 筆薪水結果"
+          f"，失敗 {len(ledger.errors)} 個月報表")
+    return 1 if ledger.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 匯出 Parquet（依分店 / 月份分區）
+把薪水計算結果、各店總業績與總消耗、水光面膜銷售統計寫成 Parquet 資料集，
+BI 工具直接讀取整年的資料，不需要再解析上百個 Excel 報表
+
+輸出目錄結構（Hive 分區）:
+    <root>/results/store=skinbar_daan/month=202506/part-0.parquet       calculate_salary 的結果
+    <root>/store_totals/store=skinbar_daan/month=202506/part-0.parquet  read_excel_data 的總業績、總消耗
+    <root>/mask_sales/store=skinbar_daan/month=202506/part-0.parquet    水光面膜銷售組數
+重新匯出同一店同一月份時覆蓋該分區
+
+需要 pyarrow（選用套件）: pip install pyarrow
+
+使用方式:
+    python payroll_export.py 202506.json --output ~/skinbar_report/parquet
+    python batch_salary_runner.py --input ... --config ... --output 202506.xlsx --parquet ~/skinbar_report/parquet
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+from salary_engine import SALARY_RESULT_COLUMNS
+
+PARTITION_COLUMNS = ['store', 'month']
+
+# 檔名結尾的年月，例如 skinbar_daan202506 → (skinbar_daan, 202506)
+_STORE_MONTH_PATTERN = re.compile(r'^(?P<store>.*?)[_-]?(?P<month>20\d{2}(0[1-9]|1[0-2]))$')
+
+
+def _require_pyarrow():
+    """載入 pyarrow，未安裝時提示安裝方式"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("匯出 Parquet 需要 pyarrow，請先執行: pip install pyarrow") from e
+    return pa, pq
+
+
+def _partitioning(pa):
+    """分店 / 年月分區固定為字串，讀回時年月不會被推斷成整數"""
+    import pyarrow.dataset as ds
+
+    schema = pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS])
+    return ds.partitioning(schema, flavor='hive')
+
+
+def split_store_month(name):
+    """由店名或檔名取出 (分店, 年月)，沒有年月時為 (name, None)"""
+    stem = Path(str(name)).stem
+    match = _STORE_MONTH_PATTERN.match(stem)
+    if match is None or not match.group('store'):
+        return stem, None
+    return match.group('store'), match.group('month')
+
+
+def _partition(outcome, month):
+    store, file_month = split_store_month(outcome['store'])
+    month = month or file_month
+    if month is None:
+        raise ValueError(f"無法由「{outcome['store']}」判斷月份，請指定 month（例如 202506）")
+    return store, str(month)
+
+
+def outcome_tables(outcomes, month=None):
+    """把批次計算結果轉成三張 DataFrame: results、store_totals、mask_sales
+
+    outcomes 為 run_store_payroll 的結果列表（或其 JSON），解析失敗的店家略過
+    month 未指定時由店名 / 檔名結尾的年月判斷
+    """
+    import pandas as pd
+
+    result_rows = []
+    total_rows = []
+    mask_rows = []
+    for outcome in outcomes:
+        if outcome.get('error'):
+            continue
+        store, store_month = _partition(outcome, month)
+        for result in outcome['results']:
+            result_rows.append({'store': store, 'month': store_month, **result})
+        total_rows.append({
+            'store': store,
+            'month': store_month,
+            'total_performance': float(outcome['total_performance']),
+            'total_consumption': float(outcome['total_consumption']),
+            'date_sheet_count': len(outcome.get('date_sheets', [])),
+            'num_formal_staff': outcome.get('num_formal_staff'),
+            'team_bonus_per_person': outcome.get('team_bonus_per_person'),
+        })
+        for therapist_id, count in outcome['mask_sales'].items():
+            mask_rows.append({'store': store, 'month': store_month,
+                              'therapist_id': int(therapist_id), 'mask_count': int(count)})
+
+    results = pd.DataFrame(result_rows, columns=[*PARTITION_COLUMNS, *SALARY_RESULT_COLUMNS])
+    store_totals = pd.DataFrame(total_rows, columns=[
+        *PARTITION_COLUMNS, 'total_performance', 'total_consumption', 'date_sheet_count',
+        'num_formal_staff', 'team_bonus_per_person',
+    ])
+    mask_sales = pd.DataFrame(mask_rows, columns=[*PARTITION_COLUMNS, 'therapist_id', 'mask_count'])
+    return {'results': results, 'store_totals': store_totals, 'mask_sales': mask_sales}
+
+
+def write_parquet_dataset(outcomes, root, month=None):
+    """匯出 Parquet 資料集，回傳 {資料表: 寫入筆數}"""
+    pa, pq = _require_pyarrow()
+
+    root = Path(os.path.expanduser(str(root)))
+    written = {}
+    for name, frame in outcome_tables(outcomes, month=month).items():
+        if frame.empty:
+            written[name] = 0
+            continue
+        # 數值欄位直接使用 DataFrame 的記憶體，不逐筆轉換
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            root_path=str(root / name),
+            partitioning=_partitioning(pa),
+            existing_data_behavior='delete_matching',
+            basename_template='part-{i}.parquet',
+        )
+        written[name] = table.num_rows
+    return written
+
+
+def read_parquet_dataset(root, name='results', filters=None):
+    """讀回匯出的資料表為 DataFrame，filters 例如 [('month', '>=', '202501')]"""
+    pa, pq = _require_pyarrow()
+    root = Path(os.path.expanduser(str(root)))
+    return pq.read_table(str(root / name), partitioning=_partitioning(pa), filters=filters).to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - 匯出 Parquet")
+    parser.add_argument('input', help="batch_salary_runner.py 輸出的結果 JSON")
+    parser.add_argument('--output', required=True, help="Parquet 資料集根目錄")
+    parser.add_argument('--month', default=None, help="年月（例如 202506），未指定時由店名判斷")
+    args = parser.parse_args(argv)
+
+    with open(os.path.expanduser(args.input), encoding='utf-8') as f:
+        outcomes = json.load(f)
+    if isinstance(outcomes, dict):
+        outcomes = [outcomes]
+
+    try:
+        written = write_parquet_dataset(outcomes, args.output, month=args.month)
+    except (ImportError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"💾 Parquet 已匯出: {args.output}")
+    for name, rows in written.items():
+        print(f"   {name}: {rows:,} 筆")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
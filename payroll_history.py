@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 全店薪資歷史紀錄（稽核查詢用）
+把每間店每個月的 calculate_salary 結果與計算時的輸入（月報表數值、水光面膜組數、總業績、總消耗）
+只新增不修改地寫入 SQLite 資料庫（~/skinbar_report/payroll_history.sqlite），
+依分店、月份、淨膚師編號、姓名建立索引，查詢時以記憶體映射 (PRAGMA mmap_size) 讀取，
+逐筆回傳結果，不需要把整個資料庫載入記憶體，也不需要重新讀取封存的月報表
+
+只新增不修改:
+    每次寫入一店一月份為一筆計算紀錄 (runs)，同一店同一月份再次寫入時新增一筆，查詢預設使用最新的紀錄，
+    all_revisions=True 時包含被取代的舊紀錄；資料表設有觸發器，UPDATE / DELETE 一律拒絕
+
+使用方式:
+    python payroll_history.py append 202506.json                      # 寫入 batch_salary_runner.py 的結果 JSON
+    python batch_salary_runner.py ... --history ~/skinbar_report/payroll_history.sqlite
+    python payroll_history.py query --quarter 2025Q2 --filter "personal_performance>=300000" --output Q2_30萬.csv
+    python payroll_history.py query --name 王小美 --from 202501 --to 202506
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from payroll_aggregation import employee_key, outcome_store_month
+from payroll_records import Employee
+from salary_engine import SALARY_RESULT_COLUMNS
+
+DEFAULT_HISTORY_PATH = Path.home() / "skinbar_report" / "payroll_history.sqlite"
+DEFAULT_MMAP_BYTES = 256 * 1024 * 1024  # 256 MB
+
+SCHEMA_VERSION = 1
+
+# 計算時的輸入：月報表的進階課程工獎、產品銷售供獎與薪水結果的同名欄位不同，改名為 *_total
+INPUT_COLUMNS = {
+    'personal_performance': 'personal_performance',
+    'personal_consumption': 'personal_consumption',
+    'person_count': 'person_count',
+    'new_customer_rate': 'new_customer_rate',
+    'advanced_course_bonus': 'advanced_course_total',
+    'skill_bonus_total': 'skill_bonus_total',
+    'product_sales_bonus': 'product_sales_total',
+}
+RESULT_COLUMNS = [column for column in SALARY_RESULT_COLUMNS if column != 'name']
+
+ENTRY_COLUMNS = [
+    'store', 'month', 'therapist_id', 'employee', 'name', 'row', 'mask_count',
+    *INPUT_COLUMNS.values(), *RESULT_COLUMNS,
+]
+RUN_COLUMNS = [
+    'store', 'month', 'source_file', 'recorded_at', 'total_performance', 'total_consumption',
+    'date_sheet_count', 'num_formal_staff', 'team_bonus_per_person',
+]
+
+FILTER_OPERATORS = ('=', '==', '!=', '<', '<=', '>', '>=', 'in')
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    store TEXT NOT NULL,
+    month TEXT NOT NULL,
+    source_file TEXT,
+    recorded_at TEXT NOT NULL,
+    total_performance REAL,
+    total_consumption REAL,
+    date_sheet_count INTEGER,
+    num_formal_staff INTEGER,
+    team_bonus_per_person REAL
+);
+CREATE INDEX IF NOT EXISTS runs_store_month ON runs (store, month, run_id);
+CREATE INDEX IF NOT EXISTS runs_month ON runs (month);
+
+CREATE TABLE IF NOT EXISTS entries (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    store TEXT NOT NULL,
+    month TEXT NOT NULL,
+    therapist_id INTEGER,
+    employee TEXT,
+    name TEXT,
+    row INTEGER,
+    mask_count INTEGER,
+    {', '.join(f'{column} REAL' for column in INPUT_COLUMNS.values())},
+    {', '.join(f'{column} REAL' for column in RESULT_COLUMNS if column != 'is_formal_staff')},
+    is_formal_staff INTEGER
+);
+CREATE INDEX IF NOT EXISTS entries_run ON entries (run_id);
+CREATE INDEX IF NOT EXISTS entries_store_month ON entries (store, month);
+CREATE INDEX IF NOT EXISTS entries_month ON entries (month);
+CREATE INDEX IF NOT EXISTS entries_therapist ON entries (therapist_id, month);
+CREATE INDEX IF NOT EXISTS entries_employee ON entries (employee, month);
+
+CREATE TRIGGER IF NOT EXISTS runs_append_only_update BEFORE UPDATE ON runs
+BEGIN SELECT RAISE(ABORT, '薪資歷史只能新增，不能修改'); END;
+CREATE TRIGGER IF NOT EXISTS runs_append_only_delete BEFORE DELETE ON runs
+BEGIN SELECT RAISE(ABORT, '薪資歷史只能新增，不能刪除'); END;
+CREATE TRIGGER IF NOT EXISTS entries_append_only_update BEFORE UPDATE ON entries
+BEGIN SELECT RAISE(ABORT, '薪資歷史只能新增，不能修改'); END;
+CREATE TRIGGER IF NOT EXISTS entries_append_only_delete BEFORE DELETE ON entries
+BEGIN SELECT RAISE(ABORT, '薪資歷史只能新增，不能刪除'); END;
+"""
+
+# 同一店同一月份最新的計算紀錄
+_LATEST_RUN = "r.run_id = (SELECT MAX(latest.run_id) FROM runs AS latest WHERE latest.store = r.store AND latest.month = r.month)"
+
+
+def quarter_months(quarter):
+    """季 → (起始年月, 結束年月)，例如 2025Q2 → ('202504', '202506')"""
+    match = re.fullmatch(r'(\d{4})Q([1-4])', str(quarter).strip().upper())
+    if match is None:
+        raise ValueError(f"季的格式應為 2025Q2: {quarter}")
+    year, number = match.group(1), int(match.group(2))
+    return f"{year}{number * 3 - 2:02d}", f"{year}{number * 3:02d}"
+
+
+def _raw_employee(employee):
+    """員工的月報表原始數值：Employee 紀錄讀屬性（計算季獎金後 dict 方式會讀到季獎金），JSON 的 dict 直接使用"""
+    if isinstance(employee, Employee):
+        return {field: getattr(employee, field) for field in Employee.FIELDS}
+    return employee
+
+
+def _number(value):
+    """數值欄位：NaN 或空白存成 NULL"""
+    if value is None:
+        return None
+    value = value.item() if hasattr(value, 'item') else value
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class PayrollHistory:
+    """只新增不修改的薪資歷史資料庫"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, mmap_bytes=DEFAULT_MMAP_BYTES):
+        self.path = Path(os.path.expanduser(str(path)))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        # 讀取以記憶體映射取代 read()；WAL 讓寫入新月份時仍可同時查詢
+        self.connection.execute(f"PRAGMA mmap_size = {int(mmap_bytes)}")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append_outcome(self, outcome, month=None):
+        """寫入 run_store_payroll 的一間店一個月份，回傳 run_id；解析失敗的結果略過並回傳 None"""
+        if outcome.get('error'):
+            return None
+        with self.connection:
+            return self._insert(outcome, month)
+
+    def append_outcomes(self, outcomes, month=None):
+        """在同一個交易中寫入多間店，回傳新增的 run_id 列表"""
+        with self.connection:
+            return [run_id for run_id in (self._insert(outcome, month) for outcome in outcomes
+                                          if not outcome.get('error'))]
+
+    def _insert(self, outcome, month):
+        store, month = outcome_store_month(outcome, month)
+        run = {
+            'store': store,
+            'month': month,
+            'source_file': outcome.get('file'),
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'total_performance': _number(outcome.get('total_performance')),
+            'total_consumption': _number(outcome.get('total_consumption')),
+            'date_sheet_count': len(outcome.get('date_sheets') or []),
+            'num_formal_staff': _number(outcome.get('num_formal_staff')),
+            'team_bonus_per_person': _number(outcome.get('team_bonus_per_person')),
+        }
+        cursor = self.connection.execute(
+            f"INSERT INTO runs ({', '.join(RUN_COLUMNS)}) VALUES ({', '.join('?' * len(RUN_COLUMNS))})",
+            [run[column] for column in RUN_COLUMNS],
+        )
+        run_id = cursor.lastrowid
+
+        mask_sales = outcome.get('mask_sales') or {}
+        rows = []
+        seen = set()
+        # employees 與 results 順序相同；員工鍵值與 PayrollLedger 相同（同月份同名時加上編號）
+        for employee, result in zip(outcome['employees'], outcome['results']):
+            employee = _raw_employee(employee)
+            therapist_id = int(employee['row']) - 11
+            key = employee_key(employee['name'], therapist_id)
+            if key in seen:
+                key = f"{key}#{therapist_id}"
+            seen.add(key)
+            entry = {
+                'store': store,
+                'month': month,
+                'therapist_id': therapist_id,
+                'employee': key,
+                'name': result['name'],
+                'row': int(employee['row']),
+                'mask_count': int(mask_sales.get(str(therapist_id), 0)),
+            }
+            for field, column in INPUT_COLUMNS.items():
+                entry[column] = _number(employee.get(field))
+            for column in RESULT_COLUMNS:
+                entry[column] = _number(result[column])
+            entry['is_formal_staff'] = int(bool(result['is_formal_staff']))
+            rows.append([run_id, *(entry[column] for column in ENTRY_COLUMNS)])
+
+        self.connection.executemany(
+            f"INSERT INTO entries (run_id, {', '.join(ENTRY_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(ENTRY_COLUMNS) + 1))})",
+            rows,
+        )
+        return run_id
+
+    def months(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT month FROM runs ORDER BY month")]
+
+    def stores(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT store FROM runs ORDER BY store")]
+
+    @staticmethod
+    def _where(store=None, month=None, month_from=None, month_to=None, quarter=None, therapist_id=None,
+               name=None, filters=None, all_revisions=False, prefix='e', columns=ENTRY_COLUMNS):
+        """組出 WHERE 條件與參數；filters 為 [(欄位, 運算子, 值), ...]，欄位與運算子只接受已知的名稱"""
+        clauses = []
+        params = []
+        if quarter is not None:
+            month_from, month_to = quarter_months(quarter)
+        if store is not None:
+            clauses.append(f"{prefix}.store = ?")
+            params.append(store)
+        if month is not None:
+            clauses.append(f"{prefix}.month = ?")
+            params.append(str(month))
+        if month_from is not None:
+            clauses.append(f"{prefix}.month >= ?")
+            params.append(str(month_from))
+        if month_to is not None:
+            clauses.append(f"{prefix}.month <= ?")
+            params.append(str(month_to))
+        if therapist_id is not None:
+            clauses.append(f"{prefix}.therapist_id = ?")
+            params.append(int(therapist_id))
+        if name is not None:
+            clauses.append(f"{prefix}.employee = ?")
+            params.append(employee_key(name, None))
+        for column, operator, value in filters or ():
+            if column not in columns:
+                raise ValueError(f"不支援的欄位: {column}")
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"不支援的運算子: {operator}（可用: {', '.join(FILTER_OPERATORS)}）")
+            if operator == 'in':
+                values = list(value)
+                clauses.append(f"{prefix}.{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{prefix}.{column} {'=' if operator == '==' else operator} ?")
+                params.append(value)
+        if not all_revisions:
+            clauses.append(_LATEST_RUN)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+    def query(self, store=None, month=None, month_from=None, month_to=None, quarter=None, therapist_id=None,
+              name=None, filters=None, all_revisions=False):
+        """查詢員工薪資紀錄，逐筆回傳 dict（依分店、月份、淨膚師編號排序）
+
+        filters 例如 [('personal_performance', '>=', 300000)]、[('charge_target_bonus', '>', 0)]；
+        name 以 PayrollLedger 相同的方式正規化（去除「1.」編號前綴）後比對
+        """
+        where, params = self._where(store, month, month_from, month_to, quarter, therapist_id, name, filters,
+                                    all_revisions)
+        sql = (f"SELECT e.run_id, {', '.join(f'e.{column}' for column in ENTRY_COLUMNS)} "
+               f"FROM entries AS e JOIN runs AS r ON r.run_id = e.run_id {where} "
+               f"ORDER BY e.store, e.month, e.therapist_id, e.run_id")
+        for row in self.connection.execute(sql, params):
+            entry = dict(row)
+            entry['is_formal_staff'] = bool(entry['is_formal_staff'])
+            yield entry
+
+    def store_months(self, store=None, month=None, month_from=None, month_to=None, quarter=None,
+                     all_revisions=False):
+        """查詢各店各月份的總業績、總消耗等計算紀錄"""
+        where, params = self._where(store, month, month_from, month_to, quarter, all_revisions=all_revisions,
+                                    prefix='r', columns=RUN_COLUMNS)
+        sql = f"SELECT r.run_id, {', '.join(f'r.{column}' for column in RUN_COLUMNS)} FROM runs AS r {where} " \
+              f"ORDER BY r.store, r.month, r.run_id"
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+
+def parse_filter(text):
+    """「personal_performance>=300000」→ ('personal_performance', '>=', 300000.0)"""
+    match = re.fullmatch(r'\s*(\w+)\s*(>=|<=|!=|==|=|>|<)\s*(.+?)\s*', text)
+    if match is None:
+        raise ValueError(f"條件格式應為 欄位>=數值: {text}")
+    column, operator, value = match.groups()
+    try:
+        value = float(value)
+    except ValueError:
+        pass
+    return column, operator, value
+
+
+def write_rows(rows, output_path):
+    """逐筆寫出查詢結果（.csv / .json），回傳筆數"""
+    output_path = Path(os.path.expanduser(str(output_path)))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    if output_path.suffix.lower() == '.json':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for row in rows:
+                f.write(',\n' if count else '\n')
+                json.dump(row, f, ensure_ascii=False)
+                count += 1
+            f.write('\n]\n')
+        return count
+
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['run_id', *ENTRY_COLUMNS])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - 全店薪資歷史紀錄")
+    parser.add_argument('--db', default=str(DEFAULT_HISTORY_PATH), help="歷史資料庫路徑")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    append = commands.add_parser('append', help="寫入 batch_salary_runner.py 輸出的結果 JSON")
+    append.add_argument('input', nargs='+', help="結果 JSON")
+    append.add_argument('--month', default=None, help="年月（例如 202506），未指定時由檔名 / 店名判斷")
+
+    query = commands.add_parser('query', help="查詢員工薪資紀錄")
+    query.add_argument('--store', default=None, help="分店（不含年月，例如 skinbar_daan）")
+    query.add_argument('--month', default=None, help="年月，例如 202506")
+    query.add_argument('--from', dest='month_from', default=None, help="起始年月")
+    query.add_argument('--to', dest='month_to', default=None, help="結束年月")
+    query.add_argument('--quarter', default=None, help="季，例如 2025Q2")
+    query.add_argument('--therapist-id', type=int, default=None, help="淨膚師編號")
+    query.add_argument('--name', default=None, help="員工姓名")
+    query.add_argument('--filter', action='append', default=[], metavar='條件',
+                       help="數值條件，例如 personal_performance>=300000（可重複指定）")
+    query.add_argument('--all-revisions', action='store_true', help="包含被重新計算取代的舊紀錄")
+    query.add_argument('--output', default=None, help="輸出路徑 (.csv / .json)，未指定時顯示在畫面")
+    args = parser.parse_args(argv)
+
+    with PayrollHistory(args.db) as history:
+        if args.command == 'append':
+            for path in args.input:
+                with open(os.path.expanduser(path), encoding='utf-8') as f:
+                    outcomes = json.load(f)
+                outcomes = outcomes if isinstance(outcomes, list) else [outcomes]
+                try:
+                    run_ids = history.append_outcomes(outcomes, month=args.month)
+                except ValueError as e:
+                    print(f"❌ {path}: {e}")
+                    return 1
+                print(f"💾 {path}: 寫入 {len(run_ids)} 間店")
+            return 0
+
+        try:
+            rows = history.query(store=args.store, month=args.month, month_from=args.month_from,
+                                 month_to=args.month_to, quarter=args.quarter, therapist_id=args.therapist_id,
+                                 name=args.name, filters=[parse_filter(text) for text in args.filter],
+                                 all_revisions=args.all_revisions)
+            if args.output:
+                count = write_rows(rows, args.output)
+                print(f"💾 查詢結果已輸出: {args.output}（{count:,} 筆）")
+                return 0
+            count = 0
+            for row in rows:
+                print(f"{row['store']} {row['month']} #{row['therapist_id']} {row['name']}: "
+                      f"個人業績 {row['personal_performance'] or 0:,.0f}、總薪水 {row['total_salary'] or 0:,.0f}")
+                count += 1
+            print(f"📊 共 {count:,} 筆")
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
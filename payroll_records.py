@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 精簡的員工與薪水紀錄
+以 __slots__ dataclass 取代每位員工、每筆薪水結果一個 dict，彙整全年多店薪資時記憶體大幅減少
+
+- Employee        get_employee_data 的員工數據（計算季獎金後附帶 SeasonalBonus）
+- SeasonalBonus   calculate_seasonal_bonus 加到員工資料的季獎金
+- SalaryResult    calculate_salary 的薪水結果
+
+紀錄可以像 dict 一樣讀寫（record['name']、record.get(...)、dict(record)、{**record}），
+原本使用 dict 的 Streamlit 畫面與報表不需修改；to_dict() / from_dict() 可與原本的 dict 互相轉換
+"""
+
+from dataclasses import dataclass
+
+
+def _native(value):
+    """numpy 數值轉成 Python 原生型別（數值不變，但佔用較少記憶體）"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+class _DictAccess:
+    """以 dict 方式存取紀錄欄位，鍵值與原本的 dict 相同"""
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def keys(self):
+        return list(self.FIELDS)
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def to_dict(self):
+        """轉回原本的 dict"""
+        return {key: self[key] for key in self.keys()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """由原本的 dict 建立紀錄，多餘的鍵值忽略"""
+        return cls(**{key: _native(data[key]) for key in cls.FIELDS})
+
+
+@dataclass(slots=True)
+class SeasonalBonus(_DictAccess):
+    """季獎金（淨膚師編號 = 員工行號 - 11）"""
+
+    FIELDS = (
+        'person_count_bonus',
+        'charge_target_bonus',
+        'consumption_bonus',
+        'dual_target_bonus',
+        'advanced_course_bonus',
+        'product_sales_bonus',
+        'new_customer_rate_bonus',
+        'therapist_id',
+    )
+
+    person_count_bonus: int = 0
+    charge_target_bonus: int = 0
+    consumption_bonus: int = 0
+    dual_target_bonus: int = 0
+    advanced_course_bonus: float = 0
+    product_sales_bonus: float = 0
+    new_customer_rate_bonus: int = 0
+    therapist_id: int = 0
+
+
+# 計算季獎金後員工 dict 新增的鍵值（順序與 calculate_seasonal_bonus 相同）
+_BONUS_ADDED_KEYS = tuple(key for key in SeasonalBonus.FIELDS
+                          if key not in ('advanced_course_bonus', 'product_sales_bonus'))
+
+
+@dataclass(slots=True)
+class Employee(_DictAccess):
+    """員工數據，欄位與 get_employee_data 的 dict 相同
+
+    計算季獎金後 bonus 為 SeasonalBonus，以 dict 方式讀取時與原本的 dict 一樣：
+    advanced_course_bonus / product_sales_bonus 為季獎金的計算結果，並多出其他季獎金與 therapist_id；
+    原本的報表數值仍保留在同名屬性中
+    """
+
+    FIELDS = (
+        'name',
+        'personal_performance',
+        'personal_consumption',
+        'person_count',
+        'new_customer_rate',
+        'advanced_course_bonus',
+        'skill_bonus_total',
+        'product_sales_bonus',
+        'row',
+    )
+
+    name: str
+    personal_performance: float
+    personal_consumption: float
+    person_count: float
+    new_customer_rate: float
+    advanced_course_bonus: float
+    skill_bonus_total: float
+    product_sales_bonus: float
+    row: int
+    bonus: SeasonalBonus = None
+
+    def keys(self):
+        if self.bonus is None:
+            return list(self.FIELDS)
+        return [*self.FIELDS, *_BONUS_ADDED_KEYS]
+
+    def __getitem__(self, key):
+        if self.bonus is not None and key in SeasonalBonus.FIELDS:
+            return getattr(self.bonus, key)
+        return _DictAccess.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        # 與 dict 相同：寫入季獎金鍵值後才有季獎金，之後同名欄位讀寫的都是季獎金
+        if key in _BONUS_ADDED_KEYS and self.bonus is None:
+            self.bonus = SeasonalBonus(therapist_id=self.row - 11)
+        if self.bonus is not None and key in SeasonalBonus.FIELDS:
+            setattr(self.bonus, key, value)
+        else:
+            _DictAccess.__setitem__(self, key, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        employee = super(Employee, cls).from_dict(data)
+        if 'person_count_bonus' in data:
+            employee.bonus = SeasonalBonus.from_dict(data)
+        return employee
+
+
+@dataclass(slots=True)
+class SalaryResult(_DictAccess):
+    """薪水結果，欄位與 calculate_salary 的 dict 相同"""
+
+    FIELDS = (
+        'name',
+        'base_salary',
+        'meal_allowance',
+        'overtime_pay',
+        'skill_bonus',
+        'team_bonus',
+        'person_count_bonus',
+        'charge_target_bonus',
+        'consumption_bonus',
+        'dual_target_bonus',
+        'advanced_course_bonus',
+        'product_sales_bonus',
+        'new_customer_rate_bonus',
+        'total_salary',
+        'is_formal_staff',
+    )
+
+    name: str
+    base_salary: int
+    meal_allowance: int
+    overtime_pay: float
+    skill_bonus: float
+    team_bonus: int
+    person_count_bonus: int
+    charge_target_bonus: int
+    consumption_bonus: int
+    dual_target_bonus: int
+    advanced_course_bonus: float
+    product_sales_bonus: float
+    new_customer_rate_bonus: int
+    total_salary: float
+    is_formal_staff: bool
+
+
+def employees_from_dicts(employees):
+    return [Employee.from_dict(employee) for employee in employees]
+
+
+def results_from_dicts(results):
+    return [SalaryResult.from_dict(result) for result in results]
+
+
+def records_to_dicts(records):
+    """紀錄列表轉回 dict 列表（已經是 dict 的原樣複製）"""
+    return [record.to_dict() if isinstance(record, _DictAccess) else dict(record) for record in records]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 行程內共用結果快取
+同一個行程（例如 Streamlit 容器）中的所有使用者共用已解析的月報表與計算結果，
+第二位開啟同一份月報表的店長不需要重新解析
+
+- 依最近使用順序 (LRU) 淘汰，總容量 (max_bytes) 與筆數 (max_entries) 有上限
+- 每筆資料存放超過 ttl 秒後失效
+- 同一個鍵值正在計算時，其他執行緒等待同一份結果，不重複計算
+"""
+
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+DEFAULT_MAX_ENTRIES = 200
+DEFAULT_TTL = 6 * 60 * 60  # 6 小時
+
+
+def estimate_size(value):
+    """以 pickle 後的大小估計記憶體用量，無法 pickle 時回傳 None（無法估計，不存入快取）"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return None
+
+
+def rules_fingerprint(rules):
+    """獎金規則內容的雜湊，規則檔修改後結果快取自動失效"""
+    return hashlib.sha1(json.dumps(rules.config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+class ResultCache:
+    """執行緒安全的 LRU + TTL 快取"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key → (存入時間, 大小, 值)
+        self._pending = {}  # key → threading.Event，正在計算中的鍵值
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def get(self, key, default=None):
+        """取得快取值，不存在或已過期時回傳 default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[0]):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, size=None):
+        """存入快取並淘汰過期或最久未使用的資料；單筆超過總容量或無法估計大小時不存入"""
+        size = estimate_size(value) if size is None else size
+        if size is None or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), size, value)
+            self.total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        for key in [key for key, (stored_at, _, _) in self._entries.items() if self._expired(stored_at)]:
+            self._remove(key)
+        while self._entries and (self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            self._remove(next(iter(self._entries)))
+
+    def get_or_compute(self, key, compute):
+        """取得快取值，沒有時呼叫 compute() 計算並存入
+
+        多個執行緒同時要求同一個鍵值時只有一個執行 compute，其餘等待結果；
+        compute 失敗時例外交給呼叫者，等待中的執行緒會自行重新計算
+        """
+        while True:
+            marker = object()
+            value = self.get(key, marker)
+            if value is not marker:
+                return value
+
+            with self._lock:
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                pending.wait()
+                continue
+
+            try:
+                value = compute()
+                self.put(key, value)
+                return value
+            finally:
+                with self._lock:
+                    del self._pending[key]
+                pending.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """目前筆數、容量與命中次數"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 四職別計算引擎
+正式淨膚師、實習淨膚師、儲備店長、正式店長的薪資，計算方式與前端 frontend/src/lib/salary 的 calculateAll 相同，
+以欄位式（numpy 陣列）一次計算整張員工表，員工表可同時包含多間分店
+
+- 規則來自 salary_rules.json 的 roles；正式淨膚師的季獎金沿用 salary_engine.compute_seasonal_bonus_frame
+  （人次激勵獎金依 SalaryRules.person_count_tiers，非整數人次與前端 calcPersonCountBonus 相同）
+- 與前端的一致性以 salary_conformance.py 隨機輸入（含非整數、門檻前後的人次）檢查
+- 四捨五入與前端 Math.round 相同（.5 一律進位），個人消耗獎勵無條件捨去
+- 團獎、淨膚師目標達成獎（所有正式淨膚師都達標）、當月目標達成獎（E23）依分店分組計算
+
+員工表欄位:
+    name, role, personal_performance, personal_consumption, person_count, new_customer_rate,
+    vip_upgrade_rate, appointment_rate, advanced_course_bonus, skill_bonus_total, product_sales_bonus,
+    activity_product_count（活動產品組數，充值目標達成獎的面膜組數）,
+    total_performance, total_consumption, monthly_target（該店總業績、總消耗、當月目標）, store（選用）
+"""
+
+import numpy as np
+import pandas as pd
+
+from salary_engine import compute_seasonal_bonus_frame
+from salary_rules import load_salary_rules
+
+FORMAL = '正式淨膚師'
+TRAINEE = '實習淨膚師'
+RESERVE = '儲備店長'
+MANAGER = '正式店長'
+
+# 職別 → 結果分組（與前端 CalculationResults 的 formal / trainee / reserve / manager 相同）
+ROLE_KEYS = {FORMAL: 'formal', TRAINEE: 'trainee', RESERVE: 'reserve', MANAGER: 'manager'}
+
+# 各職別的結果欄位（前端 FormalResult、TraineeResult、ReserveResult、ManagerResult 的 snake_case）
+ROLE_RESULT_FIELDS = {
+    'formal': [
+        'name', 'role', 'fixed_salary', 'skill_bonus', 'team_bonus', 'team_bonus_deduction',
+        'team_bonus_disqualified', 'failed_metrics', 'person_count_bonus', 'charge_target_bonus',
+        'consumption_bonus', 'dual_target_bonus', 'advanced_course_bonus', 'product_sales_bonus',
+        'new_customer_rate_bonus', 'monthly_total', 'quarterly_total', 'grand_total',
+    ],
+    'trainee': [
+        'name', 'role', 'fixed_salary', 'consumption_sales_bonus', 'person_count_bonus',
+        'advanced_course_bonus', 'product_sales_bonus', 'monthly_total', 'quarterly_total', 'grand_total',
+    ],
+    'reserve': [
+        'name', 'role', 'fixed_salary', 'team_bonus', 'achievement_bonus', 'message_bonus',
+        'conversion_rate_bonus', 'service_consumption_bonus', 'store_management_bonus',
+        'therapist_goal_bonus', 'monthly_total', 'quarterly_total', 'grand_total',
+    ],
+    'manager': [
+        'name', 'role', 'fixed_salary', 'team_bonus', 'achievement_bonus', 'message_bonus',
+        'management_allowance', 'conversion_rate_bonus', 'service_consumption_bonus',
+        'store_management_bonus', 'monthly_total', 'quarterly_total', 'grand_total',
+    ],
+}
+
+ROLE_EMPLOYEE_COLUMNS = [
+    'personal_performance', 'personal_consumption', 'person_count', 'new_customer_rate',
+    'vip_upgrade_rate', 'appointment_rate', 'advanced_course_bonus', 'skill_bonus_total',
+    'product_sales_bonus', 'activity_product_count',
+]
+
+# 季獎金欄位（店長職別的季獎金依總業績抽成）
+QUARTERLY_RATE_FIELDS = ['conversion_rate_bonus', 'service_consumption_bonus', 'store_management_bonus']
+
+
+def js_round(values):
+    """與 JavaScript Math.round 相同的四捨五入（.5 一律往正無限大進位，Python round 為銀行家捨入）"""
+    values = np.asarray(values, dtype=float)
+    floor = np.floor(values)
+    return floor + (values - floor >= 0.5)
+
+
+def js_to_fixed(value, digits):
+    """與 JavaScript Number.prototype.toFixed 相同的格式（以實際二進位值四捨五入，.5 進位）"""
+    # -0 與 JavaScript 相同輸出為 0
+    value = float(value) or 0.0
+    # Python 格式化遇到剛好 .5 時取偶數；只有 value * 2^(digits+1) 為整數時可能剛好是 .5，改用 Decimal
+    if not (value * 2 ** (digits + 1)).is_integer():
+        return f"{value:.{digits}f}"
+    from decimal import ROUND_HALF_UP, Decimal
+
+    return str(Decimal(value).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+def _role_rules(rules):
+    if rules.role_rules is None:
+        raise ValueError("獎金規則沒有 roles 設定，無法計算四職別薪資")
+    return rules.role_rules
+
+
+def assign_roles(employees, roles):
+    """依店家設定的 roles（職別 → 員工行號列表）標上職別，沒有指定職別的員工不列入四職別計算
+
+    例如 {"正式淨膚師": [14, 15, 16], "實習淨膚師": [17], "儲備店長": [18], "正式店長": [19]}
+    """
+    row_roles = {}
+    for role, rows in roles.items():
+        if role not in ROLE_KEYS:
+            raise ValueError(f"未知的職別「{role}」，可用職別: {', '.join(ROLE_KEYS)}")
+        for row in rows:
+            row = int(row)
+            if row in row_roles:
+                raise ValueError(f"第{row}行同時指定為「{row_roles[row]}」與「{role}」")
+            row_roles[row] = role
+
+    assigned = []
+    for employee in employees:
+        role = row_roles.get(int(employee['row']))
+        if role is not None:
+            assigned.append({**dict(employee), 'role': role})
+    return assigned
+
+
+def role_employees_to_frame(employees, total_performance, total_consumption, monthly_target=0, store=None):
+    """把含 role 的員工 dict 列表轉成四職別計算用的員工表（單一分店）
+
+    沒有 VIP升單率 / 預約率 的員工為 NaN，正式淨膚師缺少指標時 compute_role_frame 會拋出錯誤
+    """
+    # 逐欄建立（不先建 DataFrame 再轉型），每間店只有數十位員工時建表成本遠低於逐欄 astype
+    employees = [dict(employee) for employee in employees]
+    count = len(employees)
+    data = {
+        'name': [employee.get('name') for employee in employees],
+        'role': [employee.get('role') for employee in employees],
+    }
+    for column in ROLE_EMPLOYEE_COLUMNS:
+        data[column] = np.array([employee.get(column) for employee in employees], dtype=float)
+    data['activity_product_count'] = np.nan_to_num(data['activity_product_count'])
+    data['total_performance'] = np.full(count, float(total_performance))
+    data['total_consumption'] = np.full(count, float(total_consumption))
+    data['monthly_target'] = np.full(count, float(monthly_target or 0))
+    if store is not None:
+        data['store'] = [store] * count
+    return pd.DataFrame(data)
+
+
+def store_team_bonus(rules, num_formal_staff, total_performance, total_consumption):
+    """四職別計算的團獎 (是否達標, 每人獎金)，依 roles.team_bonus_overachievement 決定是否適用超標級距"""
+    return rules.team_bonus_tier(num_formal_staff, total_performance, total_consumption,
+                                 overachievement=_role_rules(rules).team_bonus_overachievement)
+
+
+def compute_role_frame(frame, rules=None):
+    """計算四職別薪資，回傳結果表（index 與輸入相同）
+
+    結果表包含所有職別的欄位（不適用的欄位為 0），以及 role_key、team_bonus_per_person、team_bonus_qualified
+    rules 為 SalaryRules，未指定時使用 salary_rules.json
+    """
+    rules = rules or load_salary_rules()
+    role_rules = _role_rules(rules)
+
+    role = frame['role'].to_numpy(dtype=object)
+    unknown = sorted(set(role) - set(ROLE_KEYS))
+    if unknown:
+        raise ValueError(f"未知的職別: {', '.join(map(str, unknown))}")
+    is_formal = role == FORMAL
+    is_trainee = role == TRAINEE
+    is_reserve = role == RESERVE
+    is_manager = role == MANAGER
+
+    column = lambda name: frame[name].to_numpy(dtype=float)
+    performance = column('personal_performance')
+    consumption = column('personal_consumption')
+    person_count = column('person_count')
+    total_performance = column('total_performance')
+    total_consumption = column('total_consumption')
+    monthly_target = column('monthly_target')
+
+    # ── 各店：正式淨膚師人數 → 團獎；所有正式淨膚師是否達成淨膚師目標 ──
+    stores = frame['store'] if 'store' in frame.columns else pd.Series(0, index=frame.index)
+    codes, uniques = pd.factorize(stores, use_na_sentinel=False)
+    num_formal = np.bincount(codes, weights=is_formal, minlength=len(uniques))
+    first_rows = np.unique(codes, return_index=True)[1]
+    store_team = [
+        store_team_bonus(rules, int(num_formal[code]), total_performance[index], total_consumption[index])
+        for code, index in enumerate(first_rows)
+    ]
+    team_qualified = np.array([qualified for qualified, _ in store_team], dtype=bool)[codes]
+    team_bonus_per_person = np.array([bonus for _, bonus in store_team], dtype=float)[codes]
+    team_bonus = np.where(team_qualified, team_bonus_per_person, 0)
+
+    goal_met = ((consumption >= role_rules.therapist_goal_min_consumption) &
+                (performance >= role_rules.therapist_goal_min_performance) &
+                (person_count >= role_rules.therapist_goal_min_person_count))
+    # 沒有正式淨膚師時視為全員達標（與前端 Array.every 相同）
+    formal_goal_missed = np.bincount(codes, weights=is_formal & ~goal_met, minlength=len(uniques))
+    all_formal_goals = (formal_goal_missed == 0)[codes]
+
+    # ── 正式淨膚師：3項指標未達2項以上失去團獎，業績未達18萬團獎扣2000 ──
+    failed = []
+    for field, label, min_rate in role_rules.formal_metrics:
+        values = column(field)
+        missing = is_formal & np.isnan(values)
+        if missing.any():
+            names = ', '.join(map(str, frame['name'].to_numpy()[missing]))
+            raise ValueError(f"正式淨膚師缺少「{label}」數據（月報表彙整需有該欄表頭）: {names}")
+        rate = np.where(values > 1, values / 100, values)
+        failed.append((label, min_rate, rate, rate < min_rate))
+    failed_count = sum(mask.astype(int) for *_, mask in failed)
+    disqualified = failed_count >= role_rules.disqualify_failed_metrics
+    eligible = team_qualified & ~disqualified
+    team_bonus_deduction = np.where(eligible & (performance < role_rules.low_performance_below),
+                                    role_rules.low_performance_deduction, 0)
+    formal_team_bonus = np.maximum(0, np.where(eligible, team_bonus_per_person, 0) - team_bonus_deduction)
+
+    # 季獎金與正式淨膚師相同，充值目標以活動產品組數判斷
+    seasonal = compute_seasonal_bonus_frame(frame.assign(mask_count=frame['activity_product_count']), rules)
+    advanced_course_bonus = js_round(column('advanced_course_bonus'))
+    product_sales_bonus = js_round(column('product_sales_bonus'))
+    skill_bonus_total = column('skill_bonus_total')
+    person_count_bonus = seasonal['person_count_bonus'].to_numpy()
+    charge_target_bonus = seasonal['charge_target_bonus'].to_numpy()
+    consumption_bonus = seasonal['consumption_bonus'].to_numpy()
+    dual_target_bonus = seasonal['dual_target_bonus'].to_numpy()
+    new_customer_rate_bonus = seasonal['new_customer_rate_bonus'].to_numpy()
+
+    # ── 實習淨膚師：業績15萬 + 消耗12萬 → 消耗×銷售獎金 ──
+    consumption_sales_bonus = np.where(
+        (performance >= role_rules.trainee_min_performance) & (consumption >= role_rules.trainee_min_consumption),
+        role_rules.trainee_consumption_sales_bonus, 0)
+
+    # ── 儲備店長 / 正式店長：當月目標（E23）達成獎與季獎金依全店總業績抽成 ──
+    target_reached = (monthly_target > 0) & (total_performance >= monthly_target)
+    reserve_achievement = np.where(target_reached, js_round(total_performance * role_rules.reserve_achievement_rate), 0)
+    manager_achievement = np.where(target_reached, js_round(total_performance * role_rules.manager_achievement_rate), 0)
+    reserve_quarterly = {field: js_round(total_performance * role_rules.reserve_quarterly_rates[field])
+                         for field in QUARTERLY_RATE_FIELDS}
+    manager_quarterly = {field: js_round(total_performance * role_rules.manager_quarterly_rates[field])
+                         for field in QUARTERLY_RATE_FIELDS}
+    therapist_goal_bonus = np.where(all_formal_goals, role_rules.therapist_goal_bonus, 0)
+
+    fixed = np.full(len(frame), float(role_rules.fixed_salary))
+    only = lambda mask, values: np.where(mask, values, 0)
+    by_role = lambda formal, trainee, reserve, manager: np.select(
+        [is_formal, is_trainee, is_reserve, is_manager], [formal, trainee, reserve, manager], default=0)
+
+    # 加總順序與前端相同，浮點數結果一致
+    monthly_total = by_role(
+        fixed + skill_bonus_total + formal_team_bonus,
+        fixed,
+        fixed + team_bonus + reserve_achievement + role_rules.reserve_message_bonus,
+        fixed + team_bonus + manager_achievement + role_rules.manager_message_bonus + role_rules.manager_allowance,
+    )
+    quarterly_total = by_role(
+        person_count_bonus + charge_target_bonus + consumption_bonus + dual_target_bonus +
+        advanced_course_bonus + product_sales_bonus + new_customer_rate_bonus,
+        consumption_sales_bonus + person_count_bonus + advanced_course_bonus + product_sales_bonus,
+        reserve_quarterly['conversion_rate_bonus'] + reserve_quarterly['service_consumption_bonus'] +
+        reserve_quarterly['store_management_bonus'] + therapist_goal_bonus,
+        manager_quarterly['conversion_rate_bonus'] + manager_quarterly['service_consumption_bonus'] +
+        manager_quarterly['store_management_bonus'],
+    )
+
+    # 未達標指標說明只為未達標的正式淨膚師建立
+    failed_metrics = [[] for _ in range(len(frame))]
+    for label, min_rate, rate, mask in failed:
+        for index in np.flatnonzero(is_formal & mask):
+            failed_metrics[index].append(f"{label} {js_to_fixed(rate[index] * 100, 1)}% < {min_rate * 100:g}%")
+
+    result = pd.DataFrame({
+        'name': frame['name'].to_numpy(),
+        'role': role,
+        'role_key': frame['role'].map(ROLE_KEYS).to_numpy(),
+        'fixed_salary': fixed,
+        'skill_bonus': only(is_formal, js_round(skill_bonus_total)),
+        'team_bonus': by_role(formal_team_bonus, 0, team_bonus, team_bonus),
+        'team_bonus_deduction': only(is_formal, team_bonus_deduction),
+        'team_bonus_disqualified': is_formal & disqualified,
+        'failed_metrics': failed_metrics,
+        'person_count_bonus': only(is_formal | is_trainee, person_count_bonus),
+        'charge_target_bonus': only(is_formal, charge_target_bonus),
+        'consumption_bonus': only(is_formal, consumption_bonus),
+        'dual_target_bonus': only(is_formal, dual_target_bonus),
+        'advanced_course_bonus': only(is_formal | is_trainee, advanced_course_bonus),
+        'product_sales_bonus': only(is_formal | is_trainee, product_sales_bonus),
+        'new_customer_rate_bonus': only(is_formal, new_customer_rate_bonus),
+        'consumption_sales_bonus': only(is_trainee, consumption_sales_bonus),
+        'achievement_bonus': by_role(0, 0, reserve_achievement, manager_achievement),
+        'message_bonus': by_role(0, 0, role_rules.reserve_message_bonus, role_rules.manager_message_bonus),
+        'management_allowance': only(is_manager, role_rules.manager_allowance),
+        **{field: by_role(0, 0, reserve_quarterly[field], manager_quarterly[field]) for field in QUARTERLY_RATE_FIELDS},
+        'therapist_goal_bonus': only(is_reserve, therapist_goal_bonus),
+        'monthly_total': monthly_total,
+        'quarterly_total': quarterly_total,
+        'grand_total': monthly_total + quarterly_total,
+        'team_bonus_per_person': np.where(team_qualified, team_bonus_per_person, 0),
+        'team_bonus_qualified': team_qualified,
+    }, index=frame.index)
+    if 'store' in frame.columns:
+        result.insert(0, 'store', frame['store'].to_numpy())
+    return result
+
+
+def _native(value):
+    """numpy 數值 → Python 原生型別，整數金額以 int 輸出"""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def role_frame_to_results(result_frame, total_performance, total_consumption, team_qualified, team_bonus_per_person,
+                          monthly_target=0):
+    """單一分店的結果表 → 與前端 calculateAll 相同結構的 dict"""
+    results = {key: [] for key in ROLE_RESULT_FIELDS}
+    # 逐欄轉成 list 再組成每位員工的結果（比 to_dict('records') 快）
+    role_keys = result_frame['role_key'].tolist()
+    columns = {field: result_frame[field].tolist() for key in set(role_keys) for field in ROLE_RESULT_FIELDS[key]}
+    for index, role_key in enumerate(role_keys):
+        results[role_key].append({field: _native(columns[field][index]) for field in ROLE_RESULT_FIELDS[role_key]})
+    results.update({
+        'total_performance': _native(total_performance),
+        'total_consumption': _native(total_consumption),
+        'monthly_target': _native(monthly_target),
+        'team_bonus_per_person': _native(team_bonus_per_person if team_qualified else 0),
+        'team_bonus_qualified': bool(team_qualified),
+    })
+    return results
+
+
+def calculate_all(employees, total_performance, total_consumption, monthly_target=0, rules=None):
+    """計算單一分店四職別薪資（對應前端 calculateAll）
+
+    employees 為含 role 的員工 dict（欄位見模組說明），未指定職別的員工請先以 assign_roles 排除
+    """
+    rules = rules or load_salary_rules()
+    frame = role_employees_to_frame(employees, total_performance, total_consumption, monthly_target)
+    num_formal = int((frame['role'] == FORMAL).sum())
+    qualified, bonus = store_team_bonus(rules, num_formal, total_performance, total_consumption)
+    return role_frame_to_results(compute_role_frame(frame, rules), total_performance, total_consumption,
+                                 qualified, bonus, monthly_target=monthly_target)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - Python / 前端薪資計算一致性檢查
+隨機產生大量員工與月份輸入，分別以 Python 與前端 calculateAll（本機 Node 執行 frontend/src/lib/salary）計算，
+逐欄比對所有獎金欄位，任何一欄不同（包含浮點數最後一位）都列為不一致
+
+比對的 Python 計算:
+    role_engine（多店欄位式）  整批輸入放在同一張員工表，一次計算
+    role_engine.calculate_all   逐店計算
+    calculate_seasonal_bonus    AutoSalaryCalculator 逐筆計算的正式淨膚師季獎金（人次、充值、消耗、雙達標、新客）
+    compute_seasonal_bonus_frame salary_engine 欄位式計算的同五項季獎金
+隨機輸入刻意包含門檻值、.5 的金額（四捨五入方式）、百分比 / 小數兩種成交率、沒有團獎規則的人數
+
+需要 Node.js 與前端的 typescript 套件（cd frontend && npm ci）；
+沒有 Node 的環境可用 --golden 讀取先前以 --write-golden 存下的前端結果
+
+使用方式:
+    python salary_conformance.py --cases 5000 --seed 1
+    python salary_conformance.py --cases 5000 --write-golden conformance_golden.json
+    python salary_conformance.py --golden conformance_golden.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+from auto_salary_calculator import AutoSalaryCalculator
+from role_engine import (FORMAL, ROLE_KEYS, ROLE_RESULT_FIELDS, calculate_all, compute_role_frame,
+                         role_employees_to_frame, role_frame_to_results, store_team_bonus)
+from salary_engine import compute_seasonal_bonus_frame
+from salary_rules import SalaryRules, load_salary_rules
+
+NODE_RUNNER = Path(__file__).with_name('frontend') / 'scripts' / 'calculate-all.mjs'
+
+# 前端與 AutoSalaryCalculator 計算方式相同的正式淨膚師季獎金
+SHARED_SEASONAL_FIELDS = [
+    'person_count_bonus', 'charge_target_bonus', 'consumption_bonus', 'dual_target_bonus', 'new_customer_rate_bonus',
+]
+
+EMPLOYEE_FIELDS = [
+    'personal_performance', 'personal_consumption', 'person_count', 'new_customer_rate', 'vip_upgrade_rate',
+    'appointment_rate', 'advanced_course_bonus', 'skill_bonus_total', 'product_sales_bonus', 'activity_product_count',
+]
+
+
+def snake_to_camel(name):
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
+def camel_to_snake(name):
+    return ''.join(f"_{char.lower()}" if char.isupper() else char for char in name)
+
+
+# ── 隨機輸入 ─────────────────────────────────────────
+
+def _amount(rng, thresholds, high):
+    """金額：門檻值、門檻減 1、或隨機值（含小數）"""
+    kind = rng.random()
+    if kind < 0.3:
+        return rng.choice(thresholds)
+    if kind < 0.4:
+        return rng.choice(thresholds) - 1
+    if kind < 0.7:
+        return rng.randint(0, high)
+    return round(rng.uniform(0, high), 2)
+
+
+def _rate(rng, threshold):
+    """成交率：小數或百分比格式，含剛好達標、.25/.75（toFixed 進位方式）"""
+    return rng.choice([
+        rng.random(), rng.uniform(0, 100), threshold, threshold * 100, threshold - 0.01,
+        rng.randint(0, 100) + rng.choice([0.25, 0.75]), 1, 0,
+    ])
+
+
+def _bonus(rng):
+    """獎金累計：整數、.5（Math.round 進位方式）或任意小數"""
+    return rng.randint(0, 6000) + rng.choice([0, 0.5, 0.25, round(rng.random(), 3)])
+
+
+def _person_count(rng):
+    """人次：級距門檻、門檻前後的 .5（兩個級距之間的非整數人次）或隨機值（含一位小數）"""
+    return rng.choice([
+        110, 111, 132, 133, 109.5, 110.5, 111.5, 131.5, 132.5, 133.5,
+        rng.randint(80, 180), round(rng.uniform(100, 150), 1),
+    ])
+
+
+def random_case(rng):
+    """一間店一個月的輸入"""
+    num_employees = rng.randint(0, 10)
+    roles = rng.choices(list(ROLE_KEYS), weights=[5, 2, 1, 1], k=num_employees)
+    employees = []
+    for index, role in enumerate(roles):
+        employees.append({
+            'name': f"員工{index + 1}",
+            'role': role,
+            'row': 14 + index,
+            'personal_performance': _amount(rng, [150000, 180000, 250000, 300000], 400000),
+            'personal_consumption': _amount(rng, [120000, 180000, 200000], 300000),
+            'person_count': _person_count(rng),
+            'new_customer_rate': _rate(rng, 0.7),
+            'vip_upgrade_rate': _rate(rng, 0.65),
+            'appointment_rate': _rate(rng, 0.7),
+            'advanced_course_bonus': _bonus(rng),
+            'skill_bonus_total': _bonus(rng),
+            'product_sales_bonus': _bonus(rng),
+            'activity_product_count': rng.choice([6, 7, rng.randint(0, 15)]),
+        })
+
+    formal_performance = sum(e['personal_performance'] for e in employees if e['role'] == FORMAL)
+    total_performance = rng.choice([
+        formal_performance, rng.choice([500000, 750000, 1000000, 1250000, 1500000]),
+        round(rng.uniform(0, 2000000), 2), rng.randint(0, 2000000),
+    ])
+    total_consumption = rng.choice([
+        total_performance * 0.75, round(total_performance * rng.uniform(0.5, 1.0), 2), rng.randint(0, 2000000),
+    ])
+    monthly_target = rng.choice([0, total_performance, total_performance + 1, rng.randint(0, 2500000)])
+    return {
+        'employees': employees,
+        'total_performance': total_performance,
+        'total_consumption': total_consumption,
+        'monthly_target': monthly_target,
+    }
+
+
+def to_ts_case(case):
+    """Python 輸入 → 前端 calculateAll 的 (EmployeeWithRole[], ExcelData)"""
+    employees = []
+    formal_index = 0
+    for employee in case['employees']:
+        if employee['role'] == FORMAL:
+            formal_index += 1
+        employees.append({
+            'row': employee['row'],
+            'name': employee['name'],
+            **{snake_to_camel(field): employee[field] for field in EMPLOYEE_FIELDS},
+            'role': employee['role'],
+            'therapistId': formal_index,
+        })
+    return {
+        'employees': employees,
+        'excelData': {
+            'employees': [],
+            'totalPerformance': case['total_performance'],
+            'totalConsumption': case['total_consumption'],
+            'monthlyTarget': case['monthly_target'],
+        },
+    }
+
+
+# ── 各計算方式 ───────────────────────────────────────
+
+def run_node(cases, node='node'):
+    """以本機 Node 執行前端 calculateAll，回傳 CalculationResults 列表"""
+    payload = json.dumps([to_ts_case(case) for case in cases], ensure_ascii=False)
+    try:
+        completed = subprocess.run(
+            [node, str(NODE_RUNNER)], input=payload, capture_output=True, text=True,
+            encoding='utf-8', cwd=NODE_RUNNER.parent.parent,
+        )
+    except FileNotFoundError as e:
+        raise RuntimeError(f"找不到 Node.js（{node}），請安裝 Node 或改用 --golden") from e
+    if completed.returncode != 0:
+        raise RuntimeError(f"前端計算失敗: {completed.stderr.strip()}")
+    return json.loads(completed.stdout)
+
+
+def run_role_frame(cases, rules):
+    """所有輸入放在同一張多店員工表，以欄位式引擎一次計算"""
+    frames = [role_employees_to_frame(case['employees'], case['total_performance'], case['total_consumption'],
+                                      case['monthly_target'], store=index)
+              for index, case in enumerate(cases) if case['employees']]
+    by_store = {}
+    if frames:
+        result = compute_role_frame(pd.concat(frames, ignore_index=True), rules)
+        by_store = dict(tuple(result.groupby('store', sort=False)))
+
+    outcomes = []
+    for index, case in enumerate(cases):
+        num_formal = sum(employee['role'] == FORMAL for employee in case['employees'])
+        qualified, bonus = store_team_bonus(rules, num_formal, case['total_performance'], case['total_consumption'])
+        store_frame = by_store.get(index)
+        if store_frame is None:
+            store_frame = pd.DataFrame(columns=['role_key'])
+        outcomes.append(role_frame_to_results(store_frame, case['total_performance'], case['total_consumption'],
+                                              qualified, bonus, monthly_target=case['monthly_target']))
+    return outcomes
+
+
+def run_calculate_all(cases, rules):
+    return [calculate_all(case['employees'], case['total_performance'], case['total_consumption'],
+                          case['monthly_target'], rules=rules) for case in cases]
+
+
+def _formal_employees(case):
+    # AutoSalaryCalculator 以員工行號 - 11 對應水光面膜組數
+    employees = [dict(employee) for employee in case['employees'] if employee['role'] == FORMAL]
+    mask_sales = {str(employee['row'] - 11): employee['activity_product_count'] for employee in employees}
+    return employees, mask_sales
+
+
+def run_seasonal_scalar(cases, rules):
+    """AutoSalaryCalculator.calculate_seasonal_bonus（逐筆）的正式淨膚師季獎金"""
+    calculator = AutoSalaryCalculator(rules=rules)
+    outcomes = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for case in cases:
+            employees, mask_sales = _formal_employees(case)
+            employees = calculator.calculate_seasonal_bonus(employees, mask_sales, case['total_consumption'])
+            outcomes.append([{field: employee[field] for field in SHARED_SEASONAL_FIELDS} for employee in employees])
+    return outcomes
+
+
+def run_seasonal_frame(cases, rules):
+    """salary_engine.compute_seasonal_bonus_frame（欄位式）的正式淨膚師季獎金"""
+    rows = []
+    for index, case in enumerate(cases):
+        employees, mask_sales = _formal_employees(case)
+        for employee in employees:
+            rows.append({**employee, 'case': index, 'mask_count': mask_sales[str(employee['row'] - 11)]})
+    outcomes = [[] for _ in cases]
+    if rows:
+        frame = pd.DataFrame(rows)
+        seasonal = compute_seasonal_bonus_frame(frame, rules)
+        for case_index, record in zip(frame['case'], seasonal[SHARED_SEASONAL_FIELDS].to_dict('records')):
+            outcomes[case_index].append(record)
+    return outcomes
+
+
+# ── 比對 ─────────────────────────────────────────────
+
+def _same(expected, actual):
+    """數值完全相同（不容許誤差）；布林值不與 0/1 視為相同"""
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return isinstance(expected, bool) and isinstance(actual, bool) and expected == actual
+    return expected == actual
+
+
+def diff_results(expected, actual):
+    """比對單一店家的前端結果 (camelCase) 與 Python 結果 (snake_case)，回傳 [(欄位, 前端值, Python 值)]"""
+    mismatches = []
+    for key, expected_value in expected.items():
+        field = camel_to_snake(key)
+        if field in ROLE_RESULT_FIELDS:
+            records = actual.get(field, [])
+            if len(records) != len(expected_value):
+                mismatches.append((f"{field}.人數", len(expected_value), len(records)))
+                continue
+            for index, (expected_record, record) in enumerate(zip(expected_value, records)):
+                mismatches.extend(
+                    (f"{field}[{index}].{name}", value, found)
+                    for name, value, found in diff_results(expected_record, record)
+                )
+                extra = set(record) - {camel_to_snake(name) for name in expected_record}
+                mismatches.extend((f"{field}[{index}].{name}", None, record[name]) for name in sorted(extra))
+        elif field not in actual:
+            mismatches.append((field, expected_value, '（缺少）'))
+        elif not _same(expected_value, actual[field]):
+            mismatches.append((field, expected_value, actual[field]))
+    return mismatches
+
+
+def diff_seasonal(expected, actual):
+    """比對前端正式淨膚師的五項季獎金"""
+    if len(expected['formal']) != len(actual):
+        return [('formal.人數', len(expected['formal']), len(actual))]
+    mismatches = []
+    for index, (record, found) in enumerate(zip(expected['formal'], actual)):
+        for field in SHARED_SEASONAL_FIELDS:
+            value = record[snake_to_camel(field)]
+            if not _same(value, found[field]):
+                mismatches.append((f"formal[{index}].{field}", value, found[field]))
+    return mismatches
+
+
+ENGINES = {
+    'role_engine（多店欄位式）': (run_role_frame, diff_results),
+    'role_engine.calculate_all': (run_calculate_all, diff_results),
+    'calculate_seasonal_bonus': (run_seasonal_scalar, diff_seasonal),
+    'compute_seasonal_bonus_frame': (run_seasonal_frame, diff_seasonal),
+}
+
+
+def check_conformance(cases, expected, rules=None):
+    """以各 Python 計算方式計算 cases 並與前端結果 expected 比對，回傳 [(計算方式, 第幾筆, 欄位, 前端值, Python 值)]"""
+    rules = rules or load_salary_rules()
+    mismatches = []
+    for engine, (run, diff) in ENGINES.items():
+        for index, (expected_result, actual) in enumerate(zip(expected, run(cases, rules))):
+            mismatches.extend((engine, index, *mismatch) for mismatch in diff(expected_result, actual))
+    return mismatches
+
+
+def print_report(cases, mismatches, show=10):
+    if not mismatches:
+        print(f"✅ {len(cases):,} 筆輸入、{len(ENGINES)} 種 Python 計算方式與前端結果完全一致")
+        return
+    print(f"❌ {len(mismatches):,} 個欄位不一致（{len({m[1] for m in mismatches}):,} 筆輸入）")
+    counts = Counter((engine, field.split('.')[-1]) for engine, _, field, *_ in mismatches)
+    for (engine, field), count in counts.most_common():
+        print(f"   {engine} {field}: {count:,}")
+    print(f"\n前 {min(show, len(mismatches))} 個不一致:")
+    for engine, index, field, expected, actual in mismatches[:show]:
+        print(f"   [{index}] {engine} {field}: 前端 {expected!r}，Python {actual!r}")
+    first = mismatches[0][1]
+    print(f"\n第 {first} 筆輸入:")
+    print(json.dumps(cases[first], ensure_ascii=False, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - Python / 前端薪資計算一致性檢查")
+    parser.add_argument('--cases', type=int, default=2000, help="隨機輸入筆數（每筆為一間店一個月）")
+    parser.add_argument('--seed', type=int, default=0, help="隨機種子")
+    parser.add_argument('--node', default='node', help="Node.js 執行檔")
+    parser.add_argument('--rules', default=None, help="獎金規則檔 (JSON)，預設 salary_rules.json")
+    parser.add_argument('--golden', default=None, help="改用先前存下的輸入與前端結果，不執行 Node")
+    parser.add_argument('--write-golden', default=None, help="把輸入與前端結果存成 JSON")
+    parser.add_argument('--show', type=int, default=10, help="列出的不一致筆數")
+    args = parser.parse_args(argv)
+
+    rules = SalaryRules.from_file(args.rules) if args.rules else load_salary_rules()
+    try:
+        if args.golden:
+            with open(os.path.expanduser(args.golden), encoding='utf-8') as f:
+                golden = json.load(f)
+            cases, expected = golden['cases'], golden['expected']
+        else:
+            rng = random.Random(args.seed)
+            cases = [random_case(rng) for _ in range(args.cases)]
+            expected = run_node(cases, node=args.node)
+    except (OSError, RuntimeError, KeyError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    if args.write_golden:
+        with open(os.path.expanduser(args.write_golden), 'w', encoding='utf-8') as f:
+            json.dump({'seed': args.seed, 'cases': cases, 'expected': expected}, f, ensure_ascii=False)
+        print(f"💾 前端結果已存成: {args.write_golden}")
+
+    mismatches = check_conformance(cases, expected, rules)
+    print_report(cases, mismatches, show=args.show)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
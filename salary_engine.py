@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 欄位式批次計算引擎
+一次計算整張員工表（可包含全部分店），所有獎金規則以陣列運算完成，
+結果與 AutoSalaryCalculator.calculate_seasonal_bonus / calculate_salary 相同
+
+員工表欄位（get_employee_data 的欄位再加上）:
+    mask_count              水光面膜銷售組數
+    is_formal_staff         是否為正式淨膚師
+    team_bonus_per_person   該店每位正式淨膚師的團獎
+    store                   分店（選填）
+"""
+
+import numpy as np
+import pandas as pd
+
+from payroll_records import results_from_dicts
+from salary_rules import load_salary_rules
+
+# get_employee_data 產生的數值欄位
+EMPLOYEE_NUMERIC_COLUMNS = [
+    'personal_performance',
+    'personal_consumption',
+    'person_count',
+    'new_customer_rate',
+    'advanced_course_bonus',
+    'skill_bonus_total',
+    'product_sales_bonus',
+]
+
+SEASONAL_BONUS_COLUMNS = [
+    'person_count_bonus',
+    'charge_target_bonus',
+    'consumption_bonus',
+    'dual_target_bonus',
+    'advanced_course_bonus',
+    'product_sales_bonus',
+    'new_customer_rate_bonus',
+]
+
+# calculate_salary 的結果欄位（順序相同）
+SALARY_RESULT_COLUMNS = [
+    'name',
+    'base_salary',
+    'meal_allowance',
+    'overtime_pay',
+    'skill_bonus',
+    'team_bonus',
+    'person_count_bonus',
+    'charge_target_bonus',
+    'consumption_bonus',
+    'dual_target_bonus',
+    'advanced_course_bonus',
+    'product_sales_bonus',
+    'new_customer_rate_bonus',
+    'total_salary',
+    'is_formal_staff',
+]
+
+
+def employees_to_frame(employees, mask_sales, formal_staff_positions, team_bonus_per_person, store=None):
+    """把 get_employee_data 的員工 dict 列表轉成計算引擎用的員工表
+
+    淨膚師編號與 calculate_seasonal_bonus 相同，以員工行號 - 11 推算
+    """
+    # employees 也可以是 Employee 紀錄，dict(employee) 取得與原本 dict 相同的欄位
+    frame = pd.DataFrame([dict(employee) for employee in employees], columns=['name', *EMPLOYEE_NUMERIC_COLUMNS, 'row'])
+    frame[EMPLOYEE_NUMERIC_COLUMNS] = frame[EMPLOYEE_NUMERIC_COLUMNS].astype(float)
+    frame['therapist_id'] = frame['row'] - 11
+    frame['mask_count'] = [mask_sales.get(str(therapist_id), 0) for therapist_id in frame['therapist_id']]
+    frame['is_formal_staff'] = frame['row'].isin(list(formal_staff_positions))
+    frame['team_bonus_per_person'] = team_bonus_per_person
+    if store is not None:
+        frame['store'] = store
+    return frame
+
+
+def compute_seasonal_bonus_frame(frame, rules=None):
+    """計算七項季獎金，回傳以季獎金欄位組成的 DataFrame（index 與輸入相同）
+    rules 為 SalaryRules，未指定時使用 salary_rules.json
+    """
+    rules = rules or load_salary_rules()
+    person_count = frame['person_count'].to_numpy(dtype=float)
+    performance = frame['personal_performance'].to_numpy(dtype=float)
+    consumption = frame['personal_consumption'].to_numpy(dtype=float)
+    mask_count = frame['mask_count'].to_numpy(dtype=float)
+    new_customer_rate = frame['new_customer_rate'].to_numpy(dtype=float)
+
+    # 1. 人次激勵獎金：111-132人每人100元，133人以上每人200元
+    person_count_bonus = rules.person_count_bonus_array(person_count)
+
+    # 2. 充值目標達成獎：面膜7組以上，業績25萬 → 2000、30萬 → 7000
+    charge_target_bonus = rules.charge_target_bonus_array(performance, mask_count)
+
+    # 3. 個人消耗獎勵：18萬抽1.5%，20萬抽2.5%（無條件捨去）
+    consumption_bonus = rules.consumption_bonus_array(consumption)
+
+    # 4. 消耗充值雙達標獎：前兩項同時有獎金
+    dual_target_bonus = np.where((charge_target_bonus > 0) & (consumption_bonus > 0), rules.dual_target_bonus, 0)
+
+    # 7. 新客成交率70%獎金：人次132 + 成交率70%（大於1視為百分比）
+    new_customer_rate_bonus = rules.new_customer_rate_bonus_array(person_count, new_customer_rate)
+
+    return pd.DataFrame({
+        'person_count_bonus': person_count_bonus,
+        'charge_target_bonus': charge_target_bonus,
+        'consumption_bonus': consumption_bonus,
+        'dual_target_bonus': dual_target_bonus,
+        # 5、6. 進階課程工獎、產品銷售供獎直接使用表內數據
+        'advanced_course_bonus': frame['advanced_course_bonus'].to_numpy(dtype=float),
+        'product_sales_bonus': frame['product_sales_bonus'].to_numpy(dtype=float),
+        'new_customer_rate_bonus': new_customer_rate_bonus,
+    }, index=frame.index)
+
+
+def compute_salary_frame(calculator, frame):
+    """計算薪水，回傳與 calculate_salary 相同欄位的 DataFrame
+
+    calculator 提供底薪、伙食費、加班費設定；非正式淨膚師沒有團獎與季獎金
+    （進階課程工獎、產品銷售供獎所有員工都有）
+    """
+    seasonal = compute_seasonal_bonus_frame(frame, calculator.rules)
+    is_formal = frame['is_formal_staff'].to_numpy(dtype=bool)
+    formal_only = lambda values: np.where(is_formal, values, 0)
+
+    base = np.full(len(frame), calculator.base_salary)
+    meal = np.full(len(frame), calculator.meal_allowance)
+    overtime = np.full(len(frame), calculator.overtime_pay)
+    skill_bonus = frame['skill_bonus_total'].to_numpy(dtype=float)
+    team_bonus = formal_only(frame['team_bonus_per_person'].to_numpy(dtype=float))
+    person_count_bonus = formal_only(seasonal['person_count_bonus'].to_numpy())
+    charge_target_bonus = formal_only(seasonal['charge_target_bonus'].to_numpy())
+    consumption_bonus = formal_only(seasonal['consumption_bonus'].to_numpy())
+    dual_target_bonus = formal_only(seasonal['dual_target_bonus'].to_numpy())
+    new_customer_rate_bonus = formal_only(seasonal['new_customer_rate_bonus'].to_numpy())
+    advanced_course_bonus = seasonal['advanced_course_bonus'].to_numpy()
+    product_sales_bonus = seasonal['product_sales_bonus'].to_numpy()
+
+    # 加總順序與 calculate_salary 相同，浮點數結果一致
+    total_salary = (base + meal + overtime + skill_bonus + team_bonus +
+                    person_count_bonus + charge_target_bonus + consumption_bonus +
+                    dual_target_bonus + advanced_course_bonus + product_sales_bonus +
+                    new_customer_rate_bonus)
+
+    result = pd.DataFrame({
+        'name': frame['name'].to_numpy(),
+        'base_salary': base,
+        'meal_allowance': meal,
+        'overtime_pay': overtime,
+        'skill_bonus': skill_bonus,
+        'team_bonus': team_bonus,
+        'person_count_bonus': person_count_bonus,
+        'charge_target_bonus': charge_target_bonus,
+        'consumption_bonus': consumption_bonus,
+        'dual_target_bonus': dual_target_bonus,
+        'advanced_course_bonus': advanced_course_bonus,
+        'product_sales_bonus': product_sales_bonus,
+        'new_customer_rate_bonus': new_customer_rate_bonus,
+        'total_salary': total_salary,
+        'is_formal_staff': is_formal,
+    }, index=frame.index)
+    if 'store' in frame.columns:
+        result.insert(0, 'store', frame['store'].to_numpy())
+    return result
+
+
+def frame_to_results(salary_frame, records=False):
+    """把 compute_salary_frame 的結果轉回 calculate_salary 的 dict 列表
+    records=True 時回傳 SalaryResult 紀錄
+    """
+    results = salary_frame[SALARY_RESULT_COLUMNS].to_dict('records')
+    return results_from_dicts(results) if records else results
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 由已擷取的數據計算薪水（快速啟動）
+不讀取 Excel，只用純 Python 計算季獎金、團獎與薪水，不載入 pandas / openpyxl，
+適合獎金規則調整後以既有的擷取結果重新計算
+
+輸入 JSON 為單一店家的 dict，或 batch_salary_runner.py --output *.json 的結果清單:
+    {
+        "store": "skinbar_daan202506",
+        "total_performance": 1234567, "total_consumption": 987654,
+        "mask_sales": {"3": 12, "4": 5},
+        "employees": [{"name": "...", "row": 14, "personal_performance": ..., ...}],
+        "formal_staff_rows": [14, 15, 16],
+        "num_formal_staff": 3
+    }
+employees 的欄位與 AutoSalaryCalculator.get_employee_data 相同；num_formal_staff 未填時使用 formal_staff_rows 的人數
+
+使用方式:
+    python salary_from_json.py 202506.json --rules salary_rules.json --output results.json
+    cat store.json | python salary_from_json.py -
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import sys
+
+from auto_salary_calculator import AutoSalaryCalculator
+
+# 輸入中沿用的擷取欄位，其餘（上次的計算結果、log 等）重新計算或捨棄
+INPUT_FIELDS = ('store', 'file', 'total_performance', 'total_consumption', 'date_sheets',
+                'mask_sales', 'formal_staff_rows', 'num_formal_staff')
+
+
+def compute_store_salary(calculator, store_inputs):
+    """以單一店家的擷取數據計算薪水，回傳與 batch_salary_runner 相同格式的結果 dict"""
+    outcome = {field: store_inputs[field] for field in INPUT_FIELDS if field in store_inputs}
+    outcome['error'] = None
+    try:
+        total_performance = store_inputs['total_performance']
+        total_consumption = store_inputs['total_consumption']
+        # JSON 的鍵值一定是字串，與 count_mask_sales 的淨膚師編號格式相同
+        mask_sales = {str(therapist_id): count for therapist_id, count in store_inputs.get('mask_sales', {}).items()}
+        formal_staff_positions = list(store_inputs['formal_staff_rows'])
+        num_formal_staff = store_inputs.get('num_formal_staff', len(formal_staff_positions))
+        # 計算會在員工資料上加入季獎金欄位，複製一份避免修改輸入
+        employees = copy.deepcopy(store_inputs['employees'])
+        if not employees:
+            raise ValueError("沒有找到任何員工數據")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            employees = calculator.calculate_seasonal_bonus(employees, mask_sales, total_consumption)
+            team_bonus_per_person = calculator.calculate_team_bonus(
+                num_formal_staff, total_performance, total_consumption
+            )
+            results = calculator.calculate_salary(employees, team_bonus_per_person, formal_staff_positions)
+
+        outcome.update({
+            'mask_sales': mask_sales,
+            'num_formal_staff': num_formal_staff,
+            'team_bonus_per_person': team_bonus_per_person,
+            'results': results,
+        })
+    except (KeyError, TypeError, ValueError) as e:
+        outcome['error'] = f"{type(e).__name__}: {e}"
+    return outcome
+
+
+def compute_salaries(inputs, rules=None):
+    """計算一間或多間店家；inputs 為 dict 時回傳 dict，為 list 時回傳 list"""
+    calculator = AutoSalaryCalculator(rules=rules)
+    if isinstance(inputs, dict):
+        return compute_store_salary(calculator, inputs)
+    # 批次結果中解析失敗的店家沒有擷取數據，原樣保留錯誤訊息
+    return [store_inputs if store_inputs.get('error') else compute_store_salary(calculator, store_inputs)
+            for store_inputs in inputs]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - 由已擷取的數據計算薪水")
+    parser.add_argument('input', help="擷取結果 JSON 檔（- 代表標準輸入）")
+    parser.add_argument('--rules', default=None, help="獎金規則檔 (JSON)，預設 salary_rules.json")
+    parser.add_argument('--output', default=None, help="結果輸出路徑 (JSON)，未指定時輸出到標準輸出")
+    args = parser.parse_args(argv)
+
+    if args.input == '-':
+        inputs = json.load(sys.stdin)
+    else:
+        with open(os.path.expanduser(args.input), encoding='utf-8') as f:
+            inputs = json.load(f)
+
+    outcomes = compute_salaries(inputs, rules=args.rules)
+
+    if args.output:
+        with open(os.path.expanduser(args.output), 'w', encoding='utf-8') as f:
+            json.dump(outcomes, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(outcomes, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
+
+    failed = [outcome for outcome in (outcomes if isinstance(outcomes, list) else [outcomes]) if outcome['error']]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - Excel 薪資報表
+由 calculate_salary 的結果建立「薪資明細」與「總覽」兩張工作表，
+Streamlit 網頁版的下載報表與效能測試共用；多店批次另有連鎖報表（每店一張工作表 + 全店總覽）
+
+報表以 openpyxl write_only 模式逐列寫出，記憶體用量不隨列數增加；
+每位員工的基本薪資與季獎金小計只計算一次，總覽直接使用累計結果
+"""
+
+import io
+import re
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+# 薪資明細欄位
+DETAIL_COLUMNS = [
+    '員工姓名', '身份', '底薪', '伙食費', '加班費', '手技獎金', '團獎', '基本薪資小計',
+    '人次激勵獎金', '充值目標達成獎', '個人消耗獎勵', '消耗充值雙達標獎', '進階課程工獎',
+    '產品銷售供獎', '新客成交率70%獎金', '季獎金小計', '總薪資',
+]
+
+# 連鎖報表「全店總覽」欄位
+CHAIN_SUMMARY_COLUMNS = [
+    '分店', '業績總額', '消耗總額', '消耗比例', '正式淨膚師人數', '員工人數',
+    '基本薪資總計', '季獎金總計', '薪資總額', '狀態',
+]
+
+CHAIN_SUMMARY_SHEET = '全店總覽'
+
+# Excel 工作表名稱不可包含的字元與長度上限
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+_MAX_SHEET_NAME = 31
+
+
+def basic_salary_total(result):
+    """基本薪資小計：底薪 + 伙食費 + 加班費 + 手技獎金 + 團獎"""
+    return (
+        result['base_salary'] + result['meal_allowance'] +
+        result['overtime_pay'] + result['skill_bonus'] + result['team_bonus']
+    )
+
+
+def seasonal_bonus_total(result):
+    """季獎金小計"""
+    return (
+        result['person_count_bonus'] + result['charge_target_bonus'] +
+        result['consumption_bonus'] + result['dual_target_bonus'] +
+        result['advanced_course_bonus'] + result['product_sales_bonus'] +
+        result['new_customer_rate_bonus']
+    )
+
+
+class ReportTotals:
+    """逐列累計的報表小計"""
+
+    def __init__(self):
+        self.employees = 0
+        self.formal_staff = 0
+        self.basic_salary = 0
+        self.seasonal_bonus = 0
+        self.total_salary = 0
+
+    def detail_rows(self, results):
+        """產生薪資明細列（欄位同 DETAIL_COLUMNS），同時累計小計"""
+        for result in results:
+            basic = basic_salary_total(result)
+            seasonal = seasonal_bonus_total(result)
+            self.employees += 1
+            self.formal_staff += bool(result['is_formal_staff'])
+            self.basic_salary += basic
+            self.seasonal_bonus += seasonal
+            self.total_salary += result['total_salary']
+            yield [
+                result['name'],
+                '正式淨膚師' if result['is_formal_staff'] else '一般員工',
+                result['base_salary'],
+                result['meal_allowance'],
+                result['overtime_pay'],
+                result['skill_bonus'],
+                result['team_bonus'],
+                basic,
+                result['person_count_bonus'],
+                result['charge_target_bonus'],
+                result['consumption_bonus'],
+                result['dual_target_bonus'],
+                result['advanced_course_bonus'],
+                result['product_sales_bonus'],
+                result['new_customer_rate_bonus'],
+                seasonal,
+                result['total_salary'],
+            ]
+
+
+def _consumption_rate(total_performance, total_consumption):
+    return f"{(total_consumption/total_performance)*100:.1f}%" if total_performance > 0 else "0%"
+
+
+def summary_rows(totals, total_performance, total_consumption):
+    """總覽表的 (項目, 金額/比例)"""
+    return [
+        ['業績總額', f"{total_performance:,.0f} 元"],
+        ['消耗總額', f"{total_consumption:,.0f} 元"],
+        ['消耗比例', _consumption_rate(total_performance, total_consumption)],
+        ['基本薪資總計', f"{totals.basic_salary:,.0f} 元"],
+        ['季獎金總計', f"{totals.seasonal_bonus:,.0f} 元"],
+        ['全店薪資總額', f"{totals.total_salary:,.0f} 元"],
+    ]
+
+
+def build_report_detail(results):
+    """薪資明細表 (DataFrame)"""
+    import pandas as pd
+
+    return pd.DataFrame(list(ReportTotals().detail_rows(results)), columns=DETAIL_COLUMNS)
+
+
+def build_report_summary(results, total_performance, total_consumption):
+    """總覽表 (DataFrame)"""
+    import pandas as pd
+
+    totals = ReportTotals()
+    for _ in totals.detail_rows(results):
+        pass
+    return pd.DataFrame(summary_rows(totals, total_performance, total_consumption), columns=['項目', '金額/比例'])
+
+
+def _header(worksheet, columns):
+    cells = []
+    for column in columns:
+        cell = WriteOnlyCell(worksheet, value=column)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    return cells
+
+
+def _sheet_title(name, used):
+    """合法且不重複的工作表名稱"""
+    base = _INVALID_SHEET_CHARS.sub('_', str(name)).strip("'") or '分店'
+    title = base[:_MAX_SHEET_NAME]
+    index = 2
+    while title.lower() in used:
+        suffix = f"_{index}"
+        title = base[:_MAX_SHEET_NAME - len(suffix)] + suffix
+        index += 1
+    used.add(title.lower())
+    return title
+
+
+def _save(workbook, output):
+    output = output if output is not None else io.BytesIO()
+    workbook.save(output)
+    return output
+
+
+def write_salary_report(results, total_performance, total_consumption, output=None, progress=None):
+    """把薪資明細與總覽寫成 Excel，output 未指定時寫入新的 BytesIO 並回傳
+
+    progress(done, total, message) 在每寫完一位員工與存檔完成時回報進度（與 StageProfiler.progress 相同）
+    """
+    workbook = Workbook(write_only=True)
+    detail_sheet = workbook.create_sheet('薪資明細')
+    summary_sheet = workbook.create_sheet('總覽')
+
+    # 每位員工一步，最後存檔一步
+    total_steps = len(results) + 1
+    totals = ReportTotals()
+    detail_sheet.append(_header(detail_sheet, DETAIL_COLUMNS))
+    for index, row in enumerate(totals.detail_rows(results), start=1):
+        detail_sheet.append(row)
+        if progress is not None:
+            progress(index, total_steps, f"寫入 {row[0]} 的薪資明細")
+
+    summary_sheet.append(_header(summary_sheet, ['項目', '金額/比例']))
+    for row in summary_rows(totals, total_performance, total_consumption):
+        summary_sheet.append(row)
+    output = _save(workbook, output)
+    if progress is not None:
+        progress(total_steps, total_steps, "報表存檔完成")
+    return output
+
+
+def write_chain_report(outcomes, output=None):
+    """連鎖報表：第一張為「全店總覽」（每店一列 + 合計），其後每店一張薪資明細
+
+    outcomes 為 batch_salary_runner.run_store_payroll 的結果列表；解析失敗的店家只在總覽列出錯誤
+    output 未指定時寫入新的 BytesIO 並回傳
+    """
+    workbook = Workbook(write_only=True)
+    summary_sheet = workbook.create_sheet(CHAIN_SUMMARY_SHEET)
+    summary_sheet.append(_header(summary_sheet, CHAIN_SUMMARY_COLUMNS))
+
+    used_titles = {CHAIN_SUMMARY_SHEET.lower()}
+    chain = ReportTotals()
+    chain_performance = 0
+    chain_consumption = 0
+    for outcome in outcomes:
+        if outcome.get('error'):
+            summary_sheet.append([outcome['store'], None, None, None, None, None, None, None, None, outcome['error']])
+            continue
+
+        total_performance = outcome['total_performance']
+        total_consumption = outcome['total_consumption']
+        store_sheet = workbook.create_sheet(_sheet_title(outcome['store'], used_titles))
+        store_sheet.append(_header(store_sheet, DETAIL_COLUMNS))
+        totals = ReportTotals()
+        for row in totals.detail_rows(outcome['results']):
+            store_sheet.append(row)
+        store_sheet.append(['合計', None, None, None, None, None, None, totals.basic_salary,
+                            *[None] * 7, totals.seasonal_bonus, totals.total_salary])
+
+        summary_sheet.append([
+            outcome['store'], total_performance, total_consumption,
+            _consumption_rate(total_performance, total_consumption),
+            totals.formal_staff, totals.employees,
+            totals.basic_salary, totals.seasonal_bonus, totals.total_salary, '完成',
+        ])
+        chain.employees += totals.employees
+        chain.formal_staff += totals.formal_staff
+        chain.basic_salary += totals.basic_salary
+        chain.seasonal_bonus += totals.seasonal_bonus
+        chain.total_salary += totals.total_salary
+        chain_performance += total_performance
+        chain_consumption += total_consumption
+
+    summary_sheet.append([
+        '合計', chain_performance, chain_consumption, _consumption_rate(chain_performance, chain_consumption),
+        chain.formal_staff, chain.employees, chain.basic_salary, chain.seasonal_bonus, chain.total_salary, None,
+    ])
+    return _save(workbook, output)
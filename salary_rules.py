@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 獎金規則表
+所有薪資與獎金門檻都定義在 salary_rules.json，載入時編譯成排序好的門檻陣列，
+單筆計算用 bisect、整批計算用 np.searchsorted，不需每位員工重新解析規則
+
+門檻語意:
+- 人次激勵獎金 tiers: 第一級距第 start 到第 end 人（含）每人 per_person 元；之後的級距從上一級距的 end 起算，
+  超過上一級距 end 的人次每人 per_person 元，end 為 null 表示無上限
+  （與原本 111-132 人 100 元、人次 - 132 每人 200 元相同，人次可為小數）
+- 充值目標 / 個人消耗 tiers: 達到門檻（>=）即適用該級，取最高一級
+- roles: 四種職別（正式淨膚師、實習淨膚師、儲備店長、正式店長）的底薪與獎金，
+  與前端 frontend/src/lib/salary 相同；team_bonus_overachievement 為 true 時業績達到更高人數級距的門檻可領該級團獎
+"""
+
+import json
+import os
+from bisect import bisect_right
+from pathlib import Path
+
+DEFAULT_RULES_PATH = Path(__file__).with_name('salary_rules.json')
+
+
+def format_wan(amount):
+    """金額以「萬」表示，例如 250000 → 25萬"""
+    return f"{amount / 10000:g}萬"
+
+
+class SalaryRules:
+    """編譯後的獎金規則"""
+
+    def __init__(self, config):
+        try:
+            self.config = config
+            self.base_salary = config['base_salary']
+            self.meal_allowance = config['meal_allowance']
+            self.overtime_pay = config['overtime_pay']
+            self.skill_bonus_per_time = config.get('skill_bonus_per_time', 0)
+
+            # 團獎 {人數: (業績要求, 消耗比例要求, 獎金)}
+            self.team_bonus_rules = {
+                rule['formal_staff']: (rule['min_performance'], rule['min_consumption_rate'], rule['bonus'])
+                for rule in config['team_bonus']
+            }
+            # 依業績門檻排序的團獎級距，超標判斷使用
+            self.team_bonus_tiers = sorted(self.team_bonus_rules.values())
+
+            person_rule = config['person_count_bonus']
+            self.person_count_min = person_rule['min_person_count']
+            person_tiers = sorted(person_rule['tiers'], key=lambda tier: tier['start'])
+            self.person_count_starts = [tier['start'] for tier in person_tiers]
+            self.person_count_ends = [tier['end'] if tier['end'] is not None else float('inf')
+                                      for tier in person_tiers]
+            self.person_count_rates = [tier['per_person'] for tier in person_tiers]
+
+            charge_rule = config['charge_target_bonus']
+            self.mask_sales_min = charge_rule['min_mask_sales']
+            charge_tiers = sorted(charge_rule['tiers'], key=lambda tier: tier['min_performance'])
+            self.charge_thresholds = [tier['min_performance'] for tier in charge_tiers]
+            self.charge_bonuses = [tier['bonus'] for tier in charge_tiers]
+
+            consumption_tiers = sorted(config['consumption_bonus']['tiers'], key=lambda tier: tier['min_consumption'])
+            self.consumption_thresholds = [tier['min_consumption'] for tier in consumption_tiers]
+            self.consumption_rates = [tier['rate'] for tier in consumption_tiers]
+
+            self.dual_target_bonus = config['dual_target_bonus']['bonus']
+
+            new_customer_rule = config['new_customer_rate_bonus']
+            self.new_customer_min_person_count = new_customer_rule['min_person_count']
+            self.new_customer_min_rate = new_customer_rule['min_rate']
+            self.new_customer_bonus = new_customer_rule['bonus']
+
+            # 四職別規則為選用設定，舊規則檔沒有時只能計算正式淨膚師 / 一般員工
+            self.role_rules = RoleRules(config['roles']) if 'roles' in config else None
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"獎金規則格式錯誤，缺少或錯誤的欄位: {e}") from e
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        """從 JSON 規則檔載入"""
+        with open(os.path.expanduser(str(path)), encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def with_overrides(self, **overrides):
+        """複製一份規則並覆寫最上層設定（例如 base_salary、consumption_bonus）"""
+        config = json.loads(json.dumps(self.config))
+        config.update(overrides)
+        return SalaryRules(config)
+
+    # ── 單筆計算 ─────────────────────────────────────────
+
+    def team_bonus_tier(self, num_formal_staff, total_performance, total_consumption, overachievement=False):
+        """團獎 (是否達標, 每人獎金)
+
+        overachievement=True 時業績達到更高人數級距的門檻，改領該級獎金（前端四職別計算方式）
+        """
+        rule = self.team_bonus_rules.get(num_formal_staff)
+        if rule is None:
+            return False, 0
+        required_performance, required_consumption_rate, bonus = rule
+        if total_performance < required_performance:
+            return False, 0
+        consumption_rate = total_consumption / total_performance if total_performance > 0 else 0
+        if consumption_rate < required_consumption_rate:
+            return False, 0
+        if overachievement:
+            for tier_performance, _, tier_bonus in self.team_bonus_tiers:
+                if tier_performance > required_performance and total_performance >= tier_performance:
+                    bonus = tier_bonus
+        return True, bonus
+
+    def person_count_tiers(self, person_count):
+        """人次激勵獎金各級距的 (起始人次, 計算到的人次, 人數, 每人獎金)，只列出有人數的級距
+
+        第一級距從 start 開始含 start 計算（111-132 人為 22 人）；之後的級距以上一級距的 end 起算
+        （133 人以上為 人次 - 132），人次非整數時與原本公式、前端 calcPersonCountBonus 相同
+        """
+        tiers = []
+        previous_end = None
+        for start, end, rate in zip(self.person_count_starts, self.person_count_ends, self.person_count_rates):
+            tier_end = min(person_count, end)
+            if previous_end is None:
+                count = tier_end - start + 1 if tier_end >= start else 0
+            else:
+                count = max(0, tier_end - previous_end)
+            if count > 0:
+                tiers.append((start, tier_end, count, rate))
+            previous_end = end
+        return tiers
+
+    def person_count_bonus(self, person_count):
+        """人次激勵獎金"""
+        if person_count < self.person_count_min:
+            return 0
+        bonus = 0
+        for _, _, count, rate in self.person_count_tiers(person_count):
+            bonus += count * rate
+        return bonus
+
+    def charge_target_tier(self, personal_performance):
+        """業績達到的充值目標級距 (門檻, 獎金)，未達最低門檻回傳 (None, 0)"""
+        index = bisect_right(self.charge_thresholds, personal_performance) - 1
+        if index < 0:
+            return None, 0
+        return self.charge_thresholds[index], self.charge_bonuses[index]
+
+    def consumption_tier(self, personal_consumption):
+        """個人消耗達到的級距 (門檻, 抽成比例)，未達最低門檻回傳 (None, 0)"""
+        index = bisect_right(self.consumption_thresholds, personal_consumption) - 1
+        if index < 0:
+            return None, 0
+        return self.consumption_thresholds[index], self.consumption_rates[index]
+
+    @staticmethod
+    def normalize_rate(rate):
+        """成交率大於1時視為百分比（70 表示 70%）"""
+        return rate / 100 if rate > 1 else rate
+
+    # ── 整批計算（numpy 陣列）─────────────────────────────
+
+    def person_count_bonus_array(self, person_count):
+        import numpy as np
+
+        bonus = np.zeros(len(person_count))
+        previous_end = None
+        for start, end, rate in zip(self.person_count_starts, self.person_count_ends, self.person_count_rates):
+            tier_end = np.minimum(person_count, end)
+            if previous_end is None:
+                bonus = bonus + np.where(tier_end >= start, (tier_end - start + 1) * rate, 0)
+            else:
+                bonus = bonus + np.maximum(tier_end - previous_end, 0) * rate
+            previous_end = end
+        return np.where(person_count < self.person_count_min, 0, bonus)
+
+    def charge_target_bonus_array(self, personal_performance, mask_count):
+        import numpy as np
+
+        index = np.searchsorted(self.charge_thresholds, personal_performance, side='right')
+        bonuses = np.concatenate(([0], self.charge_bonuses))[index]
+        return np.where(mask_count >= self.mask_sales_min, bonuses, 0)
+
+    def consumption_bonus_array(self, personal_consumption):
+        import numpy as np
+
+        index = np.searchsorted(self.consumption_thresholds, personal_consumption, side='right')
+        rates = np.concatenate(([0.0], self.consumption_rates))[index]
+        return np.where(index > 0, np.trunc(personal_consumption * rates), 0)
+
+    def new_customer_rate_bonus_array(self, person_count, new_customer_rate):
+        import numpy as np
+
+        actual_rate = np.where(new_customer_rate > 1, new_customer_rate / 100, new_customer_rate)
+        qualified = (person_count >= self.new_customer_min_person_count) & (actual_rate >= self.new_customer_min_rate)
+        return np.where(qualified, self.new_customer_bonus, 0)
+
+
+class RoleRules:
+    """四職別規則（salary_rules.json 的 roles）"""
+
+    def __init__(self, config):
+        self.fixed_salary = config['fixed_salary']
+        self.team_bonus_overachievement = bool(config.get('team_bonus_overachievement', False))
+
+        formal = config['formal']
+        # [(欄位, 名稱, 最低比例)]，依規則檔順序列出未達標的指標
+        self.formal_metrics = [(metric['field'], metric['label'], metric['min_rate']) for metric in formal['metrics']]
+        self.disqualify_failed_metrics = formal['disqualify_failed_metrics']
+        self.low_performance_below = formal['low_performance']['below']
+        self.low_performance_deduction = formal['low_performance']['team_bonus_deduction']
+
+        trainee = config['trainee']
+        self.trainee_min_performance = trainee['min_performance']
+        self.trainee_min_consumption = trainee['min_consumption']
+        self.trainee_consumption_sales_bonus = trainee['consumption_sales_bonus']
+
+        reserve = config['reserve']
+        self.reserve_achievement_rate = reserve['achievement_rate']
+        self.reserve_message_bonus = reserve['message_bonus']
+        self.reserve_quarterly_rates = dict(reserve['quarterly_rates'])
+        goal = reserve['therapist_goal']
+        self.therapist_goal_min_consumption = goal['min_consumption']
+        self.therapist_goal_min_performance = goal['min_performance']
+        self.therapist_goal_min_person_count = goal['min_person_count']
+        self.therapist_goal_bonus = goal['bonus']
+
+        manager = config['manager']
+        self.manager_achievement_rate = manager['achievement_rate']
+        self.manager_message_bonus = manager['message_bonus']
+        self.manager_allowance = manager['management_allowance']
+        self.manager_quarterly_rates = dict(manager['quarterly_rates'])
+
+
+_loaded_rules = {}
+
+
+def load_salary_rules(path=None):
+    """載入並編譯規則檔，同一個檔案未修改時沿用已編譯的規則"""
+    path = Path(os.path.expanduser(str(path or DEFAULT_RULES_PATH))).resolve()
+    mtime = path.stat().st_mtime
+    cached = _loaded_rules.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, SalaryRules.from_file(path))
+        _loaded_rules[path] = cached
+    return cached[1]
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - HTTP/JSON 計算服務（無介面）
+讓人資系統等其他程式以 HTTP 呼叫薪資計算，不需要互動式 CLI 或 Streamlit
+
+- 計算在預先啟動的子行程中執行，pandas / openpyxl 與獎金規則已預先載入
+- 同時計算數量上限為 --workers，超過時排隊，排隊也滿時回應 503
+
+使用方式:
+    python salary_service.py --port 8765 --data-dir ~/skinbar_report
+
+API:
+    GET  /health      服務狀態
+    POST /calculate   計算單一店家，回傳 calculate_salary 的結果
+        JSON: {"path": "skinbar202506.xlsx", "formal_staff_rows": [14, 15, 16],
+               "num_formal_staff": 3, "employee_start_row": 14, "store": "daan"}
+              path 為 --data-dir 下的相對路徑
+              另外指定 "roles": {"正式淨膚師": [14, 15], "實習淨膚師": [16], "儲備店長": [17], "正式店長": [18]}
+              時回傳四職別薪資 role_results（此時可省略 formal_staff_rows）
+        上傳檔案: 本文為 xlsx 內容（Content-Type 非 application/json），設定放在網址參數
+              /calculate?formal_staff_rows=14,15,16&num_formal_staff=3&store=daan
+              （roles 以 JSON 字串放在網址參數）
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from batch_salary_runner import json_default, run_store_payroll
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_UPLOAD_MB = 50
+DEFAULT_TIMEOUT = 300  # 秒
+
+# 不回傳給呼叫者的內部欄位
+_INTERNAL_FIELDS = ('log', 'employees')
+
+_worker_settings = {}
+
+
+def _warm_worker(backend, use_cache, rules_path):
+    """子行程啟動時預先載入 pandas / openpyxl 與獎金規則"""
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+
+    from salary_rules import load_salary_rules
+
+    load_salary_rules(rules_path)
+    _worker_settings.update(backend=backend, use_cache=use_cache, rules_path=rules_path)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _calculate(source, file_name, store_config):
+    """在子行程中計算；source 為檔案路徑或上傳的 bytes"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+        source.name = file_name
+    return run_store_payroll(
+        source, store_config,
+        backend=_worker_settings.get('backend', 'streaming'),
+        use_cache=_worker_settings.get('use_cache', True),
+        rules_path=_worker_settings.get('rules_path'),
+    )
+
+
+class ServiceError(Exception):
+    """回應給呼叫者的錯誤（HTTP 狀態碼 + 訊息）"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_rows(value):
+    """formal_staff_rows 可以是列表或以逗號分隔的字串"""
+    if isinstance(value, str):
+        value = [item for item in value.split(',') if item.strip()]
+    try:
+        return [int(row) for row in value]
+    except (TypeError, ValueError):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"formal_staff_rows 格式錯誤: {value}")
+
+
+def _parse_roles(value):
+    """roles 為 {職別: 員工行號列表}，網址參數時為 JSON 字串"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError as e:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"roles 格式錯誤: {e}")
+    if not isinstance(value, dict):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"roles 格式錯誤: {value}")
+    return {str(role): _parse_rows(rows) for role, rows in value.items()}
+
+
+def build_store_config(params):
+    """由請求參數建立 run_store_payroll 的店家設定"""
+    store_config = {}
+    if params.get('roles'):
+        store_config['roles'] = _parse_roles(params['roles'])
+    if 'formal_staff_rows' in params:
+        store_config['formal_staff_rows'] = _parse_rows(params['formal_staff_rows'])
+    elif 'roles' not in store_config:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "缺少 formal_staff_rows")
+    try:
+        if params.get('num_formal_staff') is not None:
+            store_config['num_formal_staff'] = int(params['num_formal_staff'])
+        if params.get('employee_start_row') is not None:
+            store_config['employee_start_row'] = int(params['employee_start_row'])
+    except (TypeError, ValueError) as e:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"參數格式錯誤: {e}")
+    if params.get('store'):
+        store_config['store'] = str(params['store'])
+    return store_config
+
+
+class SalaryService:
+    """子行程池 + 排隊上限"""
+
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE, data_dir=None, backend='streaming',
+                 use_cache=True, rules_path=None, timeout=DEFAULT_TIMEOUT,
+                 max_upload_bytes=DEFAULT_MAX_UPLOAD_MB * 1024 * 1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.data_dir = Path(os.path.expanduser(str(data_dir))).resolve() if data_dir else None
+        self.timeout = timeout
+        self.max_upload_bytes = max_upload_bytes
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_worker,
+            initargs=(backend, use_cache, rules_path),
+        )
+        # 計算中 + 排隊中的請求數上限，超過時直接回應 503
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+
+    def warm_up(self):
+        """啟動所有子行程並完成預先載入，第一個請求不需等待啟動"""
+        futures = [self.executor.submit(_ping) for _ in range(self.workers)]
+        return sorted({future.result() for future in futures})
+
+    def resolve_path(self, path):
+        """請求中的 path 只能指向 --data-dir 之下的檔案"""
+        if self.data_dir is None:
+            raise ServiceError(HTTPStatus.FORBIDDEN, "服務未設定 --data-dir，只接受上傳檔案")
+        resolved = (self.data_dir / os.path.expanduser(str(path))).resolve()
+        if self.data_dir not in resolved.parents:
+            raise ServiceError(HTTPStatus.FORBIDDEN, f"不允許讀取 --data-dir 以外的檔案: {path}")
+        if not resolved.is_file():
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"檔案不存在: {path}")
+        return resolved
+
+    def _job_done(self, future):
+        """子行程的計算真正結束（完成、失敗或排隊中被取消）後才釋出名額"""
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def calculate(self, source, file_name, store_config):
+        """送交子行程計算並等待結果
+
+        逾時回應 504，但已開始的計算無法中止（cancel 只能取消尚在排隊的工作），
+        名額保留到子行程實際算完為止，避免逾時的請求不斷把工作堆進子行程池
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ServiceError(HTTPStatus.SERVICE_UNAVAILABLE, "計算請求過多，請稍後再試")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self.executor.submit(_calculate, source, file_name, store_config)
+        except BaseException:
+            self._job_done(None)
+            raise
+        future.add_done_callback(self._job_done)
+
+        try:
+            outcome = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise ServiceError(HTTPStatus.GATEWAY_TIMEOUT, f"計算超過 {self.timeout} 秒")
+
+        for field in _INTERNAL_FIELDS:
+            outcome.pop(field, None)
+        return outcome
+
+    def status(self):
+        with self._lock:
+            return {
+                'status': 'ok',
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class SalaryRequestHandler(BaseHTTPRequestHandler):
+    """HTTP 請求處理，service 由 make_server 設定"""
+
+    service = None
+    server_version = "SkinbarSalary/1.0"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            self.send_header('Retry-After', '5')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._send_json(HTTPStatus.OK, self.service.status())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {'error': f"找不到 {self.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/calculate':
+            self._send_json(HTTPStatus.NOT_FOUND, {'error': f"找不到 {self.path}"})
+            return
+        try:
+            outcome = self._handle_calculate(url)
+        except ServiceError as e:
+            self._send_json(e.status, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"})
+            return
+        status = HTTPStatus.OK if outcome['error'] is None else HTTPStatus.UNPROCESSABLE_ENTITY
+        self._send_json(status, outcome)
+
+    def _handle_calculate(self, url):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "請求內容為空")
+        if length > self.service.max_upload_bytes:
+            raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "上傳檔案過大")
+        body = self.rfile.read(length)
+
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip()
+        if content_type == 'application/json':
+            try:
+                params = json.loads(body)
+            except ValueError as e:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"JSON 格式錯誤: {e}")
+            if not isinstance(params, dict) or 'path' not in params:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "JSON 請求需要 path")
+            path = self.service.resolve_path(params['path'])
+            return self.service.calculate(str(path), path.name, build_store_config(params))
+
+        # 本文為上傳的 xlsx，設定放在網址參數
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        file_name = params.get('filename', 'upload.xlsx')
+        return self.service.calculate(body, file_name, build_store_config(params))
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    """建立 HTTP 伺服器（每個請求一個執行緒，實際計算交給 service 的子行程池）"""
+    handler = type('BoundSalaryRequestHandler', (SalaryRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="淨膚寶薪水計算 - HTTP/JSON 計算服務")
+    parser.add_argument('--host', default='127.0.0.1', help="監聽位址")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="監聽埠號")
+    parser.add_argument('--workers', type=int, default=None, help="同時計算的子行程數（預設為 CPU 核心數）")
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE, help="排隊中的請求上限")
+    parser.add_argument('--data-dir', default=None, help="允許以 path 指定的月報表資料夾")
+    parser.add_argument('--backend', choices=['pandas', 'streaming'], default='streaming',
+                        help="日期工作表讀取方式")
+    parser.add_argument('--no-cache', action='store_true', help="不使用擷取結果快取")
+    parser.add_argument('--rules', default=None, help="獎金規則檔 (JSON)，預設 salary_rules.json")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="單一請求的計算時間上限（秒）")
+    parser.add_argument('--max-upload-mb', type=float, default=DEFAULT_MAX_UPLOAD_MB, help="上傳檔案大小上限 (MB)")
+    args = parser.parse_args(argv)
+
+    service = SalaryService(
+        workers=args.workers, max_queue=args.max_queue, data_dir=args.data_dir, backend=args.backend,
+        use_cache=not args.no_cache, rules_path=args.rules, timeout=args.timeout,
+        max_upload_bytes=int(args.max_upload_mb * 1024 * 1024),
+    )
+    print(f"🔧 正在啟動 {service.workers} 個計算行程...")
+    service.warm_up()
+
+    server = make_server(service, args.host, args.port)
+    print(f"🚀 計算服務已啟動: http://{args.host}:{args.port}（POST /calculate, GET /health）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 正在關閉服務...")
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
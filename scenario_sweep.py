@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 獎金規則試算（What-if）
+以已讀取的一個月資料（可包含全部分店），一次試算大量規則組合的薪資成本，
+不需重新讀取 Excel，也不需逐一修改 AutoSalaryCalculator 的設定
+
+每個情境是一個覆寫 dict，鍵為 SalaryRules 的屬性名稱:
+    {'consumption_thresholds': [170000, 200000]}
+    {'team_bonus_rules': {4: (1000000, 0.75, 6500)}}    # 只覆寫 4 人的團獎
+所有情境的規則排成 (情境數, 級距數) 的陣列，與員工表以 numpy broadcasting 一次計算，
+情境很多時分批（chunk_size）計算以限制記憶體
+
+使用方式:
+    sweep = ScenarioSweep.from_batch_outcomes(outcomes)
+    costs = sweep.run(scenario_grid(consumption_thresholds=[[170000, 200000], [180000, 200000]],
+                                    dual_target_bonus=[1500, 2000, 2500]))
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from salary_engine import employees_to_frame
+from salary_rules import load_salary_rules
+
+# 可以在情境中覆寫的規則（SalaryRules 屬性名稱）
+SWEEP_PARAMETERS = (
+    'base_salary',
+    'meal_allowance',
+    'overtime_pay',
+    'team_bonus_rules',
+    'person_count_min',
+    'person_count_starts',
+    'person_count_ends',
+    'person_count_rates',
+    'mask_sales_min',
+    'charge_thresholds',
+    'charge_bonuses',
+    'consumption_thresholds',
+    'consumption_rates',
+    'dual_target_bonus',
+    'new_customer_min_person_count',
+    'new_customer_min_rate',
+    'new_customer_bonus',
+)
+
+# 成本表中各項獎金的合計欄位
+COST_COLUMNS = [
+    'base_salary',
+    'meal_allowance',
+    'overtime_pay',
+    'skill_bonus',
+    'team_bonus',
+    'person_count_bonus',
+    'charge_target_bonus',
+    'consumption_bonus',
+    'dual_target_bonus',
+    'advanced_course_bonus',
+    'product_sales_bonus',
+    'new_customer_rate_bonus',
+    'total_salary',
+]
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def scenario_grid(**axes):
+    """以各規則的候選值產生所有組合（笛卡兒積），回傳情境 dict 列表
+
+    scenario_grid(consumption_rates=[[0.015, 0.025], [0.01, 0.02]], dual_target_bonus=[1500, 2000])
+    → 4 個情境
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def _scenario_params(rules, overrides):
+    """把單一情境的覆寫套用到基準規則，回傳所有可覆寫規則的值"""
+    params = {name: getattr(rules, name) for name in SWEEP_PARAMETERS}
+    for name, value in overrides.items():
+        if name not in params:
+            raise ValueError(f"無法試算的規則: {name}（可用: {', '.join(SWEEP_PARAMETERS)}）")
+        if name == 'team_bonus_rules':
+            # 只覆寫指定人數的團獎，其餘沿用基準規則
+            merged = dict(params[name])
+            merged.update({int(staff): tuple(rule) for staff, rule in value.items()})
+            value = merged
+        params[name] = value
+
+    # 門檻與對應的獎金/比例一起排序，與 SalaryRules 編譯時相同
+    for thresholds, values in (('charge_thresholds', 'charge_bonuses'),
+                               ('consumption_thresholds', 'consumption_rates')):
+        if len(params[thresholds]) != len(params[values]):
+            raise ValueError(f"{thresholds} 與 {values} 的級距數不同")
+        pairs = sorted(zip(params[thresholds], params[values]))
+        params[thresholds] = [threshold for threshold, _ in pairs]
+        params[values] = [value for _, value in pairs]
+
+    person_columns = (params['person_count_starts'], params['person_count_ends'], params['person_count_rates'])
+    if len({len(values) for values in person_columns}) != 1:
+        raise ValueError("person_count_starts / ends / rates 的級距數不同")
+    person_tiers = sorted(zip(*person_columns), key=lambda tier: tier[0])
+    params['person_count_starts'] = [start for start, _, _ in person_tiers]
+    params['person_count_ends'] = [float('inf') if end is None else end for _, end, _ in person_tiers]
+    params['person_count_rates'] = [rate for _, _, rate in person_tiers]
+    return params
+
+
+def _padded(rows, fill):
+    """各情境級距數可能不同，以 fill 補齊成 (情境數, 最多級距數) 的陣列"""
+    width = max((len(row) for row in rows), default=0)
+    return np.array([list(row) + [fill] * (width - len(row)) for row in rows], dtype=float).reshape(len(rows), width)
+
+
+def _tier_values(amounts, thresholds, values):
+    """各情境下每位員工達到的最高級距對應值，回傳 (級距索引, 值)，皆為 (情境數, 員工數)
+
+    thresholds 以 +inf 補齊，永遠不會達到；索引 0 表示未達最低門檻
+    """
+    index = (amounts[None, None, :] >= thresholds[:, :, None]).sum(axis=1)
+    padded_values = np.concatenate((np.zeros((len(values), 1)), values), axis=1)
+    return index, np.take_along_axis(padded_values, index, axis=1)
+
+
+class ScenarioSweep:
+    """一個月的員工資料 + 各店總業績，用於大量規則情境試算"""
+
+    def __init__(self, employee_frame, store_totals, rules=None):
+        """
+        employee_frame: employees_to_frame 產生的員工表（多店時需有 store 欄位）
+        store_totals: 各店 store / total_performance / total_consumption / num_formal_staff
+        rules: 基準規則 SalaryRules，未指定時使用 salary_rules.json
+        """
+        self.rules = rules or load_salary_rules()
+        self.employee_frame = employee_frame
+        self.store_totals = store_totals.reset_index(drop=True)
+
+        self.person_count = employee_frame['person_count'].to_numpy(dtype=float)
+        self.performance = employee_frame['personal_performance'].to_numpy(dtype=float)
+        self.consumption = employee_frame['personal_consumption'].to_numpy(dtype=float)
+        self.mask_count = employee_frame['mask_count'].to_numpy(dtype=float)
+        rate = employee_frame['new_customer_rate'].to_numpy(dtype=float)
+        self.new_customer_rate = np.where(rate > 1, rate / 100, rate)
+        self.is_formal = employee_frame['is_formal_staff'].to_numpy(dtype=bool)
+        self.skill_bonus = employee_frame['skill_bonus_total'].to_numpy(dtype=float)
+        self.advanced_course_bonus = employee_frame['advanced_course_bonus'].to_numpy(dtype=float)
+        self.product_sales_bonus = employee_frame['product_sales_bonus'].to_numpy(dtype=float)
+
+        # 每位員工所屬分店在 store_totals 中的位置
+        if 'store' in employee_frame.columns:
+            store_index = {store: i for i, store in enumerate(self.store_totals['store'])}
+            self.employee_store = np.array([store_index[store] for store in employee_frame['store']], dtype=int)
+        else:
+            if len(self.store_totals) != 1:
+                raise ValueError("多間店的員工表需要 store 欄位")
+            self.employee_store = np.zeros(len(employee_frame), dtype=int)
+
+        self.total_performance = self.store_totals['total_performance'].to_numpy(dtype=float)
+        self.total_consumption = self.store_totals['total_consumption'].to_numpy(dtype=float)
+        self.num_formal_staff = self.store_totals['num_formal_staff'].to_numpy(dtype=int)
+
+    @classmethod
+    def from_batch_outcomes(cls, outcomes, rules=None):
+        """由 batch_salary_runner.run_batch 的結果建立（略過計算失敗的分店）"""
+        frames = []
+        totals = []
+        for outcome in outcomes:
+            if outcome.get('error'):
+                continue
+            frames.append(employees_to_frame(
+                outcome['employees'], outcome['mask_sales'], outcome['formal_staff_rows'],
+                outcome['team_bonus_per_person'], store=outcome['store'],
+            ))
+            totals.append({
+                'store': outcome['store'],
+                'total_performance': outcome['total_performance'],
+                'total_consumption': outcome['total_consumption'],
+                'num_formal_staff': outcome['num_formal_staff'],
+            })
+        if not frames:
+            raise ValueError("沒有可試算的分店資料")
+        return cls(pd.concat(frames, ignore_index=True), pd.DataFrame(totals), rules=rules)
+
+    def run(self, scenarios, chunk_size=DEFAULT_CHUNK_SIZE):
+        """試算所有情境，回傳每個情境一列的成本表
+
+        欄位: scenario（情境編號）、各覆寫規則 (rule_*)、各項薪資合計 (COST_COLUMNS)、
+        qualified_stores（達成團獎的分店數）、total_salary_delta（與基準規則的差額）
+        """
+        scenarios = list(scenarios)
+        baseline = self._evaluate([_scenario_params(self.rules, {})])
+        tables = [
+            self._evaluate([_scenario_params(self.rules, overrides) for overrides in scenarios[start:start + chunk_size]])
+            for start in range(0, len(scenarios), chunk_size)
+        ]
+        costs = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=baseline.columns)
+        costs['total_salary_delta'] = costs['total_salary'] - baseline['total_salary'].iloc[0]
+
+        # 覆寫的規則加上 rule_ 前綴，避免與同名的合計欄位（例如 dual_target_bonus）衝突
+        overrides = pd.DataFrame(scenarios, index=costs.index).add_prefix('rule_')
+        costs = pd.concat([overrides, costs], axis=1)
+        costs.insert(0, 'scenario', range(len(costs)))
+        return costs
+
+    def _team_bonus(self, params_list):
+        """各情境各分店的每人團獎，回傳 ((情境數, 分店數) 團獎, 是否達成)"""
+        staff_counts = sorted({staff for params in params_list for staff in params['team_bonus_rules']})
+        staff_position = {staff: i for i, staff in enumerate(staff_counts)}
+        missing = (np.inf, np.inf, 0)
+        rules = np.array([[params['team_bonus_rules'].get(staff, missing) for staff in staff_counts]
+                          for params in params_list], dtype=float).reshape(len(params_list), len(staff_counts), 3)
+
+        # 沒有對應人數規則的分店沒有團獎
+        store_rule = np.array([staff_position.get(staff, -1) for staff in self.num_formal_staff], dtype=int)
+        has_rule = store_rule >= 0
+        store_rules = rules[:, np.where(has_rule, store_rule, 0), :]
+        required_performance = store_rules[:, :, 0]
+        required_rate = store_rules[:, :, 1]
+        bonus = store_rules[:, :, 2]
+
+        performance = self.total_performance[None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            consumption_rate = np.where(performance > 0, self.total_consumption / performance, 0)
+        qualified = (has_rule[None, :] & (performance >= required_performance) &
+                     ((performance <= 0) | (consumption_rate >= required_rate)))
+        return np.where(qualified, bonus, 0), qualified
+
+    def _evaluate(self, params_list):
+        """以 (情境數, 員工數) 陣列計算一批情境"""
+        column = lambda name: np.array([params[name] for params in params_list], dtype=float)[:, None]
+        formal_only = lambda values: np.where(self.is_formal[None, :], values, 0)
+        person_count = self.person_count[None, :]
+
+        # 1. 人次激勵獎金（與 SalaryRules.person_count_tiers 相同：第一級距含 start，之後以上一級距的 end 起算；
+        #    未使用的級距 start / end 補 +inf、獎金補 0，不會計入）
+        starts = _padded([params['person_count_starts'] for params in params_list], np.inf)
+        ends = _padded([params['person_count_ends'] for params in params_list], np.inf)
+        rates = _padded([params['person_count_rates'] for params in params_list], 0)
+        person_count_bonus = np.zeros((len(params_list), len(self.person_count)))
+        for tier in range(starts.shape[1]):
+            tier_end = np.minimum(person_count, ends[:, tier:tier + 1])
+            with np.errstate(invalid='ignore'):
+                if tier == 0:
+                    start = starts[:, tier:tier + 1]
+                    tier_bonus = np.where(tier_end >= start, (tier_end - start + 1) * rates[:, tier:tier + 1], 0)
+                else:
+                    tier_count = np.maximum(tier_end - ends[:, tier - 1:tier], 0)
+                    tier_bonus = tier_count * rates[:, tier:tier + 1]
+            person_count_bonus = person_count_bonus + tier_bonus
+        person_count_bonus = np.where(person_count < column('person_count_min'), 0, person_count_bonus)
+
+        # 2. 充值目標達成獎
+        _, charge_target_bonus = _tier_values(
+            self.performance,
+            _padded([params['charge_thresholds'] for params in params_list], np.inf),
+            _padded([params['charge_bonuses'] for params in params_list], 0),
+        )
+        charge_target_bonus = np.where(self.mask_count[None, :] >= column('mask_sales_min'), charge_target_bonus, 0)
+
+        # 3. 個人消耗獎勵（無條件捨去）
+        consumption_index, consumption_rate = _tier_values(
+            self.consumption,
+            _padded([params['consumption_thresholds'] for params in params_list], np.inf),
+            _padded([params['consumption_rates'] for params in params_list], 0),
+        )
+        consumption_bonus = np.where(consumption_index > 0, np.trunc(self.consumption[None, :] * consumption_rate), 0)
+
+        # 4. 消耗充值雙達標獎
+        dual_target_bonus = np.where((charge_target_bonus > 0) & (consumption_bonus > 0), column('dual_target_bonus'), 0)
+
+        # 7. 新客成交率獎金
+        new_customer_qualified = ((person_count >= column('new_customer_min_person_count')) &
+                                  (self.new_customer_rate[None, :] >= column('new_customer_min_rate')))
+        new_customer_rate_bonus = np.where(new_customer_qualified, column('new_customer_bonus'), 0)
+
+        store_team_bonus, qualified = self._team_bonus(params_list)
+        team_bonus = formal_only(store_team_bonus[:, self.employee_store])
+
+        employee_count = len(self.person_count)
+        totals = {
+            'base_salary': column('base_salary')[:, 0] * employee_count,
+            'meal_allowance': column('meal_allowance')[:, 0] * employee_count,
+            'overtime_pay': column('overtime_pay')[:, 0] * employee_count,
+            'skill_bonus': np.full(len(params_list), self.skill_bonus.sum()),
+            'team_bonus': team_bonus.sum(axis=1),
+            'person_count_bonus': formal_only(person_count_bonus).sum(axis=1),
+            'charge_target_bonus': formal_only(charge_target_bonus).sum(axis=1),
+            'consumption_bonus': formal_only(consumption_bonus).sum(axis=1),
+            'dual_target_bonus': formal_only(dual_target_bonus).sum(axis=1),
+            'advanced_course_bonus': np.full(len(params_list), self.advanced_course_bonus.sum()),
+            'product_sales_bonus': np.full(len(params_list), self.product_sales_bonus.sum()),
+            'new_customer_rate_bonus': formal_only(new_customer_rate_bonus).sum(axis=1),
+        }
+        totals['total_salary'] = sum(totals[name] for name in COST_COLUMNS[:-1])
+        table = pd.DataFrame(totals, columns=COST_COLUMNS)
+        table['qualified_stores'] = qualified.sum(axis=1)
+        return table
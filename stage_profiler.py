@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 各階段效能紀錄
+記錄每個階段（開啟工作簿、各工作表解析、面膜統計、員工擷取、獎金計算）的
+執行時間、行程最高記憶體用量 (peak RSS) 與掃描行數，並提供進度回呼與 cProfile 輸出
+
+使用方式:
+    calculator.profiler = StageProfiler(progress_callback=lambda done, total, message: ...)
+    with calculator.profiler.profiling('run.prof'):     # 選填：輸出 pstats 檔
+        calculator.read_excel_data(excel_file)
+    calculator.profiler.print_summary()
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，不記錄記憶體
+    resource = None
+
+
+def peak_rss_bytes():
+    """目前行程的最高常駐記憶體 (bytes)，無法取得時回傳 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 的單位是 KB，macOS 是 bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageProfiler:
+    """各階段效能紀錄；enabled=False 時不計時，只轉送進度回呼"""
+
+    def __init__(self, enabled=True, progress_callback=None):
+        self.enabled = enabled
+        self.progress_callback = progress_callback
+        self.records = []
+
+    @contextlib.contextmanager
+    def stage(self, name, sheet=None):
+        """記錄一個階段，可在區塊內設定 record['rows'] 為掃描行數"""
+        record = {'stage': name, 'sheet': sheet, 'rows': None}
+        if not self.enabled:
+            yield record
+            return
+
+        rss_before = peak_rss_bytes()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - started
+            record['peak_rss'] = peak_rss_bytes()
+            record['peak_rss_growth'] = (record['peak_rss'] - rss_before) if rss_before is not None else None
+            self.records.append(record)
+
+    def progress(self, done, total, message=''):
+        """回報進度（done / total），由 progress_callback 更新畫面"""
+        if self.progress_callback is not None:
+            self.progress_callback(done, total, message)
+
+    @contextlib.contextmanager
+    def profiling(self, profile_path=None):
+        """以 cProfile 分析區塊內的執行，結束時輸出 pstats 檔；profile_path 為 None 時不分析"""
+        if profile_path is None:
+            yield None
+            return
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            profile_path = os.path.expanduser(str(profile_path))
+            os.makedirs(os.path.dirname(os.path.abspath(profile_path)), exist_ok=True)
+            profile.dump_stats(profile_path)
+
+    def reset(self):
+        self.records = []
+
+    def summary(self):
+        """依階段加總: [{'stage', 'calls', 'wall_time', 'rows', 'peak_rss'}]，依出現順序排列"""
+        stages = {}
+        for record in self.records:
+            total = stages.setdefault(record['stage'], {
+                'stage': record['stage'], 'calls': 0, 'wall_time': 0.0, 'rows': None, 'peak_rss': None,
+            })
+            total['calls'] += 1
+            total['wall_time'] += record['wall_time']
+            if record['rows'] is not None:
+                total['rows'] = (total['rows'] or 0) + record['rows']
+            if record['peak_rss'] is not None:
+                total['peak_rss'] = max(total['peak_rss'] or 0, record['peak_rss'])
+        return list(stages.values())
+
+    def slowest_sheets(self, limit=10):
+        """最耗時的工作表紀錄"""
+        sheet_records = [record for record in self.records if record['sheet'] is not None]
+        return sorted(sheet_records, key=lambda record: record['wall_time'], reverse=True)[:limit]
+
+    def to_json(self, path):
+        """輸出所有紀錄與階段加總"""
+        with open(os.path.expanduser(str(path)), 'w', encoding='utf-8') as f:
+            json.dump({'summary': self.summary(), 'records': self.records}, f, ensure_ascii=False, indent=2)
+
+    def print_summary(self, limit=5):
+        """顯示各階段時間與最耗時的工作表"""
+        if not self.records:
+            return
+        print("\n⏱️  各階段效能:")
+        for total in self.summary():
+            rows = f"{total['rows']:,} 行" if total['rows'] is not None else "-"
+            memory = f"{total['peak_rss'] / 1024 / 1024:,.0f} MB" if total['peak_rss'] is not None else "-"
+            print(f"   {total['stage']:<22} {total['wall_time'] * 1000:>10.1f} ms  ×{total['calls']:<4} "
+                  f"{rows:>12}  RSS {memory}")
+
+        slowest = self.slowest_sheets(limit)
+        if slowest:
+            print("🐢 最耗時的工作表:")
+            for record in slowest:
+                print(f"   {record['stage']} {record['sheet']}: {record['wall_time'] * 1000:.1f} ms"
+                      f"（{record['rows'] or 0:,} 行）")
+
+
+def profiled_stage(name, rows=None):
+    """方法裝飾器：以 self.profiler 記錄整個方法為一個階段
+    rows 為由回傳值計算掃描行數的函式
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None or not profiler.enabled:
+                return method(self, *args, **kwargs)
+            with profiler.stage(name) as record:
+                result = method(self, *args, **kwargs)
+                if rows is not None:
+                    record['rows'] = rows(result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 月報表彙整欄位對應
+掃描月報表彙整員工行上方的表頭，以中文標籤（個人業績、人次總數、進階課程工獎…）找出每個欄位所在的欄，
+每份工作簿只建立一次，之後擷取員工數據都以欄位名稱查表，不再寫死 iloc 欄號
+
+標籤找不到時:
+    - 原本固定欄號（A/B/C/D/I/V/W/X）的表頭為空白 → 沿用原本欄號（舊版月報表只有部分表頭），並列出沿用的欄位
+    - 原本欄號的表頭是其他文字、或超出工作表寬度 → 版面已變動，拋出 MissingColumnError，
+      不會把錯誤欄位的數值（或 0）算進薪水
+strict=True 時所有欄位都必須有表頭標籤
+
+VIP升單率、預約率為選用欄位（四職別計算的正式淨膚師指標），只以表頭標籤對應，找不到時不在對照表中
+"""
+
+import re
+
+# 欄位 → 可接受的表頭標籤（比對時去除空白與換行）
+COLUMN_LABELS = {
+    'name': ('姓名', '員工姓名'),
+    'personal_performance': ('個人業績',),
+    'personal_consumption': ('個人消耗',),
+    'person_count': ('人次總數', '人次'),
+    'new_customer_rate': ('新客實際成交率', '新客成交率'),
+    'advanced_course_bonus': ('進階課程工獎', '進階課程工獎累計', '進階工獎累計'),
+    'skill_bonus_total': ('手技供獎累計', '手計供獎累計', '手技工獎累計', '手技獎金'),
+    'product_sales_bonus': ('產品銷售供獎', '產品銷售供獎累計', '產品銷售工獎'),
+}
+
+# 選用欄位 → 表頭標籤；新版月報表在 R、X 欄，但 X 欄在舊版是產品銷售供獎，因此不沿用欄號
+OPTIONAL_COLUMN_LABELS = {
+    'vip_upgrade_rate': ('VIP成交率', 'VIP升單率'),
+    'appointment_rate': ('預約率',),
+}
+
+# 原本寫死的欄號（0-indexed）：A、B、C、D、I、V、W、X
+LEGACY_COLUMNS = {
+    'name': 0,
+    'personal_performance': 1,
+    'personal_consumption': 2,
+    'person_count': 3,
+    'new_customer_rate': 8,
+    'advanced_course_bonus': 21,
+    'skill_bonus_total': 22,
+    'product_sales_bonus': 23,
+}
+
+# 標準月報表的表頭在第13行，員工行號由較前面開始搜尋時仍掃描到這一行
+SUMMARY_HEADER_ROW = 13
+
+_WHITESPACE = re.compile(r'\s+')
+_ALL_LABELS = {**COLUMN_LABELS, **OPTIONAL_COLUMN_LABELS}
+_LABEL_TO_FIELD = {label: field for field, labels in _ALL_LABELS.items() for label in labels}
+
+
+class MissingColumnError(ValueError):
+    """月報表彙整缺少必要欄位，或欄位位置與表頭不符"""
+
+
+def _normalize(value):
+    if not isinstance(value, str):
+        return None
+    return _WHITESPACE.sub('', value)
+
+
+def column_letter(index):
+    """0-indexed 欄號 → Excel 欄名（0 → A、21 → V）"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+class SummaryColumns:
+    """欄位名稱 → 欄號 (0-indexed) 的對照表"""
+
+    def __init__(self, positions, header_row=None, assumed=()):
+        self.positions = dict(positions)
+        self.header_row = header_row  # 表頭所在行號 (1-indexed)，沒有表頭時為 None
+        self.assumed = tuple(assumed)  # 沒有表頭、沿用原本欄號的欄位
+
+    def __getitem__(self, field):
+        return self.positions[field]
+
+    def __contains__(self, field):
+        return field in self.positions
+
+    def value(self, df, row, field):
+        """讀取員工行（1-indexed 行號）的欄位值"""
+        return df.iat[row - 1, self.positions[field]]
+
+    def describe(self):
+        """例如「個人業績=B, 人次總數=D」"""
+        return ', '.join(f"{_ALL_LABELS[field][0]}={column_letter(index)}"
+                         for field, index in self.positions.items())
+
+
+def build_summary_columns(df, start_row=14, strict=False):
+    """掃描員工行（start_row，1-indexed）上方的表頭（至少到第13行），建立 SummaryColumns
+
+    多行表頭時由最接近員工行的一行開始往上找，同一欄位以先找到的為準
+    """
+    header_limit = min(max(start_row - 1, SUMMARY_HEADER_ROW), df.shape[0])
+    positions = {}
+    header_row = None
+    for row_index in range(header_limit - 1, -1, -1):
+        found_in_row = False
+        for col_index, value in enumerate(df.iloc[row_index].tolist()):
+            field = _LABEL_TO_FIELD.get(_normalize(value))
+            if field is None:
+                continue
+            found_in_row = True
+            positions.setdefault(field, col_index)
+        if found_in_row and header_row is None:
+            header_row = row_index + 1
+
+    assumed = []
+    problems = []
+    for field, legacy_index in LEGACY_COLUMNS.items():
+        if field in positions:
+            continue
+        label = COLUMN_LABELS[field][0]
+        if strict:
+            problems.append(f"找不到「{label}」欄")
+            continue
+        if legacy_index >= df.shape[1]:
+            problems.append(f"找不到「{label}」欄，原本的 {column_letter(legacy_index)} 欄超出工作表範圍")
+            continue
+        if legacy_index in positions.values():
+            problems.append(f"找不到「{label}」欄，原本的 {column_letter(legacy_index)} 欄已對應其他欄位")
+            continue
+        header_value = _normalize(df.iat[header_row - 1, legacy_index]) if header_row is not None else None
+        if header_value:
+            problems.append(f"找不到「{label}」欄，原本的 {column_letter(legacy_index)} 欄表頭為「{header_value}」")
+            continue
+        positions[field] = legacy_index
+        assumed.append(field)
+
+    if problems:
+        raise MissingColumnError("月報表彙整欄位錯誤: " + "；".join(problems))
+
+    ordered = {field: positions[field] for field in LEGACY_COLUMNS}
+    ordered.update((field, positions[field]) for field in OPTIONAL_COLUMN_LABELS if field in positions)
+    return SummaryColumns(ordered, header_row=header_row, assumed=assumed)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 工作簿讀取工具
+同一個 Excel 檔案只開啟一次，每個工作表只解析一次
+
+日期工作表支援兩種讀取方式（backend）:
+- 'pandas'   : pd.read_excel 整張表轉成 DataFrame 後取值
+- 'streaming': openpyxl read_only 逐列串流，只取 E3、E5 與第21行以下的 F-H、N 欄，
+               不建立 DataFrame，記憶體用量不隨交易筆數增加
+
+有限記憶體模式（memory_limit，旗艦店交易筆數上萬的日期工作表）:
+    pandas 模式只解析 E、F-H、N 欄 (usecols)；依工作表 XML 大小估計解析所需記憶體，
+    超過上限的 1/SHEET_MEMORY_SHARE 時該工作表改用串流逐列讀取
+"""
+
+import os
+from collections import namedtuple
+from pathlib import Path
+
+# pandas / numpy 在實際解析工作表時才載入，只需要常數或還原快取時不必付出載入時間
+
+MASK_PRODUCT_NAME = "水光面膜3入"
+MASK_START_ROW = 21              # 交易明細從第21行開始
+MASK_PRODUCT_COLUMNS = (5, 6, 7)  # F、G、H (0-indexed)
+THERAPIST_ID_COLUMN = 13          # N (0-indexed)
+DAILY_COLUMNS = (4, *MASK_PRODUCT_COLUMNS, THERAPIST_ID_COLUMN)  # E、F、G、H、N
+
+# 有限記憶體模式：工作表 XML（解壓縮後）每 1 byte 解析成 DataFrame 約需的記憶體，
+# 以及單一工作表最多可使用 memory_limit 的幾分之一（其餘留給月報表彙整與計算）
+PARSE_BYTES_PER_XML_BYTE = 5
+SHEET_MEMORY_SHARE = 4
+
+BACKENDS = ('pandas', 'streaming')
+
+# 擷取邏輯變更時需調整，讓舊的快取失效
+PARSER_VERSION = 1
+
+# pandas 預設視為 NaN 的字串，串流模式比照處理以維持結果一致
+_NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+    'n/a', 'nan', 'null',
+}
+
+# 日期工作表擷取結果
+# performance / consumption: E3 / E5 原始值（空白為 None 或 NaN）
+# mask_hits: [(Excel 行號, N欄淨膚師編號原始值), ...]，只保留含水光面膜3入的行
+# rows_scanned: 掃描過的列數
+DailySheetData = namedtuple('DailySheetData', ['performance', 'consumption', 'mask_hits', 'rows_scanned'])
+
+
+def _clean_value(value):
+    """串流讀到的儲存格值，比照 pandas 將空白字串等視為缺值"""
+    if isinstance(value, str) and value in _NA_STRINGS:
+        return None
+    return value
+
+
+def _contains_mask_product(column):
+    """整欄比對是否含水光面膜3入，回傳 bool 陣列"""
+    import numpy as np
+    import pandas as pd
+
+    # 數值、日期欄位轉成字串後不可能包含商品名稱
+    if not (pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)):
+        return np.zeros(len(column), dtype=bool)
+    try:
+        matched = column.str.contains(MASK_PRODUCT_NAME, regex=False, na=False)
+    except AttributeError:
+        # 欄位內沒有任何文字（例如全部是日期物件）
+        return np.zeros(len(column), dtype=bool)
+    return matched.to_numpy(dtype=bool, na_value=False)
+
+
+def extract_daily_frame(sheet_df):
+    """從已解析的日期工作表 DataFrame 擷取 E3、E5 與水光面膜銷售行
+
+    header=None 解析的欄名即為欄號，以欄名取值；只解析部分欄位 (usecols=DAILY_COLUMNS) 時同樣適用
+    """
+    import numpy as np
+
+    rows = sheet_df.shape[0]
+    columns = sheet_df.columns
+    performance = sheet_df[4].iloc[2] if rows > 2 and 4 in columns else 0  # E3
+    consumption = sheet_df[4].iloc[4] if rows > 4 and 4 in columns else 0  # E5
+
+    mask_hits = []
+    if THERAPIST_ID_COLUMN in columns and rows >= MASK_START_ROW:
+        # 整欄比對 F、G、H 是否含水光面膜3入，同一行只算一次
+        body = sheet_df.iloc[MASK_START_ROW - 1:]
+        row_matched = np.zeros(len(body), dtype=bool)
+        for col in MASK_PRODUCT_COLUMNS:
+            if col in columns:
+                row_matched |= _contains_mask_product(body[col])
+
+        therapist_ids = body[THERAPIST_ID_COLUMN]
+        row_matched &= therapist_ids.notna().to_numpy()
+        positions = np.flatnonzero(row_matched)
+        mask_hits = list(zip((positions + MASK_START_ROW).tolist(), therapist_ids.iloc[positions].tolist()))
+
+    return DailySheetData(performance, consumption, mask_hits, rows)
+
+
+def stream_daily_sheet(worksheet):
+    """以 openpyxl read_only 串流擷取日期工作表，不建立 DataFrame
+
+    只讀取 A-N 欄，逐列處理後即丟棄，只保留 E3、E5 與符合條件的面膜銷售行。
+    """
+    # 部分檔案的 dimension 標記不正確，重設後才能讀到所有列（pandas 也這樣處理）
+    worksheet.reset_dimensions()
+
+    performance = 0
+    consumption = 0
+    mask_hits = []
+    rows_scanned = 0
+
+    for row_number, values in enumerate(
+            worksheet.iter_rows(min_row=1, max_col=THERAPIST_ID_COLUMN + 1, values_only=True), 1):
+        rows_scanned = row_number
+        if row_number == 3 and len(values) > 4:
+            performance = _clean_value(values[4])  # E3
+        elif row_number == 5 and len(values) > 4:
+            consumption = _clean_value(values[4])  # E5
+        elif row_number >= MASK_START_ROW and len(values) > THERAPIST_ID_COLUMN:
+            for col in MASK_PRODUCT_COLUMNS:
+                cell_value = _clean_value(values[col])
+                if cell_value is not None and MASK_PRODUCT_NAME in str(cell_value):
+                    therapist_id = _clean_value(values[THERAPIST_ID_COLUMN])
+                    if therapist_id is not None:
+                        mask_hits.append((row_number, therapist_id))
+                        break  # 避免同一行重複計算
+
+    if rows_scanned < 3:
+        performance = 0
+    if rows_scanned < 5:
+        consumption = 0
+
+    return DailySheetData(performance, consumption, mask_hits, rows_scanned)
+
+
+class WorkbookSession:
+    """單次開啟的 Excel 工作簿
+
+    read_excel_data 與 count_mask_sales 共用同一個 session，
+    每個工作表第一次被讀取時解析並快取，之後直接取用。
+    source 可以是檔案路徑，也可以是檔案物件（例如上傳的 BytesIO）。
+    backend 決定日期工作表的讀取方式，見模組說明。
+    """
+
+    def __init__(self, source, backend='pandas'):
+        if backend not in BACKENDS:
+            raise ValueError(f"不支援的讀取方式: {backend}（可用: {', '.join(BACKENDS)}）")
+        self.source = source
+        self.backend = backend
+        self._excel_file = None
+        self._stream_book = None
+        self._frames = {}
+        self._daily = {}
+        self._sheet_names = None
+        self._mtime = self._source_mtime(source)
+
+        # 由 ExtractionCache 設定：快取鍵值與是否直接由快取還原
+        self.cache_key = None
+        self.from_cache = False
+
+        # 由快照還原時為 WorkbookSnapshot（見 workbook_snapshot）
+        self.snapshot = None
+
+        # 有限記憶體模式的記憶體上限 (bytes)，None 為不限制（見模組說明）
+        self.memory_limit = None
+
+    @classmethod
+    def from_state(cls, source, state, backend='pandas'):
+        """由 export_state 的內容還原 session，已擷取的工作表不再讀檔"""
+        session = cls(source, backend=backend)
+        session._sheet_names = list(state['sheet_names'])
+        session._frames = dict(state['frames'])
+        session._daily = {name: DailySheetData(*data) for name, data in state['daily'].items()}
+        session.from_cache = True
+        return session
+
+    def export_state(self):
+        """匯出已擷取的內容（工作表名稱、已解析的工作表、日期工作表擷取結果）"""
+        return {
+            'sheet_names': self.sheet_names,
+            'frames': dict(self._frames),
+            'daily': {name: tuple(data) for name, data in self._daily.items()},
+        }
+
+    @staticmethod
+    def _source_mtime(source):
+        """路徑來源記錄修改時間，檔案物件回傳 None"""
+        if isinstance(source, (str, os.PathLike)):
+            try:
+                return os.path.getmtime(source)
+            except OSError:
+                return None
+        return None
+
+    def _select_engine(self):
+        """根據副檔名選擇適當的引擎（檔案物件使用 name 屬性，例如上傳檔案的檔名）"""
+        name = self.source if isinstance(self.source, (str, os.PathLike)) else getattr(self.source, 'name', None)
+        if isinstance(name, (str, os.PathLike)):
+            file_ext = Path(name).suffix.lower()
+            if file_ext == '.xlsx':
+                return 'openpyxl'
+            if file_ext == '.xls':
+                return 'xlrd'
+        return None
+
+    def _open(self):
+        """開啟工作簿（只執行一次）"""
+        if self._excel_file is not None:
+            return self._excel_file
+
+        import pandas as pd
+
+        if isinstance(self.source, (str, os.PathLike)) and not os.path.exists(self.source):
+            raise FileNotFoundError(f"檔案不存在: {self.source}")
+
+        if self._use_streaming():
+            # 串流模式下月報表彙整也從同一個 read_only 工作簿讀取，不重複開檔
+            self._excel_file = pd.ExcelFile(self._open_stream_book(), engine='openpyxl')
+            return self._excel_file
+
+        engine = self._select_engine()
+        if engine is not None:
+            try:
+                self._excel_file = pd.ExcelFile(self.source, engine=engine)
+                return self._excel_file
+            except Exception as e:
+                print(f"⚠️  {engine} 引擎失敗: {e}")
+                if hasattr(self.source, 'seek'):
+                    self.source.seek(0)
+
+        # 嘗試自動偵測引擎
+        try:
+            self._excel_file = pd.ExcelFile(self.source)
+        except Exception as auto_error:
+            if "OLE2" in str(auto_error) or "compound document" in str(auto_error):
+                print("🔧 偵測到 OLE2 錯誤，嘗試修復...")
+                print("💡 建議解決方案:")
+                print("1. 在 Excel 中開啟檔案，另存為 .xlsx 格式")
+                print("2. 檢查檔案是否完整下載")
+                print("3. 確認檔案沒有被其他程序佔用")
+                raise Exception(f"Excel 檔案格式錯誤 (OLE2): {auto_error}")
+            raise
+        return self._excel_file
+
+    def is_current(self, source):
+        """檢查此 session 是否對應同一個來源且檔案未被修改"""
+        if source is self.source:
+            return self._mtime == self._source_mtime(source)
+        if isinstance(source, (str, os.PathLike)) and isinstance(self.source, (str, os.PathLike)):
+            return (os.path.abspath(source) == os.path.abspath(self.source)
+                    and self._mtime == self._source_mtime(source))
+        return False
+
+    @property
+    def sheet_names(self):
+        """工作表名稱列表"""
+        if self._sheet_names is None:
+            self._sheet_names = list(self._open().sheet_names)
+        return list(self._sheet_names)
+
+    def parse(self, sheet_name):
+        """解析工作表（header=None），同一工作表只解析一次"""
+        if sheet_name not in self._frames:
+            self._frames[sheet_name] = self._open().parse(sheet_name, header=None)
+        return self._frames[sheet_name]
+
+    def _open_stream_book(self):
+        """以 read_only 模式開啟 openpyxl 工作簿（串流模式用）"""
+        if self._stream_book is None:
+            from openpyxl import load_workbook
+
+            if hasattr(self.source, 'seek'):
+                self.source.seek(0)
+            self._stream_book = load_workbook(self.source, read_only=True, data_only=True, keep_links=False)
+        return self._stream_book
+
+    def _use_streaming(self):
+        """串流模式只支援 openpyxl 可讀取的格式，.xls 退回 pandas"""
+        return self.backend == 'streaming' and self._select_engine() != 'xlrd'
+
+    def daily_sheet(self, sheet_name):
+        """擷取日期工作表的 E3、E5 與水光面膜銷售行，同一工作表只擷取一次"""
+        if sheet_name not in self._daily:
+            if self._use_streaming():
+                data = stream_daily_sheet(self._open_stream_book()[sheet_name])
+            elif sheet_name in self._frames:
+                data = extract_daily_frame(self._frames[sheet_name])
+            elif self.memory_limit is not None:
+                data = self._bounded_daily_sheet(sheet_name)
+            else:
+                # 擷取後不保留整張 DataFrame
+                data = extract_daily_frame(self._open().parse(sheet_name, header=None))
+            self._daily[sheet_name] = data
+        return self._daily[sheet_name]
+
+    def _estimated_parse_bytes(self, sheet_name):
+        """依工作表 XML 解壓縮後的大小估計整張解析所需的記憶體，無法取得（例如 .xls）時回傳 None"""
+        try:
+            book = self._open().book
+            # openpyxl read_only 工作簿的壓縮檔與工作表路徑
+            size = book._archive.getinfo(book[sheet_name]._worksheet_path).file_size
+        except (AttributeError, KeyError, TypeError):
+            return None
+        return size * PARSE_BYTES_PER_XML_BYTE
+
+    def _bounded_daily_sheet(self, sheet_name):
+        """有限記憶體模式擷取日期工作表：只解析 E、F-H、N 欄，預估超過上限時改用串流逐列讀取"""
+        estimate = self._estimated_parse_bytes(sheet_name)
+        if estimate is not None and estimate > self.memory_limit // SHEET_MEMORY_SHARE:
+            return stream_daily_sheet(self._open_stream_book()[sheet_name])
+        try:
+            frame = self._open().parse(sheet_name, header=None, usecols=list(DAILY_COLUMNS))
+        except ValueError:
+            # 工作表不到 N 欄時 usecols 超出範圍 (ParserError)，欄位少，直接整張解析
+            frame = self._open().parse(sheet_name, header=None)
+        return extract_daily_frame(frame)
+
+    def cached_daily(self, sheet_name):
+        """已擷取的日期工作表結果，尚未擷取時回傳 None"""
+        return self._daily.get(sheet_name)
+
+    def preload_daily(self, sheet_name, data):
+        """放入先前擷取的日期工作表結果（增量讀取用），之後不再解析該工作表"""
+        self._daily[sheet_name] = data
+
+    def close(self):
+        """關閉工作簿並釋放快取的工作表"""
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+        if self._stream_book is not None:
+            self._stream_book.close()
+            self._stream_book = None
+        self._frames.clear()
+        self._daily.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+淨膚寶薪水計算 - 月報表擷取結果快照（欄位式 .npy）
+計算薪水只需要月報表彙整、各日期工作表的 E3/E5 與水光面膜銷售行，
+把這些內容存成一個 <檔名>.snap 資料夾，每個欄位一個 .npy 檔，載入時以 np.load(mmap_mode='r') 映射，
+不需 openpyxl、不複製資料，重新計算或多月份彙總時開啟一個月份只需要數毫秒
+
+快照內容:
+    meta.json           版本、來源檔名、工作表名稱、日期工作表順序、月報表彙整各欄 dtype
+    summary_values.npy  月報表彙整的數值 (float64，非數值為 NaN)
+    summary_kinds.npy   每格的類型 (int8，見 _KIND_*)
+    summary_text.npy    文字儲存格（依列優先順序，只存文字格）
+    daily_totals.npy    各日期工作表的 E3、E5 (float64，空白或非數值為 NaN)
+    daily_rows.npy      各日期工作表掃描過的列數
+    mask_offsets.npy    各日期工作表的面膜銷售行在 mask_rows / mask_ids 的起訖位置
+    mask_rows.npy       面膜銷售行的 Excel 行號
+    mask_ids.npy        面膜銷售行的 N 欄淨膚師編號 (float64，文字編號為 NaN)
+    mask_id_text.npy    文字編號（與 mask_ids 等長，數字編號為空字串）
+
+E3/E5 不是數值時存成 NaN：read_excel_data 本來就略過無法轉換的值，業績、消耗總額不變
+
+使用方式:
+    calculator.snapshot_dir = "~/skinbar_report/snapshots"   # read_excel_data 後寫出快照
+    snapshot = load_snapshot("~/skinbar_report/snapshots/skinbar_daan202506.snap")
+    snapshot.totals()                                          # (業績總額, 消耗總額)，不建立 DataFrame
+    calculator.read_excel_data(snapshot.to_session())          # 以快照取代 Excel 重新計算
+"""
+
+import datetime
+import json
+import os
+from pathlib import Path
+
+from workbook_session import PARSER_VERSION, DailySheetData, WorkbookSession
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snap'
+SUMMARY_SHEET = '月報表彙整'
+
+# 月報表彙整儲存格類型
+_KIND_EMPTY = 0
+_KIND_FLOAT = 1
+_KIND_INT = 2
+_KIND_TEXT = 3
+_KIND_BOOL = 4
+_KIND_DATETIME = 5
+
+_ARRAY_FILES = (
+    'summary_values', 'summary_kinds', 'summary_text', 'daily_totals', 'daily_rows',
+    'mask_offsets', 'mask_rows', 'mask_ids', 'mask_id_text',
+)
+
+
+class SnapshotError(ValueError):
+    """快照不存在、版本不符或內容不完整"""
+
+
+def is_snapshot(path):
+    """path 是否為快照資料夾（<檔名>.snap 且含 meta.json）"""
+    if not isinstance(path, (str, os.PathLike)):
+        return False
+    path = Path(os.path.expanduser(str(path)))
+    return path.suffix == SNAPSHOT_SUFFIX and (path / 'meta.json').is_file()
+
+
+def snapshot_path_for(source, snapshot_dir):
+    """來源檔案對應的快照路徑：<snapshot_dir>/<檔名不含副檔名>.snap；沒有檔名的檔案物件回傳 None"""
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', None)
+    if not isinstance(name, (str, os.PathLike)):
+        return None
+    return Path(os.path.expanduser(str(snapshot_dir))) / f"{Path(name).stem}{SNAPSHOT_SUFFIX}"
+
+
+def _is_number(value):
+    import numpy as np
+
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+def _to_float(value):
+    """E3/E5 原始值 → float，空白或無法轉換時為 NaN"""
+    if value is None or isinstance(value, bool):
+        return float('nan')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _encode_summary(df):
+    """月報表彙整 → (數值陣列, 類型陣列, 文字陣列, 各欄 dtype)"""
+    import numpy as np
+    import pandas as pd
+
+    rows, cols = df.shape
+    values = np.full((rows, cols), np.nan)
+    kinds = np.zeros((rows, cols), dtype=np.int8)
+    text_cells = {}  # (列, 欄) → 文字
+    for col in range(cols):
+        column = df.iloc[:, col]
+        if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            # 整欄為數值：直接整欄轉換
+            values[:, col] = column.to_numpy(dtype=float, na_value=np.nan)
+            kinds[:, col] = np.where(np.isnan(values[:, col]), _KIND_EMPTY,
+                                     _KIND_INT if pd.api.types.is_integer_dtype(column) else _KIND_FLOAT)
+            continue
+        for row, value in enumerate(column.tolist()):
+            if value is None or (isinstance(value, float) and value != value) or value is pd.NaT:
+                continue
+            if isinstance(value, (bool, np.bool_)):
+                kinds[row, col] = _KIND_BOOL
+                values[row, col] = float(value)
+            elif _is_number(value):
+                kinds[row, col] = _KIND_INT if isinstance(value, (int, np.integer)) else _KIND_FLOAT
+                values[row, col] = float(value)
+            elif isinstance(value, (datetime.datetime, datetime.date)):
+                kinds[row, col] = _KIND_DATETIME
+                text_cells[row, col] = value.isoformat()
+            else:
+                # 其他類型（時間等）以文字保存，計算薪水不會用到
+                kinds[row, col] = _KIND_TEXT
+                text_cells[row, col] = str(value)
+    # 依列優先順序存放，與 _decode_summary 的位置計算一致
+    ordered = [text_cells[position] for position in sorted(text_cells)]
+    text = np.array(ordered, dtype=str) if ordered else np.array([], dtype='<U1')
+    dtypes = [str(dtype) for dtype in df.dtypes]
+    return values, kinds, text, dtypes
+
+
+def _decode_summary(values, kinds, text, dtypes):
+    """_encode_summary 的反向：還原與 session.parse('月報表彙整') 相同 dtype 的 DataFrame"""
+    import numpy as np
+    import pandas as pd
+
+    rows, cols = kinds.shape
+    # 文字格依列優先順序存放：先算出每個文字格在 text 中的位置
+    text_index = np.full(kinds.shape, -1, dtype=np.int64)
+    text_mask = (kinds == _KIND_TEXT) | (kinds == _KIND_DATETIME)
+    text_index[text_mask] = np.arange(int(text_mask.sum()))
+
+    data = {}
+    for col in range(cols):
+        dtype = dtypes[col]
+        if dtype != 'object' and not dtype.startswith(('datetime', 'bool', 'str', 'string')):
+            data[col] = pd.Series(values[:, col], copy=False).astype(dtype, copy=False)
+            continue
+        cells = []
+        for row in range(rows):
+            kind = kinds[row, col]
+            if kind == _KIND_EMPTY:
+                cells.append(np.nan)
+            elif kind == _KIND_FLOAT:
+                cells.append(float(values[row, col]))
+            elif kind == _KIND_INT:
+                cells.append(int(values[row, col]))
+            elif kind == _KIND_BOOL:
+                cells.append(bool(values[row, col]))
+            elif kind == _KIND_DATETIME:
+                cells.append(datetime.datetime.fromisoformat(str(text[text_index[row, col]])))
+            else:
+                cells.append(str(text[text_index[row, col]]))
+        series = pd.Series(cells, dtype=object)
+        data[col] = series if dtype == 'object' else series.astype(dtype)
+    return pd.DataFrame(data, index=pd.RangeIndex(rows), columns=pd.RangeIndex(cols))
+
+
+def write_snapshot(session, path, date_sheets=None):
+    """把 session 已擷取的月報表彙整與日期工作表寫成快照資料夾，回傳快照路徑
+
+    date_sheets 未指定時使用所有已擷取的日期工作表（依名稱排序）；
+    先寫到暫存資料夾再改名，其他行程不會讀到寫到一半的快照
+    """
+    import shutil
+
+    import numpy as np
+
+    path = Path(os.path.expanduser(str(path)))
+    if date_sheets is None:
+        date_sheets = sorted(name for name in session.sheet_names if session.cached_daily(name) is not None)
+    date_sheets = list(date_sheets)
+
+    summary_values, summary_kinds, summary_text, summary_dtypes = _encode_summary(session.parse(SUMMARY_SHEET))
+
+    daily_totals = np.full((len(date_sheets), 2), np.nan)
+    daily_rows = np.zeros(len(date_sheets), dtype=np.int64)
+    mask_offsets = np.zeros(len(date_sheets) + 1, dtype=np.int64)
+    mask_rows = []
+    raw_ids = []
+    for index, sheet_name in enumerate(date_sheets):
+        data = session.daily_sheet(sheet_name)
+        daily_totals[index] = (_to_float(data.performance), _to_float(data.consumption))
+        daily_rows[index] = data.rows_scanned
+        mask_rows.extend(row for row, _ in data.mask_hits)
+        raw_ids.extend(therapist_id for _, therapist_id in data.mask_hits)
+        mask_offsets[index + 1] = len(mask_rows)
+
+    # 淨膚師編號多為數字，少數檔案是文字（例如 '3.0'），分開存放以保留原本的值
+    numeric_ids = [_is_number(therapist_id) for therapist_id in raw_ids]
+    mask_ids = np.array([float(therapist_id) if numeric else np.nan
+                         for therapist_id, numeric in zip(raw_ids, numeric_ids)], dtype=np.float64)
+    if all(numeric_ids):
+        mask_id_text = np.zeros(len(raw_ids), dtype='<U1')
+    else:
+        mask_id_text = np.array(['' if numeric else str(therapist_id)
+                                 for therapist_id, numeric in zip(raw_ids, numeric_ids)], dtype=str)
+
+    arrays = {
+        'summary_values': summary_values,
+        'summary_kinds': summary_kinds,
+        'summary_text': summary_text,
+        'daily_totals': daily_totals,
+        'daily_rows': daily_rows,
+        'mask_offsets': mask_offsets,
+        'mask_rows': np.array(mask_rows, dtype=np.int32),
+        'mask_ids': mask_ids,
+        'mask_id_text': mask_id_text,
+    }
+    source = session.source
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'parser_version': PARSER_VERSION,
+        'source': str(source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')),
+        'sheet_names': session.sheet_names,
+        'date_sheets': date_sheets,
+        'summary_dtypes': summary_dtypes,
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(temp_path, ignore_errors=True)
+    temp_path.mkdir()
+    for name, array in arrays.items():
+        np.save(temp_path / f"{name}.npy", np.ascontiguousarray(array), allow_pickle=False)
+    with open(temp_path / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    if path.exists():
+        old_path = path.with_name(f"{path.name}.{os.getpid()}.old")
+        os.replace(path, old_path)
+        os.replace(temp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(temp_path, path)
+    return path
+
+
+class WorkbookSnapshot:
+    """以記憶體映射開啟的快照；陣列為唯讀的 np.memmap，只有用到的部分會從磁碟讀入"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self._arrays = {}
+        self.sheet_names = list(meta['sheet_names'])
+        self.date_sheets = list(meta['date_sheets'])
+        self._sheet_index = {name: index for index, name in enumerate(self.date_sheets)}
+        self._summary = None
+
+    def array(self, name):
+        """取得快照陣列，第一次使用時才映射檔案"""
+        if name not in self._arrays:
+            import numpy as np
+
+            self._arrays[name] = np.load(self.path / f"{name}.npy", mmap_mode='r', allow_pickle=False)
+        return self._arrays[name]
+
+    @property
+    def source(self):
+        """建立快照時的來源檔名"""
+        return self.meta.get('source')
+
+    def totals(self):
+        """(業績總額, 消耗總額)，與 read_excel_data 相同（空白略過）"""
+        import numpy as np
+
+        performance, consumption = np.nansum(self.array('daily_totals'), axis=0).tolist()
+        return performance, consumption
+
+    def summary_frame(self):
+        """月報表彙整 DataFrame（與 session.parse('月報表彙整') 相同），第一次呼叫時建立"""
+        if self._summary is None:
+            self._summary = _decode_summary(
+                self.array('summary_values'), self.array('summary_kinds'),
+                self.array('summary_text'), self.meta['summary_dtypes'],
+            )
+        return self._summary
+
+    def _mask_hits(self, index):
+        start, end = self.array('mask_offsets')[index:index + 2].tolist()
+        rows = self.array('mask_rows')[start:end].tolist()
+        therapist_ids = self.array('mask_ids')[start:end].tolist()
+        texts = self.array('mask_id_text')[start:end].tolist()
+        return [(row, text if text else therapist_id) for row, therapist_id, text in zip(rows, therapist_ids, texts)]
+
+    def daily(self, sheet_name):
+        """日期工作表擷取結果 (DailySheetData)，E3/E5 空白時為 NaN"""
+        index = self._sheet_index[sheet_name]
+        performance, consumption = self.array('daily_totals')[index].tolist()
+        rows_scanned = int(self.array('daily_rows')[index])
+        return DailySheetData(performance, consumption, self._mask_hits(index), rows_scanned)
+
+    def to_session(self, backend='pandas'):
+        """轉成 WorkbookSession（from_cache=True），可直接傳給 read_excel_data / count_mask_sales"""
+        state = {
+            'sheet_names': self.sheet_names,
+            'frames': {SUMMARY_SHEET: self.summary_frame()},
+            'daily': {name: tuple(self.daily(name)) for name in self.date_sheets},
+        }
+        session = WorkbookSession.from_state(self.path, state, backend=backend)
+        session.snapshot = self
+        return session
+
+
+def load_snapshot(path):
+    """開啟快照資料夾，回傳 WorkbookSnapshot（陣列在使用時才以記憶體映射載入）"""
+    path = Path(os.path.expanduser(str(path)))
+    try:
+        with open(path / 'meta.json', encoding='utf-8') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"找不到快照: {path}") from None
+    if meta.get('version') != SNAPSHOT_VERSION or meta.get('parser_version') != PARSER_VERSION:
+        raise SnapshotError(f"快照版本不符，請由 Excel 重新建立: {path}")
+
+    missing = [name for name in _ARRAY_FILES if not (path / f"{name}.npy").is_file()]
+    if missing:
+        raise SnapshotError(f"快照內容不完整，缺少 {', '.join(missing)}: {path}")
+    return WorkbookSnapshot(path, meta)